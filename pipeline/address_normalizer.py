@@ -0,0 +1,125 @@
+import math
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Long forms of Brasília sector names, mapped to the abbreviation used in listings.
+# Applied to the accent-free, uppercase text before tokenizing.
+SECTOR_PHRASES = [
+    (r"\bSUPER ?QUADRA SUL\b", "SQS"),
+    (r"\bSUPER ?QUADRA NORTE\b", "SQN"),
+    (r"\bSUPER ?QUADRA SUDOESTE\b", "SQSW"),
+    (r"\bSUPER ?QUADRA NOROESTE\b", "SQNW"),
+    (r"\bSETOR DE HABITACOES INDIVIDUAIS SUL\b", "SHIS"),
+    (r"\bSETOR DE HABITACOES INDIVIDUAIS NORTE\b", "SHIN"),
+    (r"\bSHI SUL\b", "SHIS"),
+    (r"\bSHI NORTE\b", "SHIN"),
+    (r"\bQUADRA INTERNA\b", "QI"),
+    (r"\bQUADRA DO LAGO\b", "QL"),
+    (r"\bQUADRA RESIDENCIAL\b", "QR"),
+    (r"\bSETOR DE CLUBES ESPORTIVOS SUL\b", "SCES"),
+    (r"\bSETOR DE CLUBES ESPORTIVOS NORTE\b", "SCEN"),
+]
+
+# Token-level abbreviations (quadra/bloco/conjunto/lote and friends)
+TOKEN_ABBREVIATIONS = {
+    "QUADRA": "QD",
+    "QDR": "QD",
+    "Q": "QD",
+    "BLOCO": "BL",
+    "BLC": "BL",
+    "BLOC": "BL",
+    "CONJUNTO": "CJ",
+    "CONJ": "CJ",
+    "CJTO": "CJ",
+    "LOTE": "LT",
+    "LOTES": "LT",
+    "NUMERO": "N",
+    "NUM": "N",
+    "NO": "N",
+    "APARTAMENTO": "AP",
+    "APTO": "AP",
+    "APT": "AP",
+    "AVENIDA": "AV",
+    "RUA": "R",
+}
+
+# Words that don't change the location and only add variation between sources
+NOISE_TOKENS = {"DF", "BRASIL", "BRAZIL", "DISTRITO", "FEDERAL"}
+
+
+def strip_accents(text: str) -> str:
+    """Remove diacritics: "Brasília" -> "Brasilia"."""
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def canonicalize_address(address: Any) -> str:
+    """
+    Reduce an address to a canonical key so that spelling variants of the same place match.
+
+    Folds case and accents, drops punctuation, maps Brasília sector names and common
+    abbreviations to a single form (SQS, SHIS, QI, QD, BL, CJ...), separates glued
+    sector/number tokens ("SQS308") and strips leading zeros from numbers.
+
+    Example:
+        "Super Quadra Sul 308, Bloco C - Asa Sul" -> "SQS 308 BL C ASA SUL"
+    """
+    if address is None:
+        return ""
+
+    text = strip_accents(str(address)).upper()
+    text = re.sub(r"[^A-Z0-9]+", " ", text)
+
+    for pattern, replacement in SECTOR_PHRASES:
+        text = re.sub(pattern, replacement, text)
+
+    # Split letter/number boundaries: "SQS308" -> "SQS 308", "308C" -> "308 C"
+    text = re.sub(r"(?<=[A-Z])(?=\d)|(?<=\d)(?=[A-Z])", " ", text)
+
+    tokens = []
+    for token in text.split():
+        if token in NOISE_TOKENS:
+            continue
+        token = TOKEN_ABBREVIATIONS.get(token, token)
+        if token.isdigit():
+            token = token.lstrip("0") or "0"
+        tokens.append(token)
+
+    return " ".join(tokens)
+
+
+def address_key(address: Any) -> Optional[str]:
+    """Canonical key of an address, or None when there is no usable address."""
+    # NaN from pandas records is truthy but means "no address"
+    if not address or (isinstance(address, float) and math.isnan(address)):
+        return None
+    return canonicalize_address(address) or None
+
+
+def deduplicate_addresses(
+    items: List[Dict[str, Any]], address_field: str
+) -> Tuple[Dict[str, str], List[Optional[str]]]:
+    """
+    Group items by canonical address so each distinct place is geocoded once.
+
+    Args:
+        items: List of property dictionaries
+        address_field: Key holding the address text
+
+    Returns:
+        Tuple (unique_addresses, item_keys). unique_addresses maps each canonical key to
+        the first raw address seen for it; item_keys holds the key of every item in input
+        order, or None for items without an address.
+    """
+    unique_addresses = {}
+    item_keys = []
+
+    for item in items:
+        address = item.get(address_field)
+        key = address_key(address)
+        if key is not None:
+            unique_addresses.setdefault(key, address)
+        item_keys.append(key)
+
+    return unique_addresses, item_keys
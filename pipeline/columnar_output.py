@@ -0,0 +1,166 @@
+import os
+import shutil
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from pipeline.partitioning import PARTITION_FIELDS
+from pipeline.prefilter import parse_numeric
+
+try:
+    import pyarrow  # noqa: F401 (needed by DataFrame.to_parquet)
+except ImportError:  # Only the text outputs are written
+    pyarrow = None
+
+# Scraped as text by some sources ("1.250.000", "85 m²", "2 quartos")
+NUMERIC_COLUMNS = (
+    "price",
+    "size",
+    "size_m2",
+    "bedroom",
+    "bedrooms",
+    "bathrooms",
+    "parking_spaces",
+    "car_spaces",
+)
+# Written by the pipeline itself, always with a decimal point
+COORDINATE_COLUMNS = ("latitude", "longitude")
+# Few distinct values, loaded as pandas categories
+CATEGORICAL_COLUMNS = (
+    "data_source",
+    "contract_type",
+    "property_type",
+    "type",
+    "location",
+    "location_method",
+    "geo_precision",
+)
+BOOLEAN_COLUMNS = ("geo_valid",)
+BOOLEAN_VALUES = {True: True, False: False, "True": True, "False": False}
+# Partition value of the listings missing a data source or contract type
+MISSING_PARTITION = "unknown"
+
+Filter = Tuple[str, str, Any]
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed, Parquet outputs are skipped otherwise."""
+    return pyarrow is not None
+
+
+def to_columnar(
+    df: pd.DataFrame, partition_cols: Sequence[str] = PARTITION_FIELDS
+) -> pd.DataFrame:
+    """
+    Give the listings stable column types: numbers parsed to float, flags to
+    nullable booleans and everything else to nullable strings. Every batch of the
+    same columns then gets the same Parquet schema, whatever its values.
+
+    Args:
+        df: Listings, as merged or as written to the final CSVs
+        partition_cols: Columns the dataset is partitioned by, missing values
+            become MISSING_PARTITION
+
+    Returns:
+        Typed copy of df
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in NUMERIC_COLUMNS:
+            df[column] = parse_numeric(df[column])
+        elif column in COORDINATE_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(float)
+        elif column in BOOLEAN_COLUMNS:
+            # Read back from the CSVs as "True"/"False"
+            df[column] = df[column].map(BOOLEAN_VALUES).astype("boolean")
+        elif not pd.api.types.is_numeric_dtype(df[column]):
+            text = df[column].astype("string")
+            if column in partition_cols:
+                text = text.fillna(MISSING_PARTITION)
+            df[column] = text
+    for column in partition_cols:
+        if column not in df:
+            df[column] = MISSING_PARTITION
+    return df
+
+
+def write_dataset(
+    frames: Iterable[pd.DataFrame],
+    path: str,
+    partition_cols: Sequence[str] = PARTITION_FIELDS,
+) -> bool:
+    """
+    Write the listings as a Parquet dataset partitioned by data source and
+    contract type (path/data_source=.../contract_type=.../*.parquet), replacing
+    the previous one once every frame is written.
+
+    Args:
+        frames: Listings, one frame at a time so large outputs never sit in memory
+            at once; each frame adds a file to the partitions it covers
+        path: Dataset folder
+        partition_cols: Partition columns, in folder order
+
+    Returns:
+        True if the dataset was written, False without pyarrow
+    """
+    if not parquet_available():
+        print(f"pyarrow is not installed, skipping the Parquet dataset {path}")
+        return False
+
+    temp_path = f"{path}.tmp"
+    if os.path.exists(temp_path):
+        shutil.rmtree(temp_path)
+    os.makedirs(temp_path)
+    rows = 0
+    for df in frames:
+        if df.empty:
+            continue
+        to_columnar(df, partition_cols).to_parquet(
+            temp_path, partition_cols=list(partition_cols), index=False
+        )
+        rows += len(df)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(temp_path, path)
+    print(f"Saved Parquet dataset with {rows} rows to {path}")
+    return True
+
+
+def read_dataset(
+    path: str,
+    columns: Optional[List[str]] = None,
+    data_source: Optional[str] = None,
+    contract_type: Optional[str] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    """
+    Load listings from a dataset written by write_dataset. Only the partitions
+    selected by data_source and contract_type are opened, only the requested
+    columns are decoded, and filters skip the row groups whose statistics rule
+    them out.
+
+    Args:
+        path: Dataset folder
+        columns: Columns to load, all of them if None
+        data_source: Load only this scraper's partition
+        contract_type: Load only this contract type ("venda", "aluguel")
+        filters: Extra (column, operator, value) predicates, e.g.
+            [("price", "<", 500000)]
+
+    Returns:
+        pandas DataFrame with categorical columns as pandas categories
+    """
+    predicates = list(filters or [])
+    if data_source is not None:
+        predicates.append(("data_source", "==", data_source))
+    if contract_type is not None:
+        predicates.append(("contract_type", "==", contract_type))
+
+    df = pd.read_parquet(
+        path, engine="pyarrow", columns=columns, filters=predicates or None
+    )
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
@@ -1,4 +1,6 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List
+
+from pipeline.fingerprint import record_digest
 
 
 class DataCleaner:
@@ -23,3 +25,17 @@ class DataCleaner:
         self.remove_empty_values()
 
         return self.data
+
+    def stream(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Apply the clean_data rules one record at a time.
+        Only a digest of the records seen so far is kept in memory.
+        """
+        seen = set()
+        for d in records:
+            if not all(d.values()):
+                continue
+            t = record_digest(d)
+            if t not in seen:
+                seen.add(t)
+                yield d
@@ -1,10 +1,92 @@
 import glob
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+import openpyxl
 import pandas as pd
 
+from pipeline.columnar_output import write_dataset
+from pipeline.merge_cache import MergeCache, file_sha256, restore_missing
+from pipeline.run_metrics import RunMetrics, measure
+from pipeline.schema import apply_schema
+from scripts.utils.profiling import profile_stage
+
+# XLSX files from this size up are streamed row by row: loading the whole workbook
+# takes tens of times the file size in memory
+XLSX_STREAMING_MIN_BYTES = 10 * 1024 * 1024
+XLSX_CHUNK_ROWS = 10_000
+
+
+def read_tsv_file(path: str) -> pd.DataFrame:
+    """Parse a scraper TSV file."""
+    return pd.read_csv(path, sep="\t")
+
+
+def read_xlsx_file(path: str) -> pd.DataFrame:
+    """Parse a scraper XLSX file, streaming it when it is large."""
+    if os.path.getsize(path) >= XLSX_STREAMING_MIN_BYTES:
+        return read_xlsx_streaming(path)
+    return pd.read_excel(path)
+
+
+def read_xlsx_streaming(path: str, chunk_rows: int = XLSX_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse the first sheet of an XLSX file with openpyxl's read-only reader, which
+    keeps one row in memory at a time instead of the whole workbook. The frame is
+    built chunk_rows rows at a time and matches pd.read_excel's.
+
+    Args:
+        path: XLSX file
+        chunk_rows: Rows turned into a DataFrame at once
+
+    Returns:
+        pandas DataFrame of the sheet, first row as header
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = [
+            f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)
+        ]
+
+        chunks = []
+        chunk = []
+        blank_rows = []
+        for row in rows:
+            row = (tuple(row) + (None,) * len(columns))[: len(columns)]
+            if all(cell is None for cell in row):
+                # Kept only when more data follows, read_excel drops trailing ones
+                blank_rows.append(row)
+                continue
+            chunk.extend(blank_rows)
+            blank_rows = []
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                chunks.append(pd.DataFrame.from_records(chunk, columns=columns))
+                chunk = []
+        if chunk or not chunks:
+            chunks.append(pd.DataFrame.from_records(chunk, columns=columns))
+    finally:
+        workbook.close()
+
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    return restore_missing(df)
+
+
+def _parse_file(
+    path: str, read_file: Callable[[str], pd.DataFrame]
+) -> Union[pd.DataFrame, Exception]:
+    # Errors are returned so that one bad file doesn't cancel the others
+    try:
+        return read_file(path)
+    except Exception as e:
+        return e
+
 
 class ScraperOrchestrator:
     """
@@ -12,8 +94,27 @@ class ScraperOrchestrator:
     Finds and processes TSV and XLSX files in the detailed_properties folders of each scraper.
     """
 
-    def __init__(self, base_scripts_dir: str = None):
-        """Initialize the scraper orchestrator"""
+    def __init__(
+        self,
+        base_scripts_dir: str = None,
+        metrics: Optional[RunMetrics] = None,
+        merge_cache: Optional[MergeCache] = None,
+        workers: int = 1,
+    ):
+        """
+        Initialize the scraper orchestrator
+
+        Args:
+            base_scripts_dir: Folder holding one directory per scraper
+            metrics: Records the timing and row counts of each step when given
+            merge_cache: Snapshots of the parsed files, so merges only re-parse the
+                files that are new or changed
+            workers: Processes parsing the files, with 1 they are parsed one by one
+                in this process
+        """
+        self.metrics = metrics
+        self.merge_cache = merge_cache
+        self.workers = max(1, workers or 1)
 
         if base_scripts_dir is None:
             self.scripts_dir = os.path.join(Path(__file__).parent.parent, "scripts")
@@ -25,7 +126,12 @@ class ScraperOrchestrator:
 
     def discover_data_files(self) -> Dict[str, List[str]]:
         """Discover all TSV and XLSX files in detailed_properties folders."""
+        with measure(self.metrics, "discover") as stage, profile_stage("discover"):
+            discovered = self._discover_data_files()
+            stage.rows_out = len(self.tsv_files) + len(self.xlsx_files)
+        return discovered
 
+    def _discover_data_files(self) -> Dict[str, List[str]]:
         self.tsv_files = []
         self.xlsx_files = []
 
@@ -91,25 +197,11 @@ class ScraperOrchestrator:
             print("No TSV files found to merge.")
             return pd.DataFrame()
 
-        dfs = []
-        for file_path in self.tsv_files:
-            try:
-                df = pd.read_csv(file_path, sep="\t")
-                # Add source information
-                df["data_source"] = os.path.basename(
-                    os.path.dirname(os.path.dirname(file_path))
-                )
-                dfs.append(df)
-                print(f"Loaded {len(df)} rows from {file_path}")
-            except Exception as e:
-                print(f"Error loading {file_path}: {str(e)}")
-
-        if not dfs:
-            return pd.DataFrame()
-
-        # Merge all dataframes
-        merged_df = pd.concat(dfs, ignore_index=True)
-        print(f"Merged {len(merged_df)} total rows from TSV files")
+        with measure(self.metrics, "merge_tsv") as stage, profile_stage("merge_tsv"):
+            merged_df = self._merge_files(self.tsv_files, read_tsv_file)
+            stage.rows_out = len(merged_df)
+        if not merged_df.empty:
+            print(f"Merged {len(merged_df)} total rows from TSV files")
         return merged_df
 
     def merge_xlsx_files(self) -> pd.DataFrame:
@@ -123,26 +215,97 @@ class ScraperOrchestrator:
             print("No XLSX files found to merge.")
             return pd.DataFrame()
 
+        with measure(self.metrics, "merge_xlsx") as stage, profile_stage("merge_xlsx"):
+            merged_df = self._merge_files(self.xlsx_files, read_xlsx_file)
+            stage.rows_out = len(merged_df)
+        if not merged_df.empty:
+            print(f"Merged {len(merged_df)} total rows from XLSX files")
+        return merged_df
+
+    def _merge_files(
+        self, file_paths: List[str], read_file: Callable[[str], pd.DataFrame]
+    ) -> pd.DataFrame:
         dfs = []
-        for file_path in self.xlsx_files:
-            try:
-                df = pd.read_excel(file_path)
-                # Add source information
-                df["data_source"] = os.path.basename(
-                    os.path.dirname(os.path.dirname(file_path))
-                )
-                dfs.append(df)
-                print(f"Loaded {len(df)} rows from {file_path}")
-            except Exception as e:
-                print(f"Error loading {file_path}: {str(e)}")
+        for file_path, result in self._load_files(file_paths, read_file):
+            if isinstance(result, Exception):
+                print(f"Error loading {file_path}: {str(result)}")
+                continue
+            # Add source information
+            result["data_source"] = self._scraper_name(file_path)
+            dfs.append(result)
+            print(f"Loaded {len(result)} rows from {file_path}")
+
+        if self.merge_cache is not None:
+            self.merge_cache.save()
+            print(
+                f"Merge cache: {self.merge_cache.hits} files reused, "
+                f"{self.merge_cache.misses} parsed"
+            )
 
         if not dfs:
             return pd.DataFrame()
 
-        # Merge all dataframes
-        merged_df = pd.concat(dfs, ignore_index=True)
-        print(f"Merged {len(merged_df)} total rows from XLSX files")
-        return merged_df
+        # Merge all dataframes, stored in the canonical dtypes
+        return apply_schema(pd.concat(dfs, ignore_index=True))
+
+    def _scraper_name(self, file_path: str) -> str:
+        """
+        Scraper a data file belongs to: its top folder under the scripts folder
+        (<scraper>/dataset/detailed_properties/*.tsv or <scraper>/dataset/*.tsv).
+        """
+        relative = os.path.relpath(os.path.abspath(file_path), self.scripts_dir)
+        parts = Path(relative).parts
+        if len(parts) > 1 and parts[0] != os.pardir:
+            return parts[0]
+        # Outside the scripts folder: the folder holding the dataset folder
+        dataset_dir = os.path.dirname(file_path)
+        if os.path.basename(dataset_dir) == "detailed_properties":
+            dataset_dir = os.path.dirname(dataset_dir)
+        return os.path.basename(os.path.dirname(dataset_dir))
+
+    def _load_files(
+        self, file_paths: List[str], read_file: Callable[[str], pd.DataFrame]
+    ) -> Iterator[Tuple[str, Union[pd.DataFrame, Exception]]]:
+        """
+        Parsed frame (or loading error) of each file, in the order of file_paths.
+        Snapshots of the merge cache are reused, the other files are parsed in a
+        process pool when workers > 1.
+        """
+        results: Dict[str, Union[pd.DataFrame, Exception]] = {}
+        pending = []
+        fingerprints = {}
+        for file_path in file_paths:
+            try:
+                df = self.merge_cache.get(file_path) if self.merge_cache else None
+                if df is not None:
+                    results[file_path] = df
+                    continue
+                if self.merge_cache is not None:
+                    # Hashed before parsing: an edit in between is caught next run
+                    fingerprints[file_path] = (
+                        os.stat(file_path),
+                        file_sha256(file_path),
+                    )
+            except Exception as e:
+                results[file_path] = e
+                continue
+            pending.append(file_path)
+
+        if self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending))
+            ) as executor:
+                parsed = executor.map(_parse_file, pending, [read_file] * len(pending))
+                results.update(zip(pending, parsed))
+        else:
+            results.update((path, _parse_file(path, read_file)) for path in pending)
+
+        for file_path in file_paths:
+            result = results[file_path]
+            if file_path in fingerprints and not isinstance(result, Exception):
+                stat, sha256 = fingerprints[file_path]
+                self.merge_cache.put(file_path, result, stat, sha256)
+            yield file_path, result
 
     def get_merged_data(self) -> pd.DataFrame:
         """
@@ -154,18 +317,26 @@ class ScraperOrchestrator:
         """
         # Discover all data files
         self.discover_data_files()
+        return self.merge_discovered_data()
 
-        # Merge TSV files
-        tsv_data = self.merge_tsv_files()
+    def merge_discovered_data(self) -> pd.DataFrame:
+        """
+        Merge the TSV and XLSX files found by the last discover_data_files call
+        (or assigned to tsv_files/xlsx_files directly).
 
-        # Merge XLSX files
-        xlsx_data = self.merge_xlsx_files()
+        Returns:
+            pandas DataFrame with all merged data
+        """
+        return self._combine(self.merge_tsv_files(), self.merge_xlsx_files())
 
+    def _combine(self, tsv_data: pd.DataFrame, xlsx_data: pd.DataFrame) -> pd.DataFrame:
         # Merge both sources if both exist
         if not tsv_data.empty and not xlsx_data.empty:
             # Try to merge data, handling potential schema differences
             try:
-                merged_data = pd.concat([tsv_data, xlsx_data], ignore_index=True)
+                merged_data = apply_schema(
+                    pd.concat([tsv_data, xlsx_data], ignore_index=True)
+                )
                 print(
                     f"Successfully merged {len(tsv_data)} TSV rows and {len(xlsx_data)} XLSX rows"
                 )
@@ -182,68 +353,108 @@ class ScraperOrchestrator:
             print("No data files found.")
             return pd.DataFrame()
 
-    def save_merged_data_to_files(self) -> Dict[str, str]:
+    def save_merged_data_to_files(
+        self,
+        tsv_data: Optional[pd.DataFrame] = None,
+        xlsx_data: Optional[pd.DataFrame] = None,
+        export_xlsx: bool = False,
+    ) -> Dict[str, str]:
         """
-        Save merged data to TSV and XLSX files in the raw_final_output folder.
+        Save merged data to the raw_final_output folder: the TSV rows to
+        merged_properties.tsv and all rows to the merged_properties Parquet dataset,
+        partitioned by data source and contract type (see pipeline.columnar_output).
+
+        Args:
+            tsv_data: Already merged TSV rows, read from the discovered files if None
+            xlsx_data: Already merged XLSX rows, read from the discovered files if None
+            export_xlsx: Also write the XLSX rows to merged_properties.xlsx, which
+                is slow for large merges; done anyway when pyarrow is missing so
+                that they are saved somewhere
 
         Returns:
             Dictionary with paths to the created files.
         """
-        # Get merged data
-        tsv_data = self.merge_tsv_files()
-        xlsx_data = self.merge_xlsx_files()
-
-        # Create raw_final_output directory in pipeline folder if it doesn't exist
-        output_dir = os.path.join(Path(__file__).parent, "raw_final_output")
-        os.makedirs(output_dir, exist_ok=True)
-
-        output_files = {}
-
-        # Save merged TSV data
-        if not tsv_data.empty:
-            tsv_output_path = os.path.join(output_dir, "merged_properties.tsv")
-            tsv_data.to_csv(tsv_output_path, sep="\t", index=False)
-            print(
-                f"Saved merged TSV data with {len(tsv_data)} rows to {tsv_output_path}"
-            )
-            output_files["tsv"] = tsv_output_path
-
-        # Save merged XLSX data
-        if not xlsx_data.empty:
-            xlsx_output_path = os.path.join(output_dir, "merged_properties.xlsx")
-            xlsx_data.to_excel(xlsx_output_path, index=False)
-            print(
-                f"Saved merged XLSX data with {len(xlsx_data)} rows to {xlsx_output_path}"
-            )
-            output_files["xlsx"] = xlsx_output_path
+        if tsv_data is None:
+            tsv_data = self.merge_tsv_files()
+        if xlsx_data is None:
+            xlsx_data = self.merge_xlsx_files()
+
+        with measure(
+            self.metrics, "save_merged", len(tsv_data) + len(xlsx_data)
+        ) as stage, profile_stage("save_merged"):
+            # Create raw_final_output directory in pipeline folder if it doesn't exist
+            output_dir = os.path.join(Path(__file__).parent, "raw_final_output")
+            os.makedirs(output_dir, exist_ok=True)
+
+            output_files = {}
+
+            # Save merged TSV data
+            if not tsv_data.empty:
+                tsv_output_path = os.path.join(output_dir, "merged_properties.tsv")
+                tsv_data.to_csv(tsv_output_path, sep="\t", index=False)
+                print(
+                    f"Saved merged TSV data with {len(tsv_data)} rows to {tsv_output_path}"
+                )
+                output_files["tsv"] = tsv_output_path
+
+            # Save every row as a typed, partitioned Parquet dataset
+            frames = [df for df in (tsv_data, xlsx_data) if not df.empty]
+            parquet_output_path = os.path.join(output_dir, "merged_properties")
+            if frames and write_dataset(
+                [pd.concat(frames, ignore_index=True)], parquet_output_path
+            ):
+                output_files["parquet"] = parquet_output_path
+
+            # Save merged XLSX data
+            if not xlsx_data.empty and (export_xlsx or "parquet" not in output_files):
+                xlsx_output_path = os.path.join(output_dir, "merged_properties.xlsx")
+                xlsx_data.to_excel(xlsx_output_path, index=False)
+                print(
+                    f"Saved merged XLSX data with {len(xlsx_data)} rows to {xlsx_output_path}"
+                )
+                output_files["xlsx"] = xlsx_output_path
+            stage.rows_out = stage.rows_in if output_files else 0
 
         if not output_files:
             print("No data files were saved as no data was found.")
 
         return output_files
 
-    def run_pipeline(self) -> Dict[str, Any]:
+    def run_pipeline(
+        self, save_merged: bool = True, export_xlsx: bool = False
+    ) -> Dict[str, Any]:
         """
         Run the complete data scraping pipeline:
         1. Discover data files
-        2. Merge the data
-        3. Save to output files
+        2. Merge the data, reading each file once
+        3. Optionally save it to output files
+
+        Args:
+            save_merged: Also write the merged data to the raw_final_output folder
+            export_xlsx: Include merged_properties.xlsx in the saved files
 
         Returns:
-            Dictionary with pipeline results including file paths and row counts.
+            Dictionary with pipeline results including the merged DataFrame
+            ("merged_data"), file paths and row counts.
         """
         # Discover files
         discovered_files = self.discover_data_files()
 
-        # Get merged data (for reference/debugging)
-        merged_data = self.get_merged_data()
+        # Each file is parsed once, the frames are reused for the output files
+        tsv_data = self.merge_tsv_files()
+        xlsx_data = self.merge_xlsx_files()
+        merged_data = self._combine(tsv_data, xlsx_data)
 
-        # Save to output files
-        output_files = self.save_merged_data_to_files()
+        output_files = (
+            self.save_merged_data_to_files(tsv_data, xlsx_data, export_xlsx)
+            if save_merged
+            else {}
+        )
 
         # Return summary of operations
         return {
             "discovered_files": discovered_files,
+            "merged_data": merged_data,
             "merged_row_count": len(merged_data) if not merged_data.empty else 0,
             "output_files": output_files,
         }
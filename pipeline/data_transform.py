@@ -1,15 +1,113 @@
-import os
-import time
-from typing import Any, Dict, List, Optional, Tuple
-
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut
-from geopy.geocoders import GoogleV3, Nominatim
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pipeline.address_normalizer import address_key, deduplicate_addresses
+from pipeline.format_stats import FormatStats
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.geocoding_providers import (
+    REMOTE_PROVIDERS,
+    GeocodingProvider,
+    RemoteProvider,
+    build_provider_chain,
+)
+from pipeline.offline_geocoder import OfflineGeocoder
+from pipeline.run_metrics import ProgressReporter
 
 
 class DataTransformer:
-    def __init__(self, data: List[Dict[str, Any]], geocoding_service="nominatim"):
+    def __init__(
+        self,
+        data: List[Dict[str, Any]],
+        geocoding_service="nominatim",
+        cache: Optional[GeocodeCache] = None,
+        workers: int = 1,
+        rate_limits: Optional[Dict[str, float]] = None,
+        offline_geocoder: Optional[OfflineGeocoder] = None,
+        format_stats: Optional[FormatStats] = None,
+        providers: Optional[List[GeocodingProvider]] = None,
+        quotas: Optional[Dict[str, int]] = None,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        centroid_fallback: bool = True,
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            data: List of property dictionaries
+            geocoding_service: Remote service, or several separated by commas to chain
+                them ("nominatim,google" falls back to Google when Nominatim fails)
+            cache: Persistent geocode cache, tried before the remote services
+            workers: Concurrent geocoding lookups
+            rate_limits: Requests per second per remote service
+            offline_geocoder: Gazetteer index, tried first
+            format_stats: Learned address-format statistics shared by remote services
+            providers: Explicit provider chain, overrides all of the above
+            quotas: Request quota per remote service
+            provider_concurrency: Concurrent lookups per service
+            centroid_fallback: Use the gazetteer's quadra/sector/RA centroid when no
+                provider resolves an address, see the "geo_precision" field
+            verbose: Print every item and provider request instead of periodic progress
+        """
         self.data = data
         self.geocoding_service = geocoding_service.lower()
+        self.cache = cache
+        self.offline_geocoder = offline_geocoder
+        # Without a persistent store the cascade still adapts within the run
+        self.format_stats = format_stats or FormatStats()
+        self.workers = max(1, workers)
+        self.rate_limits = rate_limits or {}
+        self.verbose = verbose
+
+        if providers is None:
+            services = [
+                service.strip()
+                for service in self.geocoding_service.split(",")
+                if service.strip()
+            ]
+            providers = build_provider_chain(
+                services,
+                cache=cache,
+                offline_geocoder=offline_geocoder,
+                format_stats=self.format_stats,
+                workers=self.workers,
+                rate_limits=self.rate_limits,
+                quotas=quotas,
+                concurrency=provider_concurrency,
+                verbose=verbose,
+            )
+        self.providers = providers
+
+        self.provider_lookups = 0
+        self.resolved_lookups = 0
+        self.dedup_stats: Dict[str, float] = {}
+        self.centroid_fallback = centroid_fallback
+        self.centroid_lookups = 0
+        self._centroid_geocoder = offline_geocoder
+        self._stats_lock = threading.Lock()
+        self._standalone_providers: Dict[str, RemoteProvider] = {}
+
+    @property
+    def provider_requests(self) -> int:
+        """Requests sent to the remote services."""
+        return sum(provider.requests for provider in self.providers) + sum(
+            provider.requests for provider in self._standalone_providers.values()
+        )
+
+    def _remote_provider(self, name: str) -> RemoteProvider:
+        """Remote provider from the chain, or a standalone one if it isn't chained."""
+        for provider in self.providers:
+            if provider.name == name and isinstance(provider, RemoteProvider):
+                return provider
+        with self._stats_lock:
+            if name not in self._standalone_providers:
+                self._standalone_providers[name] = REMOTE_PROVIDERS[name](
+                    rate_limit=self.rate_limits.get(name),
+                    format_stats=self.format_stats,
+                    pool_size=self.workers,
+                    verbose=self.verbose,
+                )
+            return self._standalone_providers[name]
 
     def transform_data(self, skip_geocoding=False) -> List[Dict[str, Any]]:
         """Transform data and add coordinates if geocoding is enabled"""
@@ -30,189 +128,249 @@ class DataTransformer:
                         item["longitude"] = None
         return self.data
 
-    def geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
-        """Choose geocoding service based on configuration"""
-        if self.geocoding_service == "google":
-            return self.get_coordinates_google(address)
-        else:  # Default to Nominatim
-            return self.get_coordinates(address)
+    def geocode_address(
+        self, address: str, data_source: Optional[str] = None
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Resolve an address through the provider chain: offline gazetteer, cache, then
+        the remote services in order, stopping at the first one that answers.
+        """
+        return self._geocode_chain(address, data_source)[0]
+
+    def resolve_address(
+        self, address: str, data_source: Optional[str] = None
+    ) -> Tuple[Optional[Tuple[float, float]], Optional[str]]:
+        """
+        Resolve an address through the provider chain, falling back to the closest
+        gazetteer centroid (quadra, sector, then RA) when no provider answers.
+
+        Returns:
+            Tuple (coordinates, geo_precision); geo_precision is "exact" for geocoder
+            answers, the gazetteer level otherwise, None when nothing matched
+        """
+        coordinates, precision = self._geocode_chain(address, data_source)
+        if coordinates or not self.centroid_fallback:
+            return coordinates, precision
+
+        if self._centroid_geocoder is None:
+            self._centroid_geocoder = OfflineGeocoder()
+        centroid = self._centroid_geocoder.lookup(address, min_precision="ra")
+        if centroid is None:
+            return None, None
+
+        with self._stats_lock:
+            self.centroid_lookups += 1
+        return (centroid[0], centroid[1]), centroid[2]
+
+    def _geocode_chain(
+        self, address: str, data_source: Optional[str]
+    ) -> Tuple[Optional[Tuple[float, float]], Optional[str]]:
+        had_errors = False
+        reached_remote = False
+
+        for provider in self.providers:
+            if provider.remote and not reached_remote:
+                reached_remote = True
+                with self._stats_lock:
+                    self.provider_lookups += 1
+
+            result = provider.geocode(address, data_source)
+
+            if result.coordinates:
+                if provider.remote:
+                    with self._stats_lock:
+                        self.resolved_lookups += 1
+                    if self.cache is not None:
+                        self.cache.set(address, result.coordinates, provider.name)
+                return result.coordinates, result.precision
+
+            if result.final:
+                return None, None
+            had_errors = had_errors or result.errored
+
+        # Only cache definitive answers: a "not found" caused by timeouts,
+        # quota errors or a missing API key must be retried on the next run
+        if self.cache is not None and reached_remote and not had_errors:
+            self.cache.set(address, None, provider=self.geocoding_service)
+
+        return None, None
+
+    @property
+    def requests_per_resolved_address(self) -> float:
+        """Provider requests sent per address the providers managed to resolve."""
+        if not self.resolved_lookups:
+            return 0.0
+        return self.provider_requests / self.resolved_lookups
 
     def get_coordinates_google(
         self, address: str, max_retries: int = 2
     ) -> Optional[Tuple[float, float]]:
         """Convert an address to latitude and longitude using Google Maps API."""
-        # Get API key from environment variables
-        api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
-        if not api_key:
-            print("Error: GOOGLE_MAPS_API_KEY not found in environment variables")
-            return None
-
-        geolocator = GoogleV3(api_key=api_key)
-
-        # Try with different address formats
-        address_formats = [
-            # First try with the full context
-            f"{address}, Brasília, DF, Brazil",
-            # Then try with just the city and country
-            f"{address}, Brasília, Brazil",
-            # Finally try with just the address
-            address,
-        ]
-
-        for format_idx, full_address in enumerate(address_formats):
-            print(
-                f"Google Geocoding (format {format_idx+1}/{len(address_formats)}): {full_address}"
-            )
-
-            try:
-                # Attempt geocoding with a single API request
-                location = geolocator.geocode(full_address)
-
-                if location:
-                    print(
-                        f"Found location: {location.address} at {location.latitude}, {location.longitude}"
-                    )
-                    return (location.latitude, location.longitude)
-                else:
-                    print(
-                        f"No location found for '{full_address}', trying next format..."
-                    )
-
-            except Exception as e:
-                # Only retry for technical errors, not for "not found"
-                if max_retries > 1:
-                    print(f"Google geocoding error: {e}, retrying once...")
-                    time.sleep(2)  # Wait before retry
-                    try:
-                        location = geolocator.geocode(full_address)
-                        if location:
-                            print(
-                                f"Found location on retry: {location.address} at {location.latitude}, {location.longitude}"
-                            )
-                            return (location.latitude, location.longitude)
-                    except Exception:
-                        pass
-                print(f"Error geocoding address '{full_address}': {e}")
-
-        print(f"Failed to geocode address with Google API: {address}")
-        return None
+        return self._remote_provider("google").cascade(address, None, max_retries)[0]
 
     def get_coordinates(
         self, address: str, max_retries: int = 2
     ) -> Optional[Tuple[float, float]]:
         """Convert an address to latitude and longitude using Nominatim from geopy (free service)."""
-        geolocator = Nominatim(user_agent="house_price_project")
-
-        # Try with different address formats
-        address_formats = [
-            # First try with the full context
-            f"{address}, Brasília, DF, Brazil",
-            # Then try with just the city and country
-            f"{address}, Brasília, Brazil",
-            # Finally try with just the neighborhood and city
-            address,
-        ]
-
-        for format_idx, full_address in enumerate(address_formats):
-            print(
-                f"Geocoding (format {format_idx+1}/{len(address_formats)}): {full_address}"
-            )
+        return self._remote_provider("nominatim").cascade(address, None, max_retries)[0]
+
+    @staticmethod
+    def set_coordinates(
+        item: Dict[str, Any],
+        coordinates: Optional[Tuple[float, float]],
+        precision: Optional[str],
+    ) -> None:
+        if coordinates:
+            item["latitude"] = coordinates[0]
+            item["longitude"] = coordinates[1]
+        else:
+            item["latitude"] = None
+            item["longitude"] = None
+        item["geo_precision"] = precision
+
+    def stream_coordinates(
+        self,
+        items: Iterable[Dict[str, Any]],
+        address_field: str,
+        window: Optional[int] = None,
+        memo_size: int = 10000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generator counterpart of add_coordinates_to_data for unbounded inputs.
 
-            try:
-                # Single attempt for each format with no retries for not found addresses
-                location = geolocator.geocode(full_address)
+        At most `window` items are in flight at once: the generator stops pulling from
+        `items` until the oldest lookup finishes, and yields items in input order.
+        Addresses seen recently (the last memo_size distinct keys) share one lookup;
+        older repeats are answered by the geocode cache.
+        """
+        window = window or self.workers * 4
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending: deque = deque()
+        lookups: "OrderedDict[str, Any]" = OrderedDict()
 
-                if location:
-                    print(
-                        f"Found location: {location.address} at {location.latitude}, {location.longitude}"
-                    )
-                    return (location.latitude, location.longitude)
-                else:
-                    print(
-                        f"No location found for '{full_address}', trying next format..."
-                    )
-
-            except (GeocoderTimedOut, GeocoderServiceError) as e:
-                # Only retry for technical errors, not for "not found"
-                if max_retries > 1:
-                    print(f"Geocoding error: {e}, retrying once...")
-                    time.sleep(2.2)  # Wait before retry
-                    try:
-                        location = geolocator.geocode(full_address)
-                        if location:
-                            print(
-                                f"Found location on retry: {location.address} at {location.latitude}, {location.longitude}"
-                            )
-                            return (location.latitude, location.longitude)
-                    except Exception:
-                        pass
-                print(f"Error geocoding address '{full_address}': {e}")
-
-        if ", " in address:
-            try:
-                parts = address.split(", ")
-                if len(parts) > 1:
-                    simplified_address = f"{parts[0]}, {parts[-1]}, Brasília, Brazil"
-                    print(f"Trying simplified address: {simplified_address}")
-
-                    location = geolocator.geocode(simplified_address)
-                    if location:
-                        print(
-                            f"Found location with simplified address: {location.address} at {location.latitude}, {location.longitude}"
+        try:
+            for item in items:
+                key = address_key(item.get(address_field))
+                future = None
+                if key is not None:
+                    future = lookups.get(key)
+                    if future is None:
+                        future = executor.submit(
+                            self.resolve_address,
+                            item.get(address_field),
+                            item.get("data_source"),
                         )
-                        return (location.latitude, location.longitude)
-            except Exception as e:
-                print(f"Error with simplified address: {e}")
+                        lookups[key] = future
+                        if len(lookups) > memo_size:
+                            lookups.popitem(last=False)
+                    else:
+                        lookups.move_to_end(key)
+                pending.append((item, future))
+
+                while len(pending) > window:
+                    yield self._finish_lookup(*pending.popleft())
+
+            while pending:
+                yield self._finish_lookup(*pending.popleft())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        print(f"Failed to geocode address: {address}")
-        return None
+    def _finish_lookup(self, item: Dict[str, Any], future) -> Dict[str, Any]:
+        if future is None:
+            self.set_coordinates(item, None, None)
+        else:
+            self.set_coordinates(item, *future.result())
+        return item
 
     def add_coordinates_to_data(
-        self, address_field: str, batch_size: int = 50, callback=None
+        self,
+        address_field: str,
+        batch_size: int = 50,
+        callback=None,
+        workers: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Add latitude and longitude to each item in the data based on a specified address field.
         Processes data in batches of batch_size items and calls the callback function after each batch.
+
+        Addresses are first reduced to canonical keys and only the distinct keys are geocoded;
+        the result is then broadcast to every item sharing that key. Lookups run on a pool of
+        `workers` threads and every provider request goes through that provider's token-bucket
+        limiter, so throughput is bounded by the configured rate limits instead of a fixed
+        sleep. Batches are still emitted in input order.
         """
+        workers = max(1, workers or self.workers)
 
         transformed_data = []
         total_items = len(self.data)
         current_batch = []
 
+        unique_addresses, item_keys = deduplicate_addresses(self.data, address_field)
+        items_with_address = sum(1 for key in item_keys if key is not None)
+        reduction_ratio = (
+            1 - len(unique_addresses) / items_with_address
+            if items_with_address
+            else 0.0
+        )
+        self.dedup_stats = {
+            "items_with_address": items_with_address,
+            "unique_addresses": len(unique_addresses),
+            "reduction_ratio": reduction_ratio,
+        }
+
         print(
-            f"Starting geocoding process for {total_items} items in batches of {batch_size}..."
+            f"Starting geocoding process for {total_items} items in batches of {batch_size} "
+            f"using {workers} worker(s)..."
+        )
+        print(
+            f"Unique addresses: {len(unique_addresses)} for {items_with_address} items with an address "
+            f"({reduction_ratio:.1%} fewer lookups)"
         )
 
+        progress = ProgressReporter("Geocoded", total_items)
+        executor = ThreadPoolExecutor(max_workers=workers)
         try:
-            for i, item in enumerate(self.data):
-                print(f"Processing item {i+1}/{total_items}...")
-
-                if address_field in item and item[address_field]:
-                    coordinates = self.geocode_address(item[address_field])
-
-                    if coordinates:
-                        item["latitude"] = coordinates[0]
-                        item["longitude"] = coordinates[1]
-                    else:
-                        item["latitude"] = None
-                        item["longitude"] = None
+            # Submit every distinct lookup up front; the limiter paces the actual requests
+            # Data source of the first item with each key, used to pick the format order
+            key_sources = {}
+            for item, key in zip(self.data, item_keys):
+                if key is not None and key not in key_sources:
+                    key_sources[key] = item.get("data_source")
+
+            futures = {
+                key: executor.submit(
+                    self.resolve_address, address, key_sources.get(key)
+                )
+                for key, address in unique_addresses.items()
+            }
+
+            for i, (item, key) in enumerate(zip(self.data, item_keys)):
+                if self.verbose:
+                    print(f"Processing item {i+1}/{total_items}...")
+
+                if key is not None:
+                    self.set_coordinates(item, *futures[key].result())
                 else:
-                    print(f"No valid address found in item {i+1}")
-                    item["latitude"] = None
-                    item["longitude"] = None
+                    if self.verbose:
+                        print(f"No valid address found in item {i+1}")
+                    self.set_coordinates(item, None, None)
 
                 transformed_data.append(item)
                 current_batch.append(item)
+                progress.update()
 
                 # If we've completed a batch or this is the final item
                 if len(current_batch) >= batch_size or i == total_items - 1:
-                    batch_count = len(current_batch)
-                    batch_with_coords = sum(
-                        1 for item in current_batch if item.get("latitude") is not None
-                    )
-                    print(
-                        f"Batch complete: {batch_with_coords}/{batch_count} items have coordinates"
-                    )
+                    if self.verbose:
+                        batch_count = len(current_batch)
+                        batch_with_coords = sum(
+                            1
+                            for item in current_batch
+                            if item.get("latitude") is not None
+                        )
+                        print(
+                            f"Batch complete: {batch_with_coords}/{batch_count} items have coordinates"
+                        )
 
                     # If a callback function was provided, call it with the current batch
                     if callback:
@@ -222,11 +380,9 @@ class DataTransformer:
                     # Reset the current batch
                     current_batch = []
 
-                # Add a short delay to respect Nominatim's usage policy
-                time.sleep(2)  # 1 second between requests
-
         except KeyboardInterrupt:
             print("\nGeocoding process was interrupted!")
+            executor.shutdown(wait=False, cancel_futures=True)
             print(
                 f"Processed {len(transformed_data)}/{total_items} items before interruption"
             )
@@ -240,11 +396,36 @@ class DataTransformer:
 
             # Return the data processed so far
             return transformed_data
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        progress.finish()
 
         # Print summary of geocoding
         with_coords = sum(
             1 for item in transformed_data if item.get("latitude") is not None
         )
         print(f"Geocoding complete: {with_coords}/{total_items} items have coordinates")
+        precision_counts: Dict[str, int] = {}
+        for item in transformed_data:
+            if item.get("geo_precision"):
+                precision_counts[item["geo_precision"]] = (
+                    precision_counts.get(item["geo_precision"], 0) + 1
+                )
+        print(
+            "Coordinate precision: "
+            + ", ".join(f"{level}={count}" for level, count in precision_counts.items())
+            + f" ({self.centroid_lookups} addresses placed at a gazetteer centroid)"
+        )
+        print(
+            f"Provider lookups: {self.provider_lookups}, requests sent: {self.provider_requests}, "
+            f"requests per resolved address: {self.requests_per_resolved_address:.2f}"
+        )
+        for provider in self.providers:
+            stats = provider.stats()
+            print(
+                f"  - {provider.name}: {stats['hits']}/{stats['calls']} lookups answered, "
+                f"{stats['requests']} requests, {stats['rejected']} rejected outside the DF"
+            )
 
         return transformed_data
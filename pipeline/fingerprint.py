@@ -0,0 +1,94 @@
+import hashlib
+import math
+from typing import Any, Dict, List
+
+from pipeline.address_normalizer import canonicalize_address
+
+# Fields holding the listing URL, which identifies a listing on its own
+LINK_FIELDS = ["page_link", "link", "url"]
+
+# Attributes identifying a listing that has no URL. Only what doesn't change while a
+# listing is online: a new price is an edit of the same listing, not a new one.
+# Scrapers name some of them differently (size_m2, bedroom), both are hashed.
+IDENTITY_FIELDS = [
+    "data_source",
+    "contract_type",
+    "property_type",
+    "description",
+    "address",
+    "size",
+    "size_m2",
+    "bedrooms",
+    "bedroom",
+    "bathrooms",
+    "parking_spaces",
+    "car_spaces",
+]
+
+# Attributes hashed to detect changed listings
+CONTENT_FIELDS = IDENTITY_FIELDS + ["price"]
+
+
+def _normalize_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        # 350000.0 and 350000 are the same price
+        if value.is_integer():
+            return str(int(value))
+    if isinstance(value, str):
+        return canonicalize_address(value)
+    return str(value)
+
+
+def _attributes_identity(item: Dict[str, Any], fields: List[str]) -> str:
+    return "attrs|" + "|".join(_normalize_value(item.get(field)) for field in fields)
+
+
+def listing_fingerprint(item: Dict[str, Any]) -> str:
+    """
+    Stable identifier of a listing across runs.
+
+    Uses the listing URL when the scraper recorded one, otherwise a hash of its
+    IDENTITY_FIELDS, so an edited price keeps the fingerprint. Text is
+    canonicalized first, so whitespace, accents and casing differences between
+    scrapes don't change the fingerprint.
+
+    Returns:
+        Hex SHA-1 digest
+    """
+    for field in LINK_FIELDS:
+        link = item.get(field)
+        if isinstance(link, str) and link.strip():
+            identity = f"link|{link.strip()}"
+            break
+    else:
+        identity = _attributes_identity(item, IDENTITY_FIELDS)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def listing_content_hash(item: Dict[str, Any]) -> str:
+    """
+    Hash of the key attributes of a listing, whether or not it has a URL.
+    A listing whose fingerprint is unchanged but whose content hash differs was
+    edited (new price, size...) since it was last seen.
+
+    Returns:
+        Hex SHA-1 digest
+    """
+    identity = _attributes_identity(item, CONTENT_FIELDS)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def record_digest(item: Dict[str, Any]) -> bytes:
+    """
+    Digest of every field of a record exactly as it is, without canonicalizing
+    anything: equal for exact duplicates only, like comparing the records.
+    Unhashable values (lists, dicts) are fine.
+
+    Returns:
+        Binary SHA-1 digest (20 bytes)
+    """
+    return hashlib.sha1(repr(tuple(item.items())).encode("utf-8")).digest()
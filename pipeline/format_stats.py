@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pipeline.offline_geocoder import parse_address
+
+DEFAULT_STATS_PATH = os.path.join(Path(__file__).parent, "cache", "format_stats.json")
+
+
+def address_shape(address) -> str:
+    """
+    Coarse shape of an address, used to group format statistics.
+
+    Returns:
+        The grammar sector ("SQS", "SHIS", "QNM"...), "region" when only an RA name
+        was recognized, or "free" for anything else
+    """
+    parsed = parse_address(address)
+    if parsed is None:
+        return "free"
+    if parsed.sector:
+        return parsed.sector.split()[0]
+    return "region"
+
+
+class FormatStats:
+    """
+    Learns which address format of the geocoding cascade succeeds, per provider,
+    data source and address shape, and reorders the cascade accordingly.
+    """
+
+    def __init__(
+        self,
+        stats_path: str = None,
+        min_attempts: int = 20,
+        prune_below: float = 0.02,
+        explore_every: int = 50,
+        max_attempts: int = 200,
+    ):
+        """
+        Args:
+            stats_path: JSON file used to keep the statistics between runs (None keeps them in memory)
+            min_attempts: Attempts needed before a format can be pruned
+            prune_below: Success rate under which a format is dropped from the cascade
+            explore_every: Pruned formats are tried again (last) once every this many
+                cascades of their group, so a format that failed for a while can recover
+            max_attempts: Counts of a format are halved when its attempts reach this,
+                so old results weigh less than recent ones
+        """
+        self.stats_path = stats_path
+        self.min_attempts = min_attempts
+        self.prune_below = prune_below
+        self.explore_every = explore_every
+        self.max_attempts = max_attempts
+        # "provider|data_source|shape" -> format name -> [attempts, successes]
+        self.counts: Dict[str, Dict[str, List[int]]] = {}
+        # Cascades ordered per group during the run
+        self._orders: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if stats_path and os.path.exists(stats_path):
+            with open(stats_path, "r", encoding="utf-8") as f:
+                self.counts = json.load(f)
+
+    @staticmethod
+    def _group(provider: str, data_source: Optional[str], shape: str) -> str:
+        return f"{provider}|{data_source or 'unknown'}|{shape}"
+
+    def record(
+        self,
+        provider: str,
+        data_source: Optional[str],
+        shape: str,
+        format_name: str,
+        success: bool,
+    ) -> None:
+        """
+        Count one attempt of a format. Only attempts that got an answer (found or
+        not found) are counted; requests that failed with an error say nothing
+        about the format.
+        """
+        with self._lock:
+            group = self.counts.setdefault(
+                self._group(provider, data_source, shape), {}
+            )
+            attempts = group.setdefault(format_name, [0, 0])
+            attempts[0] += 1
+            if success:
+                attempts[1] += 1
+            if attempts[0] >= self.max_attempts:
+                attempts[0] //= 2
+                attempts[1] //= 2
+
+    def success_rate(
+        self, provider: str, data_source: Optional[str], shape: str, format_name: str
+    ) -> Tuple[float, int]:
+        """
+        Laplace-smoothed success rate of a format; untried formats score 0.5.
+
+        Returns:
+            Tuple (rate, attempts)
+        """
+        attempts, successes = self._attempts(provider, data_source, shape, format_name)
+        return (successes + 1) / (attempts + 2), attempts
+
+    def _attempts(
+        self, provider: str, data_source: Optional[str], shape: str, format_name: str
+    ) -> Tuple[int, int]:
+        with self._lock:
+            group = self.counts.get(self._group(provider, data_source, shape), {})
+            attempts, successes = group.get(format_name, [0, 0])
+        return attempts, successes
+
+    def order(
+        self,
+        formats: List[Tuple[str, str]],
+        provider: str,
+        data_source: Optional[str],
+        shape: str,
+    ) -> List[Tuple[str, str]]:
+        """
+        Reorder a cascade by learned success rate and prune formats that keep failing.
+        Every explore_every-th cascade of a group keeps its pruned formats, last.
+
+        Args:
+            formats: List of (format_name, query) in the default order
+
+        Returns:
+            The formats to try, best first. Never empty if formats isn't.
+        """
+        group = self._group(provider, data_source, shape)
+        with self._lock:
+            self._orders[group] = self._orders.get(group, 0) + 1
+            explore = self._orders[group] % self.explore_every == 0
+
+        scored = []
+        for position, (format_name, query) in enumerate(formats):
+            attempts, successes = self._attempts(
+                provider, data_source, shape, format_name
+            )
+            rate = (successes + 1) / (attempts + 2)
+            # Pruned on the observed rate, the smoothed one of a format that never
+            # succeeded stays above prune_below for 1 / prune_below attempts
+            pruned = (
+                attempts >= self.min_attempts
+                and successes / attempts < self.prune_below
+            )
+            scored.append((pruned, -rate, position, format_name, query))
+
+        scored.sort()
+        kept = [
+            (name, query)
+            for pruned, _, _, name, query in scored
+            if explore or not pruned
+        ]
+        return kept or [(scored[0][3], scored[0][4])]
+
+    def save(self) -> None:
+        """Write the statistics to stats_path, if one was given."""
+        if not self.stats_path:
+            return
+        stats_dir = os.path.dirname(self.stats_path)
+        if stats_dir:
+            os.makedirs(stats_dir, exist_ok=True)
+        with self._lock:
+            with open(self.stats_path, "w", encoding="utf-8") as f:
+                json.dump(self.counts, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from pipeline.address_normalizer import canonicalize_address
+
+DEFAULT_CACHE_PATH = os.path.join(
+    Path(__file__).parent, "cache", "geocode_cache.sqlite"
+)
+
+# Found addresses rarely move, "not found" answers are worth re-checking sooner
+DEFAULT_HIT_TTL = 180 * 24 * 60 * 60
+DEFAULT_MISS_TTL = 14 * 24 * 60 * 60
+
+
+class GeocodeCache:
+    """
+    Disk-backed cache of geocoding results keyed on the normalized address string.
+    Stores both successful lookups and "not found" answers, each with its own TTL.
+    """
+
+    def __init__(
+        self,
+        db_path: str = None,
+        hit_ttl: float = DEFAULT_HIT_TTL,
+        miss_ttl: float = DEFAULT_MISS_TTL,
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite file, defaults to pipeline/cache/geocode_cache.sqlite
+            hit_ttl: Seconds a found coordinate stays valid
+            miss_ttl: Seconds a "not found" answer stays valid
+        """
+        self.db_path = db_path or DEFAULT_CACHE_PATH
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # A single connection shared between threads, guarded by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                address_key TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                provider TEXT,
+                created_at REAL NOT NULL
+            )
+            """)
+        self._conn.commit()
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """Build the cache key from the canonical form of the address."""
+        return canonicalize_address(address)
+
+    def get(self, address: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """
+        Look up an address.
+
+        Returns:
+            Tuple (cached, coordinates). cached is False when there is no valid
+            entry; coordinates is None for a cached "not found" answer.
+        """
+        key = self.normalize_address(address)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, created_at FROM geocode_cache WHERE address_key = ?",
+                (key,),
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        latitude, longitude, created_at = row
+        ttl = self.miss_ttl if latitude is None else self.hit_ttl
+        if time.time() - created_at > ttl:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        if latitude is None:
+            return True, None
+        return True, (latitude, longitude)
+
+    def set(
+        self,
+        address: str,
+        coordinates: Optional[Tuple[float, float]],
+        provider: str = None,
+    ) -> None:
+        """Store a lookup result. Pass coordinates=None to record a "not found" answer."""
+        key = self.normalize_address(address)
+        latitude, longitude = coordinates if coordinates else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?, ?, ?)",
+                (key, latitude, longitude, provider, time.time()),
+            )
+            self._conn.commit()
+
+    def iter_hits(self) -> Iterator[Tuple[str, float, float]]:
+        """Yield (address_key, latitude, longitude) for every found address."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address_key, latitude, longitude FROM geocode_cache WHERE latitude IS NOT NULL"
+            ).fetchall()
+        yield from rows
+
+    def purge_expired(self) -> int:
+        """Delete entries whose TTL has elapsed and return how many were removed."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM geocode_cache
+                WHERE (latitude IS NULL AND created_at < ?)
+                   OR (latitude IS NOT NULL AND created_at < ?)
+                """,
+                (now - self.miss_ttl, now - self.hit_ttl),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def export_to_file(self, file_path: str) -> int:
+        """
+        Export every entry to a JSON Lines file so it can be copied to another machine.
+
+        Returns:
+            Number of exported entries
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address_key, latitude, longitude, provider, created_at FROM geocode_cache"
+            ).fetchall()
+
+        with open(file_path, "w", encoding="utf-8") as f:
+            for address_key, latitude, longitude, provider, created_at in rows:
+                entry = {
+                    "address_key": address_key,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "provider": provider,
+                    "created_at": created_at,
+                }
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        print(f"Exported {len(rows)} geocode cache entries to {file_path}")
+        return len(rows)
+
+    def import_from_file(self, file_path: str) -> int:
+        """
+        Import entries from a JSON Lines file written by export_to_file.
+        An imported entry only replaces an existing one if it is newer.
+
+        Returns:
+            Number of entries inserted or updated
+        """
+        imported = 0
+        with open(file_path, "r", encoding="utf-8") as f, self._lock:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO geocode_cache VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(address_key) DO UPDATE SET
+                        latitude = excluded.latitude,
+                        longitude = excluded.longitude,
+                        provider = excluded.provider,
+                        created_at = excluded.created_at
+                    WHERE excluded.created_at > geocode_cache.created_at
+                    """,
+                    (
+                        entry["address_key"],
+                        entry.get("latitude"),
+                        entry.get("longitude"),
+                        entry.get("provider"),
+                        entry["created_at"],
+                    ),
+                )
+                imported += cursor.rowcount
+            self._conn.commit()
+
+        print(f"Imported {imported} geocode cache entries from {file_path}")
+        return imported
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Export, import or purge the persistent geocoding cache"
+    )
+    parser.add_argument("action", choices=["export", "import", "purge"])
+    parser.add_argument("file", nargs="?", help="JSON Lines file to export/import")
+    parser.add_argument(
+        "--db", default=None, help=f"Cache database (default: {DEFAULT_CACHE_PATH})"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    cache = GeocodeCache(args.db)
+
+    if args.action == "export":
+        cache.export_to_file(args.file or "geocode_cache.jsonl")
+    elif args.action == "import":
+        if not args.file:
+            print("ERROR: import requires a file")
+            return
+        cache.import_from_file(args.file)
+    else:
+        print(f"Removed {cache.purge_expired()} expired entries")
+
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+import os
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from geopy.adapters import RequestsAdapter
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+from geopy.geocoders import GoogleV3, Nominatim
+
+from pipeline.format_stats import FormatStats, address_shape
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.offline_geocoder import OfflineGeocoder
+from pipeline.rate_limiter import TokenBucket
+from pipeline.spatial import is_within_df
+
+# Requests per second allowed by each provider. Nominatim's usage policy caps
+# clients at 1 rps; Google allows far more, tune it to the project's quota.
+DEFAULT_RATE_LIMITS = {"nominatim": 1.0, "google": 10.0}
+
+
+class GeocodeResult(NamedTuple):
+    """Answer of one provider in the chain."""
+
+    coordinates: Optional[Tuple[float, float]]
+    # A request failed for a technical reason (timeout, quota, missing key...)
+    errored: bool = False
+    # Stop the chain even without coordinates (a cached "not found")
+    final: bool = False
+    # "exact" for geocoder answers, or the gazetteer level ("bloco", "quadra"...)
+    precision: str = "exact"
+
+
+class GeocodingProvider:
+    """
+    A link of the geocoding provider chain.
+    Subclasses implement _geocode; concurrency and request quota are enforced here.
+    """
+
+    name = "provider"
+    # Results of remote providers are written to the cache
+    remote = False
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        quota: Optional[int] = None,
+        validate_results: bool = True,
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            max_concurrency: Most lookups allowed to run at once (None for unlimited)
+            quota: Most provider requests allowed during the run (None for unlimited)
+            validate_results: Discard coordinates that fall outside the DF
+            verbose: Print every request and its outcome (errors are always printed)
+        """
+        self.max_concurrency = max_concurrency
+        self.quota = quota
+        self.validate_results = validate_results
+        self.verbose = verbose
+        self._semaphore = (
+            threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.requests = 0
+        # Results discarded for falling outside the DF
+        self.rejected = 0
+
+    def geocode(self, address: str, data_source: Optional[str] = None) -> GeocodeResult:
+        """Resolve an address, honoring the provider's concurrency limit."""
+        with self._lock:
+            self.calls += 1
+
+        if self._semaphore is None:
+            result = self._geocode(address, data_source)
+        else:
+            with self._semaphore:
+                result = self._geocode(address, data_source)
+
+        if (
+            result.coordinates
+            and self.validate_results
+            and not is_within_df(result.coordinates)
+        ):
+            # Remote providers already reject these inside their cascade; this catches
+            # cache entries and gazetteer rows written before validation existed
+            if self.verbose:
+                print(f"Discarding {self.name} result outside the DF for '{address}'")
+            with self._lock:
+                self.rejected += 1
+            return GeocodeResult(None, errored=result.errored)
+
+        if result.coordinates:
+            with self._lock:
+                self.hits += 1
+        return result
+
+    def _geocode(self, address: str, data_source: Optional[str]) -> GeocodeResult:
+        raise NotImplementedError
+
+    def quota_exhausted(self) -> bool:
+        return self.quota is not None and self.requests >= self.quota
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "requests": self.requests,
+            "rejected": self.rejected,
+        }
+
+
+class OfflineProvider(GeocodingProvider):
+    """Gazetteer lookups, see pipeline.offline_geocoder."""
+
+    name = "offline"
+
+    def __init__(self, offline_geocoder: OfflineGeocoder, **kwargs):
+        super().__init__(**kwargs)
+        self.offline_geocoder = offline_geocoder
+
+    def _geocode(self, address: str, data_source: Optional[str]) -> GeocodeResult:
+        resolved = self.offline_geocoder.resolve(address)
+        if resolved is None:
+            return GeocodeResult(None)
+        latitude, longitude, precision = resolved
+        return GeocodeResult((latitude, longitude), precision=precision)
+
+
+class CacheProvider(GeocodingProvider):
+    """Previously resolved lookups, see pipeline.geocode_cache."""
+
+    name = "cache"
+
+    def __init__(self, cache: GeocodeCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def _geocode(self, address: str, data_source: Optional[str]) -> GeocodeResult:
+        cached, coordinates = self.cache.get(address)
+        return GeocodeResult(coordinates, final=cached)
+
+
+class RemoteProvider(GeocodingProvider):
+    """
+    Online geocoder behind a token-bucket rate limiter, with a long-lived pooled client
+    and the adaptive address-format cascade.
+    """
+
+    remote = True
+    label = "Geocoding"
+    retry_errors: Tuple[type, ...] = (GeocoderTimedOut, GeocoderServiceError)
+    retry_delay = 2.0
+
+    def __init__(
+        self,
+        rate_limit: Optional[float] = None,
+        format_stats: Optional[FormatStats] = None,
+        pool_size: int = 1,
+        max_retries: int = 2,
+        **kwargs,
+    ):
+        """
+        Args:
+            rate_limit: Requests per second, defaults to DEFAULT_RATE_LIMITS
+            format_stats: Shared format statistics (a private in-memory one if None)
+            pool_size: Connections kept alive in the HTTP pool, usually the worker count
+            max_retries: Attempts per format on technical errors (1 disables the retry)
+        """
+        super().__init__(**kwargs)
+        self.max_retries = max_retries
+        rate = rate_limit or DEFAULT_RATE_LIMITS.get(self.name, 1.0)
+        self.rate_limiter = TokenBucket(rate)
+        self.format_stats = format_stats or FormatStats()
+        self.pool_size = max(1, pool_size)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _adapter_factory(self):
+        return partial(RequestsAdapter, pool_connections=1, pool_maxsize=self.pool_size)
+
+    def _create_client(self):
+        raise NotImplementedError
+
+    def get_client(self):
+        """
+        Return the long-lived geolocator, creating it on first use.
+        It owns a pooled requests session, so keep-alive connections are reused
+        across the address-format cascade and across worker threads.
+        """
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+
+    def address_formats(self, address: str) -> List[Tuple[str, str]]:
+        """Default order of the (format_name, query) cascade."""
+        return [
+            # Full context
+            ("full_context", f"{address}, Brasília, DF, Brazil"),
+            # Just the city and country
+            ("city_country", f"{address}, Brasília, Brazil"),
+            # Just the address
+            ("raw", address),
+        ]
+
+    def _request(self, geolocator, query: str):
+        """Send a single geocoding request, waiting for the rate limiter."""
+        self.rate_limiter.acquire()
+        with self._lock:
+            self.requests += 1
+        return geolocator.geocode(query)
+
+    def _geocode(self, address: str, data_source: Optional[str]) -> GeocodeResult:
+        return self.cascade(address, data_source, self.max_retries)
+
+    def cascade(
+        self,
+        address: str,
+        data_source: Optional[str] = None,
+        max_retries: int = 2,
+    ) -> GeocodeResult:
+        """
+        Try each address format until one resolves, in the order learned by format_stats.
+        """
+        if self.quota_exhausted():
+            return GeocodeResult(None, errored=True)
+
+        geolocator = self.get_client()
+        shape = address_shape(address)
+        ordered_formats = self.format_stats.order(
+            self.address_formats(address), self.name, data_source, shape
+        )
+
+        had_errors = False
+        for format_idx, (format_name, full_address) in enumerate(ordered_formats):
+            if self.quota_exhausted():
+                print(f"{self.label} quota of {self.quota} requests reached")
+                return GeocodeResult(None, errored=True)
+
+            if self.verbose:
+                print(
+                    f"{self.label} (format {format_idx+1}/{len(ordered_formats)}, {format_name}): {full_address}"
+                )
+
+            location = None
+            errored = False
+            try:
+                # Single attempt for each format with no retries for not found addresses
+                location = self._request(geolocator, full_address)
+                if not location and self.verbose:
+                    print(
+                        f"No location found for '{full_address}', trying next format..."
+                    )
+
+            except self.retry_errors as e:
+                # Only retry for technical errors, not for "not found"
+                had_errors = errored = True
+                if max_retries > 1:
+                    print(f"{self.label} error: {e}, retrying once...")
+                    time.sleep(self.retry_delay)  # Wait before retry
+                    try:
+                        location = self._request(geolocator, full_address)
+                    except Exception:
+                        pass
+                if not location:
+                    print(f"Error geocoding address '{full_address}': {e}")
+
+            if (
+                location
+                and self.validate_results
+                and not is_within_df((location.latitude, location.longitude))
+            ):
+                # Usually the bare-address fallback matching a homonym in another state
+                if self.verbose:
+                    print(
+                        f"Rejected {location.latitude}, {location.longitude} outside the DF "
+                        f"for '{full_address}', trying next format..."
+                    )
+                with self._lock:
+                    self.rejected += 1
+                location = None
+
+            if location or not errored:
+                # Errors say nothing about how well the format works
+                self.format_stats.record(
+                    self.name, data_source, shape, format_name, bool(location)
+                )
+
+            if location:
+                if self.verbose:
+                    print(
+                        f"Found location: {location.address} at {location.latitude}, {location.longitude}"
+                    )
+                return GeocodeResult((location.latitude, location.longitude))
+
+        if self.verbose:
+            print(f"Failed to geocode address with {self.name}: {address}")
+        return GeocodeResult(None, errored=had_errors)
+
+
+class NominatimProvider(RemoteProvider):
+    """OpenStreetMap Nominatim (free service, 1 rps usage policy)."""
+
+    name = "nominatim"
+    retry_delay = 2.2
+
+    def __init__(self, domain: str = None, scheme: str = None, **kwargs):
+        """
+        Args:
+            domain: Alternative Nominatim host, e.g. the local stand-in server
+            scheme: "http" or "https"
+        """
+        super().__init__(**kwargs)
+        self.domain = domain
+        self.scheme = scheme
+
+    def _create_client(self):
+        options: Dict[str, Any] = {}
+        if self.domain:
+            options["domain"] = self.domain
+        if self.scheme:
+            options["scheme"] = self.scheme
+        return Nominatim(
+            user_agent="house_price_project",
+            adapter_factory=self._adapter_factory(),
+            **options,
+        )
+
+    def address_formats(self, address: str) -> List[Tuple[str, str]]:
+        address_formats = super().address_formats(address)
+        parts = address.split(", ")
+        if len(parts) > 1:
+            # First and last part only, usually the quadra and the neighborhood
+            address_formats.append(
+                ("simplified", f"{parts[0]}, {parts[-1]}, Brasília, Brazil")
+            )
+        return address_formats
+
+
+class GoogleProvider(RemoteProvider):
+    """Google Maps Geocoding API (requires GOOGLE_MAPS_API_KEY)."""
+
+    name = "google"
+    label = "Google Geocoding"
+    retry_errors = (Exception,)
+
+    def __init__(self, api_key: str = None, **kwargs):
+        super().__init__(**kwargs)
+        # API key is read from the environment once, when the provider is created
+        self.api_key = api_key or os.environ.get("GOOGLE_MAPS_API_KEY")
+
+    def _create_client(self):
+        return GoogleV3(api_key=self.api_key, adapter_factory=self._adapter_factory())
+
+    def cascade(
+        self,
+        address: str,
+        data_source: Optional[str] = None,
+        max_retries: int = 2,
+    ) -> GeocodeResult:
+        if not self.api_key:
+            print("Error: GOOGLE_MAPS_API_KEY not found in environment variables")
+            return GeocodeResult(None, errored=True)
+        return super().cascade(address, data_source, max_retries)
+
+
+REMOTE_PROVIDERS = {
+    NominatimProvider.name: NominatimProvider,
+    GoogleProvider.name: GoogleProvider,
+}
+
+
+def build_provider_chain(
+    services: List[str],
+    cache: Optional[GeocodeCache] = None,
+    offline_geocoder: Optional[OfflineGeocoder] = None,
+    format_stats: Optional[FormatStats] = None,
+    workers: int = 1,
+    rate_limits: Optional[Dict[str, float]] = None,
+    quotas: Optional[Dict[str, int]] = None,
+    concurrency: Optional[Dict[str, int]] = None,
+    verbose: bool = False,
+) -> List[GeocodingProvider]:
+    """
+    Build the ordered fallback chain: offline index, then cache, then the remote
+    services in the given order (e.g. ["nominatim", "google"]).
+
+    Args:
+        services: Remote provider names, tried in order
+        rate_limits: Requests per second per provider name
+        quotas: Request quota per provider name
+        concurrency: Concurrent lookups per provider name
+        verbose: Print every request of the remote providers
+    """
+    rate_limits = rate_limits or {}
+    quotas = quotas or {}
+    concurrency = concurrency or {}
+
+    chain: List[GeocodingProvider] = []
+    if offline_geocoder is not None:
+        chain.append(OfflineProvider(offline_geocoder))
+    if cache is not None:
+        chain.append(CacheProvider(cache))
+
+    for service in services:
+        provider_class = REMOTE_PROVIDERS.get(service)
+        if provider_class is None:
+            raise ValueError(f"Unknown geocoding service: {service}")
+        chain.append(
+            provider_class(
+                rate_limit=rate_limits.get(service),
+                format_stats=format_stats,
+                pool_size=workers,
+                quota=quotas.get(service),
+                max_concurrency=concurrency.get(service),
+                verbose=verbose,
+            )
+        )
+
+    return chain
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+from pipeline.fingerprint import listing_content_hash, listing_fingerprint
+from pipeline.processed_ledger import FINGERPRINT_FIELD
+
+
+class ListingStore:
+    """
+    Every listing seen by the previous runs, with the hash of its content, so a run
+    can process only the listings added or changed since, and mark the ones that
+    disappeared from the scraped data as delisted.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the listing store.
+
+        Args:
+            db_path: Path to the SQLite file, usually next to the output files
+        """
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                fingerprint TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                contract_type TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                delisted_at REAL
+            )
+            """)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        """Number of listings that are still listed."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM listings WHERE delisted_at IS NULL"
+            ).fetchone()[0]
+
+    def compare(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare the current listings with the ones recorded by the previous runs.
+
+        Args:
+            items: Every listing of the current scrape, with their fingerprint
+
+        Returns:
+            Dictionary with the added and changed listings ("added", "changed"),
+            the number of unchanged ones ("unchanged") and the fingerprints of the
+            listings that are gone ("removed"). A delisted listing that shows up
+            again counts as changed.
+        """
+        with self._lock:
+            known = {
+                fingerprint: (content_hash, delisted_at)
+                for fingerprint, content_hash, delisted_at in self._conn.execute(
+                    "SELECT fingerprint, content_hash, delisted_at FROM listings"
+                )
+            }
+
+        added, changed = [], []
+        unchanged = 0
+        seen = set()
+        for item in items:
+            fingerprint = item.get(FINGERPRINT_FIELD) or listing_fingerprint(item)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+
+            previous = known.get(fingerprint)
+            if previous is None:
+                added.append(item)
+            elif previous[1] is not None or previous[0] != listing_content_hash(item):
+                # Edited since the last run, or listed again after being delisted
+                changed.append(item)
+            else:
+                unchanged += 1
+
+        removed = [
+            fingerprint
+            for fingerprint, (_, delisted_at) in known.items()
+            if delisted_at is None and fingerprint not in seen
+        ]
+        return {
+            "added": added,
+            "changed": changed,
+            "unchanged": unchanged,
+            "removed": sorted(removed),
+        }
+
+    def record(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Record listings as seen in this run, in a single transaction."""
+        now = time.time()
+        rows = [
+            (
+                item.get(FINGERPRINT_FIELD) or listing_fingerprint(item),
+                listing_content_hash(item),
+                item.get("contract_type"),
+                now,
+                now,
+            )
+            for item in items
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO listings VALUES (?, ?, ?, ?, ?, NULL)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    contract_type = excluded.contract_type,
+                    last_seen = excluded.last_seen,
+                    delisted_at = NULL
+                """,
+                rows,
+            )
+
+    def mark_delisted(self, fingerprints: Iterable[str]) -> None:
+        """Flag listings that are no longer in the scraped data."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE listings SET delisted_at = ? "
+                "WHERE fingerprint = ? AND delisted_at IS NULL",
+                [(now, fingerprint) for fingerprint in fingerprints],
+            )
+
+    def delisted(self) -> List[Dict[str, Any]]:
+        """Every listing marked as delisted, most recent first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT fingerprint, contract_type, first_seen, last_seen, delisted_at "
+                "FROM listings WHERE delisted_at IS NOT NULL "
+                "ORDER BY delisted_at DESC"
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def clear(self) -> None:
+        """Forget every listing, for a full run."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listings")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
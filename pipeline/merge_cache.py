@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (needed by DataFrame.to_parquet)
+except ImportError:  # Snapshots are pickled instead
+    pyarrow = None
+
+DEFAULT_MERGE_CACHE_DIR = os.path.join(Path(__file__).parent, "cache", "merge")
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash of a file's content, read chunk_size bytes at a time."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn None cells of text columns into NaN, like pandas' parsers leave them.
+    Parquet and openpyxl give missing text back as None, which the cleaning rules
+    treat as empty where a parsed file had NaN.
+    """
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+class MergeCache:
+    """
+    Parsed snapshots of the scraper files, so a merge only re-parses the files
+    added or changed since the previous one.
+
+    A manifest records each source file's path, size, mtime and content hash with
+    the snapshot of its parsed frame (Parquet when pyarrow is installed, a pickle
+    otherwise). Unchanged size and mtime reuse the snapshot without reading the
+    file; a file that was only touched is recognized by its hash.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Args:
+            cache_dir: Folder of the manifest and snapshots, defaults to
+                pipeline/cache/merge
+        """
+        self.cache_dir = cache_dir or DEFAULT_MERGE_CACHE_DIR
+        self.manifest_path = os.path.join(self.cache_dir, MANIFEST_NAME)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable merge manifest {self.manifest_path}: {e}")
+
+    def load(self, path: str, read_file: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Parsed frame of a source file, from its snapshot when the file is unchanged.
+
+        Args:
+            path: Source file
+            read_file: Parser used when the file is new or changed
+        """
+        df = self.get(path)
+        if df is None:
+            # Hashed before parsing: an edit in between is caught by the next run
+            stat, sha256 = os.stat(path), file_sha256(path)
+            df = read_file(path)
+            self.put(path, df, stat, sha256)
+        return df
+
+    def get(self, path: str) -> Optional[pd.DataFrame]:
+        """Snapshot of a source file, or None when it is new or changed."""
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self.manifest.get(key)
+
+        if entry is not None:
+            unchanged = (
+                entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+            )
+            if not unchanged and entry["size"] == stat.st_size:
+                # Touched (copied, checked out...) but maybe not edited
+                unchanged = entry["sha256"] == file_sha256(path)
+                if unchanged:
+                    with self._lock:
+                        entry["mtime_ns"] = stat.st_mtime_ns
+                        self._dirty = True
+            if unchanged:
+                df = self._read_snapshot(entry["snapshot"])
+                if df is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return df
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self, path: str, df: pd.DataFrame, stat: os.stat_result, sha256: str
+    ) -> None:
+        """
+        Store the parsed frame of a source file.
+
+        Args:
+            stat: os.stat of the file and sha256 its hash, both taken before parsing
+        """
+        snapshot = self._write_snapshot(df, sha256)
+        with self._lock:
+            self.manifest[os.path.abspath(path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256,
+                "snapshot": snapshot,
+            }
+            self._dirty = True
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _read_snapshot(self, name: str) -> Optional[pd.DataFrame]:
+        path = self._snapshot_path(name)
+        try:
+            if name.endswith(".parquet"):
+                return restore_missing(pd.read_parquet(path))
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            # Missing, corrupted or written by an incompatible version: re-parse
+            print(f"Ignoring merge cache snapshot {name}: {e}")
+            return None
+
+    def _write_snapshot(self, df: pd.DataFrame, sha256: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if pyarrow is not None:
+            name = f"{sha256}.parquet"
+            try:
+                self._write_atomically(name, lambda f: df.to_parquet(f, index=False))
+                return name
+            except Exception as e:
+                # Mixed-type columns can't be stored as Parquet
+                print(f"Pickling the snapshot instead of Parquet: {e}")
+        name = f"{sha256}.pkl"
+        self._write_atomically(
+            name, lambda f: pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+        return name
+
+    def _write_atomically(self, name: str, write: Callable[[Any], None]) -> None:
+        path = self._snapshot_path(name)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    def save(self) -> None:
+        """
+        Write the manifest, forgetting files that no longer exist, and delete the
+        snapshots it no longer references.
+        """
+        with self._lock:
+            for key in [key for key in self.manifest if not os.path.exists(key)]:
+                del self.manifest[key]
+                self._dirty = True
+            if not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{self.manifest_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.manifest_path)
+            self._dirty = False
+
+            referenced = {entry["snapshot"] for entry in self.manifest.values()}
+            for name in os.listdir(self.cache_dir):
+                if name != MANIFEST_NAME and name not in referenced:
+                    os.remove(self._snapshot_path(name))
+
+    def clear(self) -> None:
+        """Forget every snapshot."""
+        with self._lock:
+            self.manifest = {}
+            self._dirty = True
+        self.save()
@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from pipeline.data_transform import DataTransformer
+from pipeline.geocoding_providers import NominatimProvider
+
+# Box inside the outline of the Distrito Federal (pipeline.spatial.DF_BOUNDARY), where
+# the stub places its answers so none of them is rejected as being outside the DF
+DF_BOUNDS = {"lat": (-16.00, -15.55), "lon": (-48.15, -47.45)}
+
+
+class StubNominatimHandler(BaseHTTPRequestHandler):
+    """Answers /search like Nominatim's JSON API, with artificial latency and failures."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") != "/search":
+            self.send_error(404)
+            return
+
+        query = parse_qs(parsed.query).get("q", [""])[0]
+        self.server.count_request()
+
+        time.sleep(self.server.latency * random.uniform(0.5, 1.5))
+
+        if random.random() < self.server.failure_rate:
+            self.send_error(503, "Service Unavailable")
+            return
+
+        # Deterministic per query, so repeated runs see the same answers
+        digest = hashlib.md5(query.encode("utf-8")).digest()
+        results: List[Dict[str, Any]] = []
+        if digest[0] / 255 >= self.server.not_found_rate:
+            lat_min, lat_max = DF_BOUNDS["lat"]
+            lon_min, lon_max = DF_BOUNDS["lon"]
+            latitude = lat_min + (lat_max - lat_min) * digest[1] / 255
+            longitude = lon_min + (lon_max - lon_min) * digest[2] / 255
+            results.append(
+                {
+                    "place_id": int.from_bytes(digest[:4], "big"),
+                    "lat": f"{latitude:.6f}",
+                    "lon": f"{longitude:.6f}",
+                    "display_name": query,
+                }
+            )
+
+        body = json.dumps(results).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+
+class StubNominatimServer(ThreadingHTTPServer):
+    """Local stand-in for Nominatim, for benchmarks and CI runs without real services."""
+
+    daemon_threads = True
+    # Let keep-alive connections from the client pool reuse the same handler
+    protocol_version = "HTTP/1.1"
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        failure_rate: float = 0.0,
+        not_found_rate: float = 0.2,
+    ):
+        """
+        Args:
+            port: 0 picks a free port, see the `domain` property
+            latency: Mean seconds before answering a request
+            failure_rate: Fraction of requests answered with HTTP 503
+            not_found_rate: Fraction of queries answered with an empty result
+        """
+        StubNominatimHandler.protocol_version = self.protocol_version
+        super().__init__((host, port), StubNominatimHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.not_found_rate = not_found_rate
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests_served += 1
+
+    @property
+    def domain(self) -> str:
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+
+def start_stub_server(**kwargs) -> StubNominatimServer:
+    """Start a stub server on a background thread and return it."""
+    server = StubNominatimServer(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_benchmark(
+    addresses: int = 200,
+    workers_list: List[int] = None,
+    latency: float = 0.05,
+    failure_rate: float = 0.0,
+    rate_limit: float = 1000.0,
+) -> List[Dict[str, float]]:
+    """
+    Geocode synthetic addresses against the stub at several concurrency levels.
+
+    Returns:
+        One result dictionary per worker count
+    """
+    workers_list = workers_list or [1, 4, 16]
+    server = start_stub_server(latency=latency, failure_rate=failure_rate)
+    data_template = [
+        {"description": f"SQS {100 + i % 17}{i // 17:02d} Bloco {chr(65 + i % 8)}"}
+        for i in range(addresses)
+    ]
+
+    results = []
+    try:
+        for workers in workers_list:
+            provider = NominatimProvider(
+                domain=server.domain,
+                scheme="http",
+                rate_limit=rate_limit,
+                pool_size=workers,
+                max_retries=1,
+            )
+            transformer = DataTransformer(
+                [dict(item) for item in data_template],
+                workers=workers,
+                providers=[provider],
+                # Count only what the stand-in actually resolved
+                centroid_fallback=False,
+            )
+
+            served_before = server.requests_served
+            start_time = time.time()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                transformed = transformer.add_coordinates_to_data("description")
+            elapsed_time = time.time() - start_time
+
+            resolved = sum(1 for item in transformed if item["latitude"] is not None)
+            result = {
+                "workers": workers,
+                "addresses": addresses,
+                "seconds": elapsed_time,
+                "lookups_per_second": addresses / elapsed_time if elapsed_time else 0,
+                "requests": server.requests_served - served_before,
+                "resolved": resolved,
+            }
+            results.append(result)
+            print(
+                f"workers={workers:>3}  {elapsed_time:7.2f}s  "
+                f"{result['lookups_per_second']:8.1f} lookups/s  "
+                f"{result['requests']} requests  {resolved}/{addresses} resolved"
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Local Nominatim stand-in and geocoding throughput benchmark"
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the stand-in server")
+    serve_parser.add_argument("--port", type=int, default=8088)
+
+    bench_parser = subparsers.add_parser(
+        "benchmark", help="Measure geocoding throughput against the stand-in"
+    )
+    bench_parser.add_argument("--addresses", type=int, default=200)
+    bench_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    bench_parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=1000.0,
+        help="Requests per second allowed by the token bucket",
+    )
+
+    for sub in (serve_parser, bench_parser):
+        sub.add_argument("--latency", type=float, default=0.05)
+        sub.add_argument("--failure-rate", type=float, default=0.0)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    if args.action == "serve":
+        server = StubNominatimServer(
+            port=args.port, latency=args.latency, failure_rate=args.failure_rate
+        )
+        print(f"Stub Nominatim listening on http://{server.domain}/search")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        run_benchmark(
+            addresses=args.addresses,
+            workers_list=args.workers,
+            latency=args.latency,
+            failure_rate=args.failure_rate,
+            rate_limit=args.rate_limit,
+        )
+
+
+if __name__ == "__main__":
+    main()
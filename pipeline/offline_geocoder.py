@@ -0,0 +1,312 @@
+import argparse
+import csv
+import os
+import re
+import statistics
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pipeline.address_normalizer import canonicalize_address
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.regions import match_region, region_key
+
+DEFAULT_GAZETTEER_PATH = os.path.join(Path(__file__).parent, "data", "df_gazetteer.csv")
+# Quadra and bloco entries learned from the geocode cache, kept apart from the bundled
+# gazetteer so harvesting never rewrites a tracked file
+DEFAULT_HARVESTED_PATH = os.path.join(
+    Path(__file__).parent, "cache", "gazetteer_harvested.csv"
+)
+GAZETTEER_COLUMNS = ["key", "latitude", "longitude", "precision", "name"]
+
+# From most to least precise
+PRECISION_LEVELS = ["bloco", "quadra", "sector", "ra"]
+
+# Sectors whose name alone pins down the neighbourhood (Plano Piloto and the Lagos)
+SELF_LOCATING_SECTORS = {"SQS", "SQN", "SQSW", "SQNW", "SHIS", "SHIN"}
+
+# Residential quadra prefixes used across the satellite RAs; they repeat between
+# regions (QI 5 exists in Guará, Taguatinga, Sobradinho...), so they need the region
+# fmt: off
+REGIONAL_QUADRA_TYPES = [
+    "QI", "QL", "QE", "QR", "QS", "QN", "QNM", "QNN", "QNL", "QND", "QNA",
+    "QNB", "QNC", "QNE", "QNF", "QNG", "QNH", "QNJ", "QNO", "QNP", "QNQ",
+    "QNR", "QSA", "QSB", "QSC", "QSD", "QSE", "QSF",
+]
+# fmt: on
+
+SUPERQUADRA_PATTERN = re.compile(
+    r"\b(SQS|SQN|SQSW|SQNW)\s+(\d{3})\b(?:\s+(BL\s+[A-Z0-9]+))?"
+)
+LAGO_PATTERN = re.compile(
+    r"\b(SHIS|SHIN)\s+(QI|QL)\s+(\d{1,2})\b(?:\s+(CJ\s+[A-Z0-9]+))?"
+)
+REGIONAL_PATTERN = re.compile(
+    r"\b(" + "|".join(REGIONAL_QUADRA_TYPES) + r")\s+(\d{1,3})\b"
+    r"(?:\s+((?:CJ|BL)\s+[A-Z0-9]+))?"
+)
+
+
+class ParsedAddress(NamedTuple):
+    """Structured form of a Brasília grammar address."""
+
+    sector: Optional[str]  # "SQS", "SHIS QI", "QNM"...
+    quadra: Optional[str]  # "308", "5"
+    block: Optional[str]  # "BL C", "CJ 3"
+    region: Optional[str]  # RA label from pipeline.regions
+
+
+def parse_address(address) -> Optional[ParsedAddress]:
+    """
+    Parse the Plano Piloto grammar (SQN/SQS/SHIN/SHIS/QI/QL + number + bloco/conjunto)
+    and the RA name from an address.
+
+    Returns:
+        ParsedAddress, or None if neither a quadra nor a region could be recognized
+    """
+    text = canonicalize_address(address)
+    if not text:
+        return None
+
+    region = match_region(text)
+
+    match = SUPERQUADRA_PATTERN.search(text)
+    if match:
+        return ParsedAddress(match.group(1), match.group(2), match.group(3), region)
+
+    match = LAGO_PATTERN.search(text)
+    if match:
+        sector = f"{match.group(1)} {match.group(2)}"
+        return ParsedAddress(sector, match.group(3), match.group(4), region)
+
+    match = REGIONAL_PATTERN.search(text)
+    if match and region:
+        return ParsedAddress(match.group(1), match.group(2), match.group(3), region)
+
+    if region:
+        return ParsedAddress(None, None, None, region)
+    return None
+
+
+def candidate_keys(parsed: ParsedAddress) -> List[Tuple[str, str]]:
+    """
+    Gazetteer keys for a parsed address, from most to least precise.
+
+    Returns:
+        List of (key, precision) tuples
+    """
+    keys = []
+
+    if parsed.sector and parsed.quadra:
+        top_sector = parsed.sector.split()[0]
+        if top_sector in SELF_LOCATING_SECTORS:
+            prefix = parsed.sector
+        else:
+            prefix = f"{canonicalize_address(parsed.region)} {parsed.sector}"
+
+        quadra_key = f"{prefix} {parsed.quadra}"
+        if parsed.block:
+            keys.append((f"{quadra_key} {parsed.block}", "bloco"))
+        keys.append((quadra_key, "quadra"))
+
+        if top_sector in SELF_LOCATING_SECTORS:
+            keys.append((top_sector, "sector"))
+
+    if parsed.region:
+        keys.append((region_key(parsed.region), "ra"))
+
+    return keys
+
+
+class OfflineGeocoder:
+    """
+    Resolves Brasília grammar addresses against a local gazetteer, with no network calls.
+    The gazetteer is loaded once into a dictionary keyed on the canonical grammar key.
+    """
+
+    def __init__(
+        self,
+        gazetteer_path: str = None,
+        harvested_path: str = None,
+        min_precision: str = "quadra",
+    ):
+        """
+        Args:
+            gazetteer_path: CSV with key, latitude, longitude, precision and name columns,
+                defaults to the bundled pipeline/data/df_gazetteer.csv
+            harvested_path: CSV of the same columns with the entries harvested from the
+                geocode cache, read after the gazetteer and written by save
+            min_precision: Coarsest precision level resolve accepts. Sector and RA
+                centroids are left to the online providers, whose exact answers are
+                what harvest_from_cache learns quadras from, and to the centroid
+                fallback of DataTransformer.resolve_address.
+        """
+        self.gazetteer_path = gazetteer_path or DEFAULT_GAZETTEER_PATH
+        self.harvested_path = harvested_path or DEFAULT_HARVESTED_PATH
+        self.min_precision = min_precision
+        self.index: Dict[str, Tuple[float, float, str, str]] = {}
+        self.harvested: Dict[str, Tuple[float, float, str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @staticmethod
+    def _read_entries(path: str) -> Dict[str, Tuple[float, float, str, str]]:
+        entries = {}
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                entries[row["key"]] = (
+                    float(row["latitude"]),
+                    float(row["longitude"]),
+                    row["precision"],
+                    row.get("name") or "",
+                )
+        return entries
+
+    def load(self) -> None:
+        """(Re)load the gazetteer and the harvested entries into the in-memory index."""
+        self.index = {}
+        self.harvested = {}
+        if os.path.exists(self.gazetteer_path):
+            self.index = self._read_entries(self.gazetteer_path)
+        else:
+            print(
+                f"Gazetteer not found at {self.gazetteer_path}, offline index is empty"
+            )
+
+        if os.path.exists(self.harvested_path):
+            self.harvested = self._read_entries(self.harvested_path)
+            self.index.update(self.harvested)
+
+    def save(self) -> None:
+        """Write the harvested entries to harvested_path; the gazetteer is left as is."""
+        harvested_dir = os.path.dirname(self.harvested_path)
+        if harvested_dir:
+            os.makedirs(harvested_dir, exist_ok=True)
+        with open(self.harvested_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(GAZETTEER_COLUMNS)
+            for key, (latitude, longitude, precision, name) in sorted(
+                self.harvested.items(),
+                key=lambda entry: (PRECISION_LEVELS.index(entry[1][2]), entry[0]),
+            ):
+                writer.writerow([key, latitude, longitude, precision, name])
+
+    def lookup(
+        self, address, min_precision: str = "ra"
+    ) -> Optional[Tuple[float, float, str]]:
+        """
+        Resolve an address to the most precise gazetteer entry available.
+
+        Args:
+            address: Free-text address
+            min_precision: Coarsest precision level accepted
+
+        Returns:
+            Tuple (latitude, longitude, precision) or None
+        """
+        parsed = parse_address(address)
+        if parsed is None:
+            return None
+
+        max_level = PRECISION_LEVELS.index(min_precision)
+        for key, precision in candidate_keys(parsed):
+            if PRECISION_LEVELS.index(precision) > max_level:
+                break
+            entry = self.index.get(key)
+            if entry:
+                return entry[0], entry[1], entry[2]
+        return None
+
+    def resolve(self, address) -> Optional[Tuple[float, float, str]]:
+        """
+        Resolve an address when the gazetteer knows it down to min_precision (its
+        quadra or bloco by default). Coarser matches are left to the online providers.
+
+        Returns:
+            Tuple (latitude, longitude, precision) or None; the precision ends up
+            in the "geo_precision" field
+        """
+        result = self.lookup(address, min_precision=self.min_precision)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def geocode(self, address) -> Optional[Tuple[float, float]]:
+        """Same as resolve, without the precision level."""
+        result = self.resolve(address)
+        return (result[0], result[1]) if result else None
+
+    def harvest_from_cache(self, cache: GeocodeCache) -> int:
+        """
+        Add quadra and bloco entries learned from previously geocoded addresses.
+        Each key gets the median of all cached coordinates that parse to it.
+
+        Returns:
+            Number of gazetteer entries added or updated
+        """
+        points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        for address_key, latitude, longitude in cache.iter_hits():
+            parsed = parse_address(address_key)
+            if parsed is None:
+                continue
+            for key, precision in candidate_keys(parsed):
+                if precision in ("bloco", "quadra"):
+                    points.setdefault((key, precision), []).append(
+                        (latitude, longitude)
+                    )
+
+        for (key, precision), coordinates in points.items():
+            self.harvested[key] = (
+                statistics.median(lat for lat, _ in coordinates),
+                statistics.median(lon for _, lon in coordinates),
+                precision,
+                "",
+            )
+            self.index[key] = self.harvested[key]
+
+        print(f"Harvested {len(points)} gazetteer entries from the geocode cache")
+        return len(points)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Query the offline gazetteer or grow it from the geocode cache"
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    lookup_parser = subparsers.add_parser("lookup", help="Resolve an address offline")
+    lookup_parser.add_argument("address")
+
+    harvest_parser = subparsers.add_parser(
+        "harvest", help="Add quadra-level entries from the geocode cache"
+    )
+    harvest_parser.add_argument("--cache-db", default=None)
+
+    parser.add_argument("--gazetteer", default=None)
+    parser.add_argument(
+        "--harvested",
+        default=None,
+        help="File of the harvested entries (default: pipeline/cache/gazetteer_harvested.csv)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    geocoder = OfflineGeocoder(args.gazetteer, args.harvested)
+
+    if args.action == "lookup":
+        print(parse_address(args.address))
+        print(geocoder.lookup(args.address))
+    else:
+        cache = GeocodeCache(args.cache_db)
+        geocoder.harvest_from_cache(cache)
+        geocoder.save()
+        print(f"Saved harvested gazetteer entries to {geocoder.harvested_path}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline.data_cleaning import DataCleaner
+from pipeline.fingerprint import listing_fingerprint
+from pipeline.prefilter import ListingPrefilter
+from pipeline.processed_ledger import FINGERPRINT_FIELD
+
+# Duplicates share every field, so they always land in the same partition
+PARTITION_FIELDS = ("data_source", "contract_type")
+# Field hashed to split large partitions into shards, duplicates share it too
+SHARD_FIELD = "description"
+
+Partition = Tuple[Tuple[str, ...], List[int]]
+
+
+def partition_key(item: Dict[str, Any]) -> Tuple[str, ...]:
+    """Partition of a listing: its scraper and contract type."""
+    return tuple(str(item.get(field) or "") for field in PARTITION_FIELDS)
+
+
+def partition_records(
+    records: List[Dict[str, Any]], shards: int = 1
+) -> List[Partition]:
+    """
+    Group the positions of the records by data source and contract type, each group
+    split into `shards` shards by the hash of its description so that a few large
+    sources still spread over every worker.
+
+    Returns:
+        (key, positions) pairs sorted by key, positions in input order
+    """
+    partitions: Dict[Tuple[str, ...], List[int]] = {}
+    for position, item in enumerate(records):
+        key = partition_key(item)
+        if shards > 1:
+            key += (str(hash(item.get(SHARD_FIELD)) % shards),)
+        partitions.setdefault(key, []).append(position)
+    return sorted(partitions.items())
+
+
+def process_partition(
+    items: List[Dict[str, Any]],
+    standard_keys: Optional[List[str]] = None,
+    prefilter: Optional[ListingPrefilter] = None,
+    fingerprint: bool = True,
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], int, Optional[ListingPrefilter]]:
+    """
+    Clean one partition (unless standard_keys is None), apply the per-listing
+    prefilter rules and fingerprint what is left. Runs in a worker process, so
+    everything it returns is pickled.
+
+    Returns:
+        Surviving (position in the partition, listing) pairs, the number of
+        listings left after cleaning, and the prefilter with its counters
+    """
+    positions: Dict[int, int] = {}
+    for position, item in enumerate(items):
+        positions.setdefault(id(item), position)
+    cleaned = items
+    if standard_keys is not None:
+        cleaned = DataCleaner(items).clean_data(standard_keys)
+    cleaned_count = len(cleaned)
+
+    if prefilter is not None:
+        cleaned = prefilter.filter_rows(cleaned)
+    if fingerprint:
+        for item in cleaned:
+            item[FINGERPRINT_FIELD] = listing_fingerprint(item)
+    return [(positions[id(item)], item) for item in cleaned], cleaned_count, prefilter
+
+
+def _process_partition_args(args):
+    return process_partition(*args)
+
+
+def process_partitions(
+    records: List[Dict[str, Any]],
+    standard_keys: Optional[List[str]] = None,
+    prefilter: Optional[ListingPrefilter] = None,
+    workers: Optional[int] = None,
+    fingerprint: bool = True,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Clean, prefilter (per-listing rules) and fingerprint the records in a process
+    pool, one partition per data source, contract type and shard, then merge the
+    partitions back in input order. The result is the same as running
+    DataCleaner, prefilter.filter_rows and listing_fingerprint over everything.
+
+    Args:
+        records: Merged listings
+        standard_keys: Passed to DataCleaner.clean_data, None skips cleaning
+        prefilter: Its per-listing rules run in the workers and their counters are
+            added to it; the caller applies prefilter.filter_groups to the result
+        workers: Worker processes (defaults to the number of cores); with 1 the
+            partitions are processed in this process
+        fingerprint: Set the listing fingerprint of the listings that went through
+
+    Returns:
+        Listings that went through, in input order, and the number left after
+        cleaning alone
+    """
+    workers = workers or os.cpu_count() or 1
+    # About two partitions per worker keeps the workers busy until the end
+    groups = len({partition_key(item) for item in records}) or 1
+    shards = max(1, -(-2 * workers // groups)) if workers > 1 else 1
+    partitions = partition_records(records, shards)
+
+    tasks = [
+        (
+            [records[position] for position in positions],
+            standard_keys,
+            copy.deepcopy(prefilter),
+            fingerprint,
+        )
+        for _, positions in partitions
+    ]
+    if workers > 1 and len(tasks) > 1:
+        print(
+            f"Processing {len(records)} listings in {len(tasks)} partitions "
+            f"over {min(workers, len(tasks))} worker processes"
+        )
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(_process_partition_args, tasks))
+    else:
+        results = [process_partition(*task) for task in tasks]
+
+    merged: List[Tuple[int, Dict[str, Any]]] = []
+    cleaned_count = 0
+    for (_, positions), (kept, partition_cleaned, partition_prefilter) in zip(
+        partitions, results
+    ):
+        merged.extend((positions[local], item) for local, item in kept)
+        cleaned_count += partition_cleaned
+        if prefilter is not None:
+            prefilter.absorb(partition_prefilter)
+    merged.sort(key=lambda pair: pair[0])
+    return [item for _, item in merged], cleaned_count
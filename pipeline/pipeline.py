@@ -1,15 +1,52 @@
 import argparse
+import csv
 import os
 import sys
-import time
 
 import pandas as pd
 from dotenv import load_dotenv
 from utils.data_handler import DataHandler
 
+from pipeline import (
+    address_normalizer,
+    data_cleaning,
+    data_scraping,
+    data_transform,
+    fingerprint,
+    geocoding_providers,
+    merge_cache,
+    partitioning,
+    prefilter,
+    regions,
+    schema,
+    spatial,
+)
+from pipeline.columnar_output import write_dataset
 from pipeline.data_cleaning import DataCleaner
 from pipeline.data_scraping import ScraperOrchestrator
 from pipeline.data_transform import DataTransformer
+from pipeline.fingerprint import listing_fingerprint
+from pipeline.format_stats import DEFAULT_STATS_PATH, FormatStats
+from pipeline.geocode_cache import DEFAULT_CACHE_PATH, GeocodeCache
+from pipeline.listing_store import ListingStore
+from pipeline.merge_cache import MergeCache
+from pipeline.offline_geocoder import OfflineGeocoder
+from pipeline.partitioning import process_partitions
+from pipeline.prefilter import ListingPrefilter
+from pipeline.processed_ledger import FINGERPRINT_FIELD, ProcessedLedger
+from pipeline.run_metrics import ProgressReporter, RunMetrics, measure
+from pipeline.run_planner import estimate_geocoding, print_plan, provider_history
+from pipeline.schema import frame_records
+from pipeline.spatial import RegionAssigner, validate_batch
+from pipeline.stage_runner import PipelineDAG, Stage, StageCache
+from pipeline.streaming import (
+    BatchWriter,
+    batched,
+    iter_frame_records,
+    read_tsv_records,
+    threaded_stage,
+)
+from scripts.utils.profiling import PROFILE_ENV_VAR, enable_profiling, profile_stage
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,9 +55,13 @@ load_dotenv()
 def save_batch_callback(batch_data, is_final_batch):
     """
     Callback function to save batches of data as they are processed
+
+    Returns:
+        True if every part of the batch was written
     """
     print(f"\n===== SAVING BATCH OF {len(batch_data)} ITEMS =====")
 
+    saved = True
     try:
         # Create a DataFrame from the batch data
         batch_df = pd.DataFrame(batch_data)
@@ -49,36 +90,220 @@ def save_batch_callback(batch_data, is_final_batch):
                 f"Appending {len(rental_batch)} rental properties to {rental_path}..."
             )
             try:
-                data_handler.save_to_csv(
+                # save_to_csv reports write errors instead of raising them
+                if not data_handler.save_to_csv(
                     rental_batch,
                     "imoveis_aluguel_final.csv",
                     output_dir=pipeline_dir,
                     append=True,  # Always append for batches
-                )
+                ):
+                    raise OSError(f"{rental_path} was not written")
                 print(f"✓ Successfully saved rental batch")
             except Exception as e:
                 print(f"ERROR saving rental batch: {str(e)}")
+                saved = False
 
         # Save sales data
         if not sales_batch.empty:
             sales_path = os.path.join(pipeline_dir, "imoveis_venda_final.csv")
             print(f"Appending {len(sales_batch)} sales properties to {sales_path}...")
             try:
-                data_handler.save_to_csv(
+                # save_to_csv reports write errors instead of raising them
+                if not data_handler.save_to_csv(
                     sales_batch,
                     "imoveis_venda_final.csv",
                     output_dir=pipeline_dir,
                     append=True,  # Always append for batches
-                )
+                ):
+                    raise OSError(f"{sales_path} was not written")
                 print(f"✓ Successfully saved sales batch")
             except Exception as e:
                 print(f"ERROR saving sales batch: {str(e)}")
+                saved = False
 
         if is_final_batch:
             print("\n===== FINAL BATCH SAVED =====")
 
     except Exception as e:
         print(f"ERROR during batch saving: {str(e)}")
+        saved = False
+
+    return saved
+
+
+def prepare_outputs(resume=False, restart=False, ledger_path=None):
+    """
+    Open the processed-items ledger and decide whether this run resumes the previous one.
+    A fresh run clears the ledger and removes the previous output files.
+
+    Returns:
+        Tuple (ledger, resuming)
+    """
+    pipeline_dir = os.path.join(os.getcwd(), "pipeline")
+    if not os.path.exists(pipeline_dir):
+        os.makedirs(pipeline_dir)
+
+    # Set up file paths
+    rental_file_path = os.path.join(pipeline_dir, "imoveis_aluguel_final.csv")
+    sales_file_path = os.path.join(pipeline_dir, "imoveis_venda_final.csv")
+
+    # The ledger records every listing already written to the output files, so
+    # resuming never has to re-read them
+    ledger = open_ledger(ledger_path)
+    outputs_exist = os.path.exists(rental_file_path) or os.path.exists(sales_file_path)
+
+    if resume and not restart and outputs_exist and ledger.pending():
+        # The previous run stopped while writing a batch
+        found = ledger.recover(output_fingerprints())
+        print(f"Recovered {found} listings of an interrupted batch from the outputs")
+
+    resuming = resume and not restart and outputs_exist and len(ledger) > 0
+    if resuming:
+        print(
+            f"Found {len(ledger)} already processed items "
+            f"({ledger.count_with_coordinates()} with coordinates)"
+        )
+        print("Will resume processing from where it left off")
+    else:
+        if resume and not restart:
+            print("No previously processed items found, starting fresh")
+        # Remove the previous outputs, the first saved batch writes the header
+        ledger.clear()
+        for file_path in (rental_file_path, sales_file_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        print("Cleared output files for batch processing")
+
+    return ledger, resuming
+
+
+def open_ledger(ledger_path=None):
+    return ProcessedLedger(
+        ledger_path or os.path.join(os.getcwd(), "pipeline", "processed_items.sqlite")
+    )
+
+
+def save_recorded_batch(ledger, batch_data, is_final_batch):
+    """
+    Save a batch and record it in the ledger. The batch is marked pending first, so
+    a crash during or right after the write is settled by prepare_outputs from the
+    rows that did reach the output files, instead of appending them twice.
+
+    Returns:
+        True if every part of the batch was written
+    """
+    ledger.mark_pending(batch_data)
+    saved = save_batch_callback(batch_data, is_final_batch)
+    if saved:
+        ledger.mark_processed(batch_data)
+    return saved
+
+
+def make_batch_callback(ledger, region_assigner=None, verbose=False):
+    """
+    Build the callback that validates, assigns regions to and saves each batch,
+    recording it in the ledger once it is on disk.
+    """
+
+    def batch_callback(batch_data, is_final_batch):
+        rejected = validate_batch(batch_data, verbose=verbose)
+        if rejected:
+            print(f"Cleared {rejected} coordinates outside the DF")
+        if region_assigner is not None:
+            region_assigner.assign(batch_data)
+        return save_recorded_batch(ledger, batch_data, is_final_batch)
+
+    return batch_callback
+
+
+def create_transformer(
+    data,
+    geocoding_service="google",
+    geocoding_workers=1,
+    rate_limits=None,
+    use_geocode_cache=True,
+    geocode_cache_path=None,
+    use_offline_geocoder=True,
+    geocoding_quotas=None,
+    verbose=False,
+):
+    """Set up the geocode cache, offline gazetteer and format statistics for a run."""
+    geocode_cache = GeocodeCache(geocode_cache_path) if use_geocode_cache else None
+    offline_geocoder = OfflineGeocoder() if use_offline_geocoder else None
+    format_stats = FormatStats(DEFAULT_STATS_PATH)
+    transformer = DataTransformer(
+        data,
+        geocoding_service=geocoding_service,
+        cache=geocode_cache,
+        workers=geocoding_workers,
+        rate_limits=rate_limits,
+        offline_geocoder=offline_geocoder,
+        format_stats=format_stats,
+        quotas=geocoding_quotas,
+        verbose=verbose,
+    )
+    print(f"Using geocoding service: {geocoding_service}")
+    if geocode_cache is not None:
+        print(f"Using geocode cache: {geocode_cache.db_path}")
+    return transformer
+
+
+def record_geocoding_metrics(metrics, transformer):
+    """Provider call counts and cache hit rates of a finished geocoding run."""
+    for provider in transformer.providers:
+        for name, value in provider.stats().items():
+            metrics.gauge(
+                f"provider_{name}",
+                value,
+                f"Geocoding provider {name} during the run",
+                provider=provider.name,
+            )
+    caches = []
+    if transformer.offline_geocoder is not None:
+        caches.append(("gazetteer", transformer.offline_geocoder))
+    if transformer.cache is not None:
+        caches.append(("geocode", transformer.cache))
+    for cache_name, cache in caches:
+        lookups = cache.hits + cache.misses
+        metrics.gauge(
+            "cache_hit_ratio",
+            cache.hits / lookups if lookups else None,
+            "Hit rate of the geocoding caches",
+            cache=cache_name,
+        )
+    metrics.gauge(
+        "geocode_requests_per_resolved_address",
+        transformer.requests_per_resolved_address,
+        "Remote requests sent per address a provider resolved",
+    )
+    metrics.gauge(
+        "geocode_dedup_ratio",
+        transformer.dedup_stats.get("reduction_ratio"),
+        "Share of lookups saved by address deduplication",
+    )
+
+
+def finish_transformer(transformer, region_assigner=None, metrics=None):
+    """Persist the learned format statistics, report hit counts and close the cache."""
+    if metrics is not None:
+        record_geocoding_metrics(metrics, transformer)
+    transformer.format_stats.save()
+    if transformer.offline_geocoder is not None:
+        print(
+            f"Offline gazetteer: {transformer.offline_geocoder.hits} hits, "
+            f"{transformer.offline_geocoder.misses} misses"
+        )
+    if transformer.cache is not None:
+        print(
+            f"Geocode cache: {transformer.cache.hits} hits, {transformer.cache.misses} misses"
+        )
+        transformer.cache.close()
+    if region_assigner is not None:
+        print(
+            f"Regions assigned: {region_assigner.stats['polygon']} by polygon, "
+            f"{region_assigner.stats['text']} by text, "
+            f"{region_assigner.stats['unassigned']} unassigned"
+        )
 
 
 def load_and_process_data(
@@ -90,10 +315,36 @@ def load_and_process_data(
     restart=False,
     geocoding_service="google",
     preloaded_data=None,
+    use_geocode_cache=True,
+    geocode_cache_path=None,
+    geocoding_workers=1,
+    rate_limits=None,
+    use_offline_geocoder=True,
+    geocoding_quotas=None,
+    assign_regions=True,
+    region_boundaries_path=None,
+    ledger_path=None,
+    use_prefilter=True,
+    prefilter_options=None,
+    cleaning_workers=1,
+    metrics=None,
+    verbose=False,
 ):
     """
     Load TSV files, clean and transform data
     Processes data in batches and saves incrementally
+
+    When assign_regions is set, each batch gets its administrative region ("location")
+    from the RA boundaries before it is saved, see pipeline.spatial.RegionAssigner.
+    Saved listings are recorded in the processed-items ledger (ledger_path, defaults to
+    pipeline/processed_items.sqlite) so that resume skips them.
+    With use_prefilter, listings the R analysis would discard are dropped before
+    geocoding (prefilter_options are passed to pipeline.prefilter.ListingPrefilter).
+    With cleaning_workers other than 1 (None for every core), cleaning, the
+    per-listing prefilter rules and fingerprinting run in a process pool, one
+    partition per data source and contract type (see pipeline.partitioning);
+    the result is the same as with a single process.
+    Stage timings and geocoding counters go to metrics (a RunMetrics) when given.
     """
     all_data = []
     total_properties = 0
@@ -105,19 +356,21 @@ def load_and_process_data(
     else:
         print("\n===== LOADING DATA =====")
         # Load all TSV files and convert to list of dictionaries
-        for tsv_path in tsv_paths:
-            try:
-                print(f"Loading file: {tsv_path}...")
-                df = pd.read_csv(tsv_path, sep="\t")
-                print(f"Found {len(df)} properties in {os.path.basename(tsv_path)}")
-                total_properties += len(df)
-
-                # Convert DataFrame to list of dictionaries
-                data_list = df.to_dict("records")
-                all_data.extend(data_list)
-            except Exception as e:
-                print(f"ERROR loading {tsv_path}: {str(e)}")
-                continue
+        with measure(metrics, "load") as stage, profile_stage("load"):
+            for tsv_path in tsv_paths:
+                try:
+                    print(f"Loading file: {tsv_path}...")
+                    df = pd.read_csv(tsv_path, sep="\t")
+                    print(f"Found {len(df)} properties in {os.path.basename(tsv_path)}")
+                    total_properties += len(df)
+
+                    # Convert DataFrame to list of dictionaries
+                    data_list = df.to_dict("records")
+                    all_data.extend(data_list)
+                except Exception as e:
+                    print(f"ERROR loading {tsv_path}: {str(e)}")
+                    continue
+            stage.rows_out = len(all_data)
 
         print(f"\nTotal properties loaded: {len(all_data)} from {len(tsv_paths)} files")
 
@@ -137,259 +390,88 @@ def load_and_process_data(
         ]
 
     print(f"Using standard keys: {standard_keys}")
+    prefilter = ListingPrefilter(**(prefilter_options or {})) if use_prefilter else None
     try:
         print("Removing duplicates and empty values...")
-        cleaner = DataCleaner(all_data)
-        cleaned_data = cleaner.clean_data(standard_keys)
+        with measure(metrics, "clean", len(all_data)) as stage, profile_stage("clean"):
+            if cleaning_workers == 1:
+                cleaned_data = DataCleaner(all_data).clean_data(standard_keys)
+                cleaned_count = len(cleaned_data)
+            else:
+                # The workers also apply the per-listing prefilter rules and
+                # fingerprint the listings, only the group rules are left below
+                cleaned_data, cleaned_count = process_partitions(
+                    all_data, standard_keys, prefilter, cleaning_workers
+                )
+            stage.rows_out = cleaned_count
         print(
-            f"Data cleaning complete: {len(cleaned_data)} properties remaining (removed {len(all_data) - len(cleaned_data)} properties)"
+            f"Data cleaning complete: {cleaned_count} properties remaining (removed {len(all_data) - cleaned_count} properties)"
         )
     except Exception as e:
         print(f"ERROR during data cleaning: {str(e)}")
         return all_data  # Return original data if cleaning fails
 
-    # Prepare for incremental saving
-    pipeline_dir = os.path.join(os.getcwd(), "pipeline")
-    if not os.path.exists(pipeline_dir):
-        os.makedirs(pipeline_dir)
+    # Drop what the analysis would discard before paying for its geocoding
+    if prefilter is not None:
+        print("\n===== FILTERING DATA =====")
+        with measure(metrics, "filter", cleaned_count) as stage, profile_stage(
+            "filter"
+        ):
+            if cleaning_workers == 1:
+                cleaned_data = prefilter.filter(cleaned_data)
+            else:
+                cleaned_data = prefilter.filter_groups(cleaned_data)
+            stage.rows_out = len(cleaned_data)
+        prefilter.report()
 
-    # Set up file paths
-    rental_file_path = os.path.join(pipeline_dir, "imoveis_aluguel_final.csv")
-    sales_file_path = os.path.join(pipeline_dir, "imoveis_venda_final.csv")
+    if cleaning_workers == 1:
+        # Listings are identified by a stable fingerprint instead of their description
+        for item in cleaned_data:
+            item[FINGERPRINT_FIELD] = listing_fingerprint(item)
 
-    # Check if we should resume processing or start fresh
-    already_processed_items = {}
-    if resume and not restart:
-        # Try to load existing processed data
-        try:
-            restart_needed = False
-            if os.path.exists(rental_file_path):
-                try:
-                    # First, try to read the file with most permissive options
-                    try:
-                        # Use pandas with more permissive options
-                        rental_df = pd.read_csv(
-                            rental_file_path,
-                            quoting=pd.io.common.csv.QUOTE_NONE,
-                            error_bad_lines=False,
-                            warn_bad_lines=True,
-                            escapechar="\\",
-                            encoding="utf-8",
-                            engine="python",
-                            delimiter="\t",
-                            on_bad_lines="skip",
-                        )
-                    except Exception as e1:
-                        try:
-                            # Try using Python's built-in CSV reader which is more forgiving
-                            import csv
-
-                            with open(
-                                rental_file_path, "r", newline="", encoding="utf-8"
-                            ) as f:
-                                reader = csv.reader(f)
-                                rows = []
-                                for i, row in enumerate(reader):
-                                    if i == 0:  # header
-                                        headers = row
-                                        continue
-                                    # Only include rows with the correct number of fields
-                                    if len(row) == len(headers):
-                                        rows.append(row)
-                            # Convert back to pandas DataFrame
-                            rental_df = pd.DataFrame(rows, columns=headers)
-                        except Exception as e2:
-                            print(
-                                f"Error reading rental file with both methods: {str(e1)} and {str(e2)}"
-                            )
-                            restart_needed = True
-                            raise
-
-                    if not restart_needed:
-                        print(f"Found existing rental data with {len(rental_df)} items")
-                        # Create a dictionary of already processed items using the description as key
-                        for _, row in rental_df.iterrows():
-                            if "description" in row and not pd.isna(row["description"]):
-                                desc = str(row["description"]).strip()
-                                if desc:  # Only add non-empty descriptions
-                                    already_processed_items[desc] = {
-                                        "file": "rental",
-                                        "has_coords": pd.notnull(row.get("latitude"))
-                                        and pd.notnull(row.get("longitude")),
-                                    }
-                except Exception as e:
-                    print(f"Error loading existing data for resume: {str(e)}")
-                    restart_needed = True
+    ledger, resuming = prepare_outputs(resume, restart, ledger_path)
 
-            if os.path.exists(sales_file_path) and not restart_needed:
-                try:
-                    # First, try to read the file with most permissive options
-                    try:
-                        sales_df = pd.read_csv(
-                            sales_file_path,
-                            quoting=pd.io.common.csv.QUOTE_NONE,
-                            error_bad_lines=False,
-                            warn_bad_lines=True,
-                            escapechar="\\",
-                            encoding="utf-8",
-                            engine="python",
-                            delimiter=",",
-                            on_bad_lines="skip",
-                        )
-                    except Exception as e1:
-                        try:
-                            # Try using Python's built-in CSV reader which is more forgiving
-                            import csv
-
-                            with open(
-                                sales_file_path, "r", newline="", encoding="utf-8"
-                            ) as f:
-                                reader = csv.reader(f)
-                                rows = []
-                                for i, row in enumerate(reader):
-                                    if i == 0:  # header
-                                        headers = row
-                                        continue
-                                    # Only include rows with the correct number of fields
-                                    if len(row) == len(headers):
-                                        rows.append(row)
-                            # Convert back to pandas DataFrame
-                            sales_df = pd.DataFrame(rows, columns=headers)
-                        except Exception as e2:
-                            print(
-                                f"Error reading sales file with both methods: {str(e1)} and {str(e2)}"
-                            )
-                            restart_needed = True
-                            raise
-
-                    if not restart_needed:
-                        print(f"Found existing sales data with {len(sales_df)} items")
-                        # Add sales items to the already processed dictionary
-                        for _, row in sales_df.iterrows():
-                            if "description" in row and not pd.isna(row["description"]):
-                                desc = str(row["description"]).strip()
-                                if desc:  # Only add non-empty descriptions
-                                    already_processed_items[desc] = {
-                                        "file": "sales",
-                                        "has_coords": pd.notnull(row.get("latitude"))
-                                        and pd.notnull(row.get("longitude")),
-                                    }
-                except Exception as e:
-                    print(f"Error loading existing data for resume: {str(e)}")
-                    restart_needed = True
-
-            if restart_needed:
-                print("\nStarting fresh instead")
-                # Create empty files but first backup the existing ones
-                if os.path.exists(rental_file_path):
-                    import shutil
-
-                    backup_path = f"{rental_file_path}.backup_{int(time.time())}"
-                    shutil.copy2(rental_file_path, backup_path)
-                    print(f"Backed up corrupted rental file to {backup_path}")
-
-                if os.path.exists(sales_file_path):
-                    import shutil
-
-                    backup_path = f"{sales_file_path}.backup_{int(time.time())}"
-                    shutil.copy2(sales_file_path, backup_path)
-                    print(f"Backed up corrupted sales file to {backup_path}")
-
-                # Create empty files
-                data_handler = DataHandler([])
-                empty_df = pd.DataFrame(
-                    columns=standard_keys + ["latitude", "longitude"]
-                )
-                data_handler.save_to_csv(
-                    empty_df,
-                    "imoveis_aluguel_final.csv",
-                    output_dir=pipeline_dir,
-                    append=False,
-                )
-                data_handler.save_to_csv(
-                    empty_df,
-                    "imoveis_venda_final.csv",
-                    output_dir=pipeline_dir,
-                    append=False,
-                )
-                print("CSV data saved to", rental_file_path)
-                print("CSV data saved to", sales_file_path)
-                print("Created empty output files for batch processing")
-                return []
-
-            processed_count = len(already_processed_items)
-            with_coords = sum(
-                1 for info in already_processed_items.values() if info["has_coords"]
-            )
-            print(
-                f"Found {processed_count} already processed items ({with_coords} with coordinates)"
-            )
+    # Every batch is validated against the DF boundary and assigned its region
+    # right before it is saved
+    region_assigner = RegionAssigner(region_boundaries_path) if assign_regions else None
+    batch_callback = make_batch_callback(ledger, region_assigner, verbose)
 
-            if processed_count > 0:
-                print("Will resume processing from where it left off")
+    # Filter out already processed items if resuming
+    if resuming:
+        # Filter the cleaned data to only include items that need processing
+        need_processing = []
+        skipped_count = 0
+        for item in cleaned_data:
+            if item[FINGERPRINT_FIELD] in ledger:
+                # Skip this item since it was already processed
+                skipped_count += 1
             else:
-                print("No previously processed items found, starting fresh")
-                # Create empty files
-                data_handler = DataHandler([])
-                empty_df = pd.DataFrame(
-                    columns=standard_keys + ["latitude", "longitude"]
-                )
-                data_handler.save_to_csv(
-                    empty_df,
-                    "imoveis_aluguel_final.csv",
-                    output_dir=pipeline_dir,
-                    append=False,
-                )
-                data_handler.save_to_csv(
-                    empty_df,
-                    "imoveis_venda_final.csv",
-                    output_dir=pipeline_dir,
-                    append=False,
-                )
-                print("Created empty output files for batch processing")
-        except Exception as e:
-            print(f"Error loading existing data for resume: {str(e)}")
-            print("Starting fresh instead")
-            already_processed_items = {}
-            # Create empty files
-            data_handler = DataHandler([])
-            empty_df = pd.DataFrame(columns=standard_keys + ["latitude", "longitude"])
-            data_handler.save_to_csv(
-                empty_df,
-                "imoveis_aluguel_final.csv",
-                output_dir=pipeline_dir,
-                append=False,
-            )
-            data_handler.save_to_csv(
-                empty_df,
-                "imoveis_venda_final.csv",
-                output_dir=pipeline_dir,
-                append=False,
-            )
-            print("Created empty output files for batch processing")
-    else:
-        # Clear existing output files (create empty files for appending)
-        data_handler = DataHandler([])
-        empty_df = pd.DataFrame(columns=standard_keys + ["latitude", "longitude"])
-        data_handler.save_to_csv(
-            empty_df, "imoveis_aluguel_final.csv", output_dir=pipeline_dir, append=False
-        )
-        data_handler.save_to_csv(
-            empty_df, "imoveis_venda_final.csv", output_dir=pipeline_dir, append=False
+                need_processing.append(item)
+
+        print(f"Skipping {skipped_count} already processed items")
+        print(
+            f"Processing {len(need_processing)} out of {len(cleaned_data)} total items"
         )
-        print("Created empty output files for batch processing")
+        processing_data = need_processing
+    else:
+        processing_data = cleaned_data
 
     # Transform data
     print("\n===== TRANSFORMING DATA =====")
     if skip_geocoding:
         print("Geocoding skipped (--skip-geocoding flag used)")
-        for item in cleaned_data:
+        for item in processing_data:
             item["latitude"] = None
             item["longitude"] = None
-        transformed_data = cleaned_data
+            item["geo_precision"] = None
+        transformed_data = processing_data
 
         # Save all data at once if skipping geocoding
-        save_batch_callback(transformed_data, True)
+        with measure(metrics, "export", len(transformed_data)) as stage, profile_stage(
+            "export"
+        ):
+            batch_callback(transformed_data, True)
+            stage.rows_out = len(transformed_data)
     else:
         try:
             print("Adding geographical coordinates based on description field...")
@@ -400,39 +482,29 @@ def load_and_process_data(
             print("         Each batch of data will be saved as it completes.")
             print("         Use --skip-geocoding if you want to skip this step.")
 
-            # Filter out already processed items with coordinates if resuming
-            if resume and not restart and already_processed_items:
-                # Filter the cleaned data to only include items that need processing
-                need_processing = []
-                skipped_count = 0
-                for item in cleaned_data:
-                    desc = item.get("description")
-                    if desc in already_processed_items:
-                        # Skip this item since it was already processed
-                        skipped_count += 1
-                    else:
-                        need_processing.append(item)
-
-                print(f"Skipping {skipped_count} already processed items")
-                print(
-                    f"Processing {len(need_processing)} out of {len(cleaned_data)} total items"
-                )
-                processing_data = need_processing
-            else:
-                processing_data = cleaned_data
-
-            transformer = DataTransformer(
-                processing_data, geocoding_service=geocoding_service
-            )
-            print(f"Using geocoding service: {geocoding_service}")
-            start_time = time.time()
-            transformed_data = transformer.add_coordinates_to_data(
-                "description",  # Use description field instead of address
-                batch_size=batch_size,
-                callback=save_batch_callback,
+            transformer = create_transformer(
+                processing_data,
+                geocoding_service=geocoding_service,
+                geocoding_workers=geocoding_workers,
+                rate_limits=rate_limits,
+                use_geocode_cache=use_geocode_cache,
+                geocode_cache_path=geocode_cache_path,
+                use_offline_geocoder=use_offline_geocoder,
+                geocoding_quotas=geocoding_quotas,
+                verbose=verbose,
             )
-            elapsed_time = time.time() - start_time
-            print(f"Transformation complete in {elapsed_time:.2f} seconds")
+            # Batches are saved from the callback, so this covers geocoding and export
+            with measure(
+                metrics, "geocode", len(processing_data)
+            ) as stage, profile_stage("geocode"):
+                transformed_data = transformer.add_coordinates_to_data(
+                    "description",  # Use description field instead of address
+                    batch_size=batch_size,
+                    callback=batch_callback,
+                )
+                stage.rows_out = len(transformed_data)
+            print(f"Transformation complete in {stage.seconds:.2f} seconds")
+            finish_transformer(transformer, region_assigner, metrics)
         except KeyboardInterrupt:
             print(
                 "\nGeocoding was interrupted by user. Continuing with partial results..."
@@ -445,6 +517,679 @@ def load_and_process_data(
     return transformed_data
 
 
+def stream_and_process_data(
+    tsv_paths,
+    skip_geocoding=False,
+    batch_size=50,
+    resume=False,
+    restart=False,
+    geocoding_service="google",
+    use_geocode_cache=True,
+    geocode_cache_path=None,
+    geocoding_workers=1,
+    rate_limits=None,
+    use_offline_geocoder=True,
+    geocoding_quotas=None,
+    assign_regions=True,
+    region_boundaries_path=None,
+    ledger_path=None,
+    queue_size=1000,
+    use_prefilter=True,
+    prefilter_options=None,
+    records=None,
+    metrics=None,
+    verbose=False,
+):
+    """
+    Streaming counterpart of load_and_process_data, for inputs of any size.
+    Reads tsv_paths, or streams the records iterable instead when given.
+
+    Reading and cleaning run on one thread, geocoding on the calling thread (with its
+    own lookup pool) and writing on a third, connected by bounded queues. A slow stage
+    throttles the ones before it, so memory stays flat whatever the input size.
+
+    The pre-geocoding filter only applies its per-listing rules here: censorship and
+    outlier removal need the whole dataset.
+
+    The stages overlap, so metrics (a RunMetrics) gets a single "stream" stage
+    timing the whole run, plus the counts below as gauges.
+
+    Returns:
+        Dictionary with the counts of the run; the listings themselves are only on disk
+    """
+    ledger, resuming = prepare_outputs(resume, restart, ledger_path)
+    region_assigner = RegionAssigner(region_boundaries_path) if assign_regions else None
+    batch_callback = make_batch_callback(ledger, region_assigner, verbose)
+
+    stats = {
+        "read": 0,
+        "cleaned": 0,
+        "skipped": 0,
+        "saved": 0,
+        "rental": 0,
+        "sales": 0,
+        "with_coords": 0,
+    }
+
+    def count_read(records):
+        for record in records:
+            stats["read"] += 1
+            yield record
+
+    prefilter = ListingPrefilter(**(prefilter_options or {})) if use_prefilter else None
+
+    def clean_stage():
+        cleaner = DataCleaner([])
+        source = records if records is not None else read_tsv_records(tsv_paths)
+        cleaned = cleaner.stream(count_read(source))
+        if prefilter is not None:
+            cleaned = prefilter.filter_stream(cleaned)
+        for item in cleaned:
+            stats["cleaned"] += 1
+            item[FINGERPRINT_FIELD] = listing_fingerprint(item)
+            if resuming and item[FINGERPRINT_FIELD] in ledger:
+                stats["skipped"] += 1
+                continue
+            yield item
+
+    def skip_geocoding_stage(items):
+        for item in items:
+            DataTransformer.set_coordinates(item, None, None)
+            yield item
+
+    progress = ProgressReporter("Saved")
+
+    def write_batch(batch_data, is_final_batch):
+        if batch_callback(batch_data, is_final_batch):
+            stats["saved"] += len(batch_data)
+            progress.update(len(batch_data))
+            for item in batch_data:
+                if item.get("contract_type") == "aluguel":
+                    stats["rental"] += 1
+                elif item.get("contract_type") == "venda":
+                    stats["sales"] += 1
+                if item.get("latitude") is not None:
+                    stats["with_coords"] += 1
+
+    print("\n===== STREAMING DATA =====")
+    items = threaded_stage(clean_stage(), maxsize=queue_size)
+    transformer = None
+    if skip_geocoding:
+        print("Geocoding skipped (--skip-geocoding flag used)")
+        geocoded = skip_geocoding_stage(items)
+    else:
+        transformer = create_transformer(
+            [],
+            geocoding_service=geocoding_service,
+            geocoding_workers=geocoding_workers,
+            rate_limits=rate_limits,
+            use_geocode_cache=use_geocode_cache,
+            geocode_cache_path=geocode_cache_path,
+            use_offline_geocoder=use_offline_geocoder,
+            geocoding_quotas=geocoding_quotas,
+            verbose=verbose,
+        )
+        geocoded = transformer.stream_coordinates(items, "description")
+
+    writer = BatchWriter(write_batch)
+    with measure(metrics, "stream") as stage, profile_stage("stream"):
+        try:
+            for batch_data, is_final_batch in batched(geocoded, batch_size):
+                writer.put(batch_data, is_final_batch)
+        except KeyboardInterrupt:
+            # Listings of the unsaved batch are not in the ledger, resume picks them up
+            print("\nStreaming was interrupted by user, writing the queued batches...")
+        finally:
+            writer.close()
+            if transformer is not None:
+                finish_transformer(transformer, region_assigner, metrics)
+        stage.rows_in = stats["read"]
+        stage.rows_out = stats["saved"]
+
+    progress.finish()
+    print(f"Streaming complete in {stage.seconds:.2f} seconds")
+    if prefilter is not None:
+        prefilter.report()
+        stats["avoided_lookups"] = prefilter.avoided_lookups
+    print(
+        f"Read {stats['read']} properties, {stats['cleaned']} after cleaning and filtering, "
+        f"{stats['skipped']} already processed"
+    )
+    print(
+        f"Saved {stats['saved']} properties ({stats['rental']} rental, {stats['sales']} sales), "
+        f"{stats['with_coords']} with coordinates"
+    )
+    if metrics is not None:
+        for name, value in stats.items():
+            metrics.gauge(
+                f"stream_{name}", value, "Listing counts of the streaming run"
+            )
+    return stats
+
+
+DEFAULT_STANDARD_KEYS = [
+    "description",
+    "address",
+    "property_type",
+    "price",
+    "size",
+    "bedrooms",
+    "bathrooms",
+    "parking_spaces",
+    "contract_type",
+]
+
+PIPELINE_STAGES = [
+    "discover",
+    "merge",
+    "normalize",
+    "delta",
+    "clean",
+    "filter",
+    "geocode",
+    "export",
+]
+
+
+def discover_stage(scripts_dir=None):
+    """Find the scraper output files, with the size and mtime that key the later stages."""
+    orchestrator = ScraperOrchestrator(scripts_dir)
+    discovered = orchestrator.discover_data_files()
+    return {
+        kind: [
+            (path, os.path.getsize(path), os.stat(path).st_mtime_ns)
+            for path in sorted(paths)
+        ]
+        for kind, paths in discovered.items()
+    }
+
+
+def merge_stage(discovered, scripts_dir=None, use_merge_cache=True, workers=1):
+    """
+    Merge the discovered files into one DataFrame, re-parsing only the files that
+    changed since the last merge when use_merge_cache is set, in `workers`
+    processes when not 1.
+    """
+    if not any(discovered.values()):
+        raise ValueError("No data files were found from scrapers")
+    orchestrator = ScraperOrchestrator(
+        scripts_dir,
+        merge_cache=MergeCache() if use_merge_cache else None,
+        workers=workers,
+    )
+    orchestrator.tsv_files = [path for path, _, _ in discovered["tsv"]]
+    orchestrator.xlsx_files = [path for path, _, _ in discovered["xlsx"]]
+    return orchestrator.merge_discovered_data()
+
+
+def normalize_stage(merged, workers=1):
+    """
+    Convert the merged rows to records identified by their listing fingerprint,
+    computed in `workers` processes when not 1.
+    """
+    records = frame_records(merged)
+    if workers == 1:
+        for item in records:
+            item[FINGERPRINT_FIELD] = listing_fingerprint(item)
+    else:
+        records, _ = process_partitions(records, workers=workers)
+    print(f"Normalized {len(records)} properties")
+    return records
+
+
+def clean_stage(records, standard_keys=None, workers=1):
+    """Remove duplicates and empty values, in `workers` processes when not 1."""
+    standard_keys = standard_keys or DEFAULT_STANDARD_KEYS
+    if workers == 1:
+        cleaned_data = DataCleaner(records).clean_data(standard_keys)
+    else:
+        cleaned_data, _ = process_partitions(
+            records, standard_keys, workers=workers, fingerprint=False
+        )
+    print(
+        f"Data cleaning complete: {len(cleaned_data)} properties remaining "
+        f"(removed {len(records) - len(cleaned_data)} properties)"
+    )
+    return cleaned_data
+
+
+def filter_stage(records, prefilter_options=None):
+    listing_filter = ListingPrefilter(**(prefilter_options or {}))
+    filtered = listing_filter.filter(records)
+    listing_filter.report()
+    return filtered
+
+
+def geocode_stage(
+    records,
+    skip_geocoding=False,
+    geocoding_service="google",
+    geocoding_workers=1,
+    rate_limits=None,
+    geocoding_quotas=None,
+    assign_regions=True,
+    region_boundaries_path=None,
+    metrics=None,
+    verbose=False,
+):
+    """Add coordinates, validate them against the DF boundary and assign regions."""
+    if skip_geocoding:
+        print("Geocoding skipped (--skip-geocoding flag used)")
+        for item in records:
+            DataTransformer.set_coordinates(item, None, None)
+    else:
+        transformer = create_transformer(
+            records,
+            geocoding_service=geocoding_service,
+            geocoding_workers=geocoding_workers,
+            rate_limits=rate_limits,
+            geocoding_quotas=geocoding_quotas,
+            verbose=verbose,
+        )
+        records = transformer.add_coordinates_to_data("description")
+        finish_transformer(transformer, metrics=metrics)
+
+    rejected = validate_batch(records, verbose=verbose)
+    if rejected:
+        print(f"Cleared {rejected} coordinates outside the DF")
+    if assign_regions:
+        RegionAssigner(region_boundaries_path).assign(records)
+    return records
+
+
+def output_file_paths():
+    """Paths of the rental and sales output files."""
+    pipeline_dir = os.path.join(os.getcwd(), "pipeline")
+    return (
+        os.path.join(pipeline_dir, "imoveis_aluguel_final.csv"),
+        os.path.join(pipeline_dir, "imoveis_venda_final.csv"),
+    )
+
+
+def output_fingerprints():
+    """Fingerprints of the rows in the output files, read one line at a time."""
+    fingerprints = set()
+    for file_path in output_file_paths():
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None or FINGERPRINT_FIELD not in header:
+                continue
+            column = header.index(FINGERPRINT_FIELD)
+            fingerprints.update(row[column] for row in reader if len(row) > column)
+    return fingerprints
+
+
+def final_dataset_path():
+    """Folder of the Parquet dataset of the final listings."""
+    return os.path.join(os.getcwd(), "pipeline", "imoveis_final")
+
+
+def save_final_parquet(chunksize=100_000):
+    """
+    Rebuild the Parquet dataset of the final listings from the rental and sales
+    CSVs, partitioned by data source and contract type, so readers can load a
+    partition or a few columns without parsing text (see pipeline.columnar_output).
+
+    Returns:
+        Path of the dataset, None if it was not written
+    """
+    paths = [path for path in output_file_paths() if os.path.exists(path)]
+    if not paths:
+        return None
+
+    def frames():
+        # Read as text, to_columnar gives every chunk the same column types
+        for path in paths:
+            yield from pd.read_csv(path, dtype=str, chunksize=chunksize)
+
+    dataset_path = final_dataset_path()
+    return dataset_path if write_dataset(frames(), dataset_path) else None
+
+
+def open_listing_store(listing_store_path=None):
+    return ListingStore(
+        listing_store_path or os.path.join(os.getcwd(), "pipeline", "listings.sqlite")
+    )
+
+
+def drop_output_rows(fingerprints):
+    """
+    Remove the rows of the given listings from the output files, streaming them
+    line by line so the rows that are kept are written back unchanged.
+
+    Returns:
+        Number of rows removed
+    """
+    removed = 0
+    if not fingerprints:
+        return removed
+
+    for file_path in output_file_paths():
+        if not os.path.exists(file_path):
+            continue
+        temp_path = f"{file_path}.tmp"
+        with open(file_path, newline="", encoding="utf-8") as source, open(
+            temp_path, "w", newline="", encoding="utf-8"
+        ) as target:
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            header = next(reader, None)
+            if header is None or FINGERPRINT_FIELD not in header:
+                print(f"WARNING: {file_path} has no {FINGERPRINT_FIELD} column")
+                target.close()
+                os.remove(temp_path)
+                continue
+            column = header.index(FINGERPRINT_FIELD)
+            writer.writerow(header)
+            for row in reader:
+                if len(row) > column and row[column] in fingerprints:
+                    removed += 1
+                else:
+                    writer.writerow(row)
+        os.replace(temp_path, file_path)
+    return removed
+
+
+def export_stage(
+    records,
+    listings,
+    listing_store_path=None,
+    write_parquet=True,
+    ledger_path=None,
+):
+    """
+    Rewrite the final output files from the geocoded records (and their Parquet
+    dataset with write_parquet), and record every current listing in the listing
+    store as the baseline of the next delta run. The processed-items ledger is
+    rebuilt from the rewritten files, so a later --stream --resume run neither
+    appends their rows again nor skips listings they no longer have.
+    """
+    ledger = open_ledger(ledger_path)
+    try:
+        # Cleared before the files, a crash in between makes the next run fresh
+        ledger.clear()
+        for file_path in output_file_paths():
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        save_recorded_batch(ledger, records, True)
+    finally:
+        ledger.close()
+    if write_parquet:
+        save_final_parquet()
+
+    store = open_listing_store(listing_store_path)
+    try:
+        store.clear()
+        store.record(listings)
+    finally:
+        store.close()
+
+    save_transformed_data(records)
+    return len(records)
+
+
+def delta_stage(records, listing_store_path=None):
+    """
+    Compare the current listings with the listing store, keeping only those added
+    or changed since the last run. With an empty store every listing is new and
+    the output files are rebuilt.
+    """
+    store = open_listing_store(listing_store_path)
+    try:
+        rebuild = len(store) == 0
+        delta = store.compare(records)
+    finally:
+        store.close()
+
+    print(
+        f"Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+        f"{len(delta['removed'])} removed, {delta['unchanged']} unchanged"
+    )
+    return {
+        "listings": delta["added"] + delta["changed"],
+        "changed": [item[FINGERPRINT_FIELD] for item in delta["changed"]],
+        "removed": delta["removed"],
+        "rebuild": rebuild,
+    }
+
+
+def clean_delta_stage(delta, standard_keys=None, workers=1):
+    return clean_stage(delta["listings"], standard_keys, workers)
+
+
+def export_delta_stage(
+    records,
+    delta,
+    listing_store_path=None,
+    write_parquet=True,
+    ledger_path=None,
+):
+    """
+    Apply a delta to the output files: rows of changed listings are replaced by
+    their new version, new listings are appended, and listings that disappeared
+    are removed from them and marked as delisted in the listing store and in
+    imoveis_delisted.csv. The processed-items ledger follows the same changes.
+    With write_parquet, the Parquet dataset is rebuilt from the updated files.
+    """
+    ledger = open_ledger(ledger_path)
+    try:
+        if delta["rebuild"]:
+            ledger.clear()
+            for file_path in output_file_paths():
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        else:
+            dropped = set(delta["changed"]) | set(delta["removed"])
+            # Pending while their rows are removed, see ProcessedLedger.recover
+            ledger.mark_pending(
+                [{FINGERPRINT_FIELD: fingerprint} for fingerprint in dropped]
+            )
+            # One pass over the files for both
+            removed = drop_output_rows(dropped)
+            ledger.forget(dropped)
+            print(f"Removed {removed} rows of changed and delisted listings")
+
+        if records:
+            save_recorded_batch(ledger, records, True)
+    finally:
+        ledger.close()
+    if write_parquet:
+        save_final_parquet()
+
+    store = open_listing_store(listing_store_path)
+    try:
+        store.record(delta["listings"])
+        store.mark_delisted(delta["removed"])
+        delisted = store.delisted()
+    finally:
+        store.close()
+
+    delisted_path = os.path.join(os.getcwd(), "pipeline", "imoveis_delisted.csv")
+    pd.DataFrame(
+        delisted,
+        columns=[
+            "fingerprint",
+            "contract_type",
+            "first_seen",
+            "last_seen",
+            "delisted_at",
+        ],
+    ).rename(columns={"fingerprint": FINGERPRINT_FIELD}).to_csv(
+        delisted_path, index=False
+    )
+    print(
+        f"Marked {len(delta['removed'])} listings as delisted "
+        f"({len(delisted)} in total, see {delisted_path})"
+    )
+
+    if records:
+        save_transformed_data(records)
+    return len(records)
+
+
+def build_pipeline_dag(
+    scripts_dir=None,
+    standard_keys=None,
+    prefilter_options=None,
+    skip_geocoding=False,
+    geocoding_service="google",
+    geocoding_workers=1,
+    rate_limits=None,
+    geocoding_quotas=None,
+    assign_regions=True,
+    region_boundaries_path=None,
+    stage_cache_dir=None,
+    use_stage_cache=True,
+    use_merge_cache=True,
+    delta=False,
+    listing_store_path=None,
+    cleaning_workers=1,
+    merge_workers=1,
+    write_parquet=True,
+    metrics=None,
+    verbose=False,
+):
+    """
+    The processing pipeline as a DAG of cached stages:
+    discover -> merge -> normalize -> clean -> filter -> geocode -> export.
+
+    Every stage but discover and export is cached under a hash of its inputs,
+    parameters and code (see pipeline.stage_runner). Discovery always runs, and the
+    size and mtime of the files it finds decide whether merge can be skipped. When
+    it can't, use_merge_cache still limits parsing to the new and changed files
+    (see pipeline.merge_cache).
+
+    With delta, a delta stage between normalize and clean keeps only the listings
+    added or changed since the last run (see pipeline.listing_store), and export
+    updates the output files in place. Censorship and the outlier rule need the
+    whole dataset, so the filter stage only applies the per-listing rules then.
+    Export also rebuilds the Parquet dataset of the final listings with
+    write_parquet.
+
+    metrics (a RunMetrics) receives the timing and row counts of every stage and the
+    geocoding counters; like verbose, merge_workers (processes parsing the scraper
+    files) and cleaning_workers (processes of the normalize and clean stages, see
+    pipeline.partitioning), it is not part of any cache key.
+    """
+    if delta:
+        prefilter_options = {
+            **(prefilter_options or {}),
+            "censorship_pct": None,
+            "outlier_columns": None,
+        }
+
+    stages = [
+        Stage(
+            "discover",
+            discover_stage,
+            params={"scripts_dir": scripts_dir},
+            always_run=True,
+        ),
+        Stage(
+            "merge",
+            merge_stage,
+            deps=["discover"],
+            params={"scripts_dir": scripts_dir, "use_merge_cache": use_merge_cache},
+            modules=[data_scraping, merge_cache, schema],
+            runtime={"workers": merge_workers},
+        ),
+        Stage(
+            "normalize",
+            normalize_stage,
+            deps=["merge"],
+            modules=[fingerprint, address_normalizer, partitioning],
+            runtime={"workers": cleaning_workers},
+        ),
+        Stage(
+            "clean",
+            clean_delta_stage if delta else clean_stage,
+            deps=["delta" if delta else "normalize"],
+            params={"standard_keys": standard_keys},
+            modules=[data_cleaning, partitioning],
+            runtime={"workers": cleaning_workers},
+        ),
+        Stage(
+            "filter",
+            filter_stage,
+            deps=["clean"],
+            params={"prefilter_options": prefilter_options},
+            modules=[prefilter, regions],
+        ),
+        Stage(
+            "geocode",
+            geocode_stage,
+            deps=["filter"],
+            params={
+                "skip_geocoding": skip_geocoding,
+                "geocoding_service": geocoding_service,
+                "geocoding_workers": geocoding_workers,
+                "rate_limits": rate_limits,
+                "geocoding_quotas": geocoding_quotas,
+                "assign_regions": assign_regions,
+                "region_boundaries_path": region_boundaries_path,
+            },
+            modules=[data_transform, geocoding_providers, spatial],
+            runtime={"metrics": metrics, "verbose": verbose},
+        ),
+    ]
+    if delta:
+        stages += [
+            Stage(
+                "delta",
+                delta_stage,
+                deps=["normalize"],
+                params={"listing_store_path": listing_store_path},
+                always_run=True,
+            ),
+            Stage(
+                "export",
+                export_delta_stage,
+                deps=["geocode", "delta"],
+                params={
+                    "listing_store_path": listing_store_path,
+                    "write_parquet": write_parquet,
+                },
+                cache=False,
+            ),
+        ]
+    else:
+        stages.append(
+            Stage(
+                "export",
+                export_stage,
+                deps=["geocode", "normalize"],
+                params={
+                    "listing_store_path": listing_store_path,
+                    "write_parquet": write_parquet,
+                },
+                cache=False,
+            )
+        )
+    cache = StageCache(stage_cache_dir) if use_stage_cache else None
+    return PipelineDAG(stages, cache, metrics)
+
+
+def parse_rate_limit(value):
+    """Parse a --rate-limit value, "nominatim=0.5" -> ("nominatim", 0.5)."""
+    provider, _, rate = value.partition("=")
+    provider = provider.strip().lower()
+    if provider not in geocoding_providers.REMOTE_PROVIDERS:
+        raise argparse.ArgumentTypeError(
+            f"unknown geocoding service '{provider}', expected one of "
+            f"{', '.join(geocoding_providers.REMOTE_PROVIDERS)}"
+        )
+    try:
+        rate = float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid requests per second in '{value}'")
+    if rate <= 0:
+        raise argparse.ArgumentTypeError("requests per second must be positive")
+    return provider, rate
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description="Process property data, clean it, add coordinates, and save to CSV"
@@ -468,103 +1213,362 @@ def parse_arguments():
         action="store_true",
         help="Do not resume processing (start from beginning)",
     )
+    parser.add_argument(
+        "--geocoding-service",
+        default="google",
+        help="Geocoding service to use (default: google)",
+    )
+    parser.add_argument(
+        "--geocoding-workers",
+        type=int,
+        default=8,
+        help="Number of concurrent geocoding requests (default: 8)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=parse_rate_limit,
+        action="append",
+        metavar="SERVICE=RPS",
+        help="Requests per second allowed to a geocoding service, repeatable "
+        "(e.g. --rate-limit nominatim=1 --rate-limit google=20; defaults: "
+        + ", ".join(
+            f"{name}={rate:g}"
+            for name, rate in geocoding_providers.DEFAULT_RATE_LIMITS.items()
+        )
+        + ")",
+    )
+    parser.add_argument(
+        "--cleaning-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes normalizing and cleaning the merged data, partitioned by "
+        "data source and contract type (default: number of cores)",
+    )
+    parser.add_argument(
+        "--merge-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes parsing the scraper files (default: number of cores)",
+    )
     parser.add_argument(
         "--restart",
         action="store_true",
         help="Force restart processing from beginning (same as --no-resume)",
     )
+    parser.add_argument(
+        "--stage",
+        choices=PIPELINE_STAGES,
+        help="Re-run only this stage, using cached outputs for the stages before it",
+    )
+    parser.add_argument(
+        "--force",
+        nargs="+",
+        choices=PIPELINE_STAGES,
+        default=[],
+        help="Run these stages even if their cached output is up to date",
+    )
+    parser.add_argument(
+        "--no-stage-cache",
+        action="store_true",
+        help="Run every stage without reading or writing the stage cache",
+    )
+    parser.add_argument(
+        "--no-merge-cache",
+        action="store_true",
+        help="Re-parse every scraper file instead of reusing the snapshots of the "
+        "unchanged ones",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the merged TSV through the pipeline in batches instead of "
+        "running the cached stages (resumable, bounded memory)",
+    )
+    parser.add_argument(
+        "--save-merged",
+        action="store_true",
+        help="With --stream, also save the merged scraper data to "
+        "pipeline/raw_final_output",
+    )
+    parser.add_argument(
+        "--export-xlsx",
+        action="store_true",
+        help="With --save-merged, also write the merged XLSX rows to "
+        "merged_properties.xlsx (slow for large merges)",
+    )
+    parser.add_argument(
+        "--no-parquet",
+        action="store_true",
+        help="Don't write the Parquet dataset of the final listings "
+        "(pipeline/imoveis_final, partitioned by data source and contract type)",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only process the listings added or changed since the last run, and "
+        "mark the ones that disappeared as delisted",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only estimate the run: new rows, addresses to geocode, provider "
+        "calls, spend and time at the rate limits, without geocoding or writing",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help="Profile every stage with cProfile and tracemalloc, writing the .prof "
+        "files and allocation summaries to DIR (default: profiles/<timestamp>); "
+        f"same as setting {PROFILE_ENV_VAR}",
+    )
+    parser.add_argument(
+        "--report-dir",
+        default=os.path.join(os.getcwd(), "pipeline"),
+        help="Where run_report.json and run_metrics.prom are written "
+        "(default: ./pipeline)",
+    )
     args = parser.parse_args()
 
     # Set resume to True by default (opposite of no-resume flag)
     args.resume = not args.no_resume and not args.restart
+    # None keeps the geocode stage's cache key of runs without the option
+    args.rate_limits = dict(args.rate_limit) if args.rate_limit else None
 
     return args
 
 
-def main():
-    # Hardcoded settings for direct execution
-    skip_geocoding = False
-    verbose = True
-    batch_size = 50
-    resume = True  # Always resume from last processed line
-    restart = False
-    geocoding_service = "google"  # Use Google API by default
-
-    print("\n======= PROPERTY DATA PROCESSING PIPELINE =======\n")
-    print(f"Skip Geocoding: {'YES' if skip_geocoding else 'NO'}")
-    print(f"Verbose Mode: {'YES' if verbose else 'NO'}")
-    print(f"Batch Size: {batch_size}")
-    print(f"Resume Processing: {'YES (forced)'}")
-    print(f"Force Restart: {'NO (forced)'}")
-    print(f"Auto-resume: ENABLED")
-    print(f"Geocoding Service: {geocoding_service.upper()}")
-
-    # Use the ScraperOrchestrator to gather and save data from all scrapers
-    print("\n===== DISCOVERING AND SAVING DATA FROM SCRAPERS =====")
-    orchestrator = ScraperOrchestrator()
-
-    # Run the pipeline to save merged data to raw_final_output folder
-    pipeline_result = orchestrator.run_pipeline()
-
-    if not pipeline_result["output_files"]:
-        print("ERROR: No data files were saved from scrapers.")
-        sys.exit(1)
+def run_streaming_pipeline(args, metrics=None):
+    """Merge the scraper files, then stream them through the pipeline in batches."""
+    # Use the ScraperOrchestrator to gather and merge data from all scrapers
+    print("\n===== DISCOVERING AND MERGING DATA FROM SCRAPERS =====")
+    orchestrator = ScraperOrchestrator(
+        metrics=metrics,
+        merge_cache=None if args.no_merge_cache else MergeCache(),
+        workers=args.merge_workers,
+    )
 
-    # Now load the merged data from the raw_final_output folder
-    os.path.join(Path(__file__).parent, "raw_final_output")
-    merged_file_path = None
-
-    # Prefer TSV file if available
-    if "tsv" in pipeline_result["output_files"]:
-        merged_file_path = pipeline_result["output_files"]["tsv"]
-        print(f"\n===== LOADING MERGED DATA FROM TSV FILE =====\n{merged_file_path}")
-        merged_data = pd.read_csv(merged_file_path, sep="\t")
-    elif "xlsx" in pipeline_result["output_files"]:
-        merged_file_path = pipeline_result["output_files"]["xlsx"]
-        print(f"\n===== LOADING MERGED DATA FROM XLSX FILE =====\n{merged_file_path}")
-        merged_data = pd.read_excel(merged_file_path)
-    else:
-        print("ERROR: No merged data files found in raw_final_output folder.")
-        sys.exit(1)
+    # Every file is read once and the merged frame is handed over directly,
+    # saving it to the raw_final_output folder is only a side output
+    pipeline_result = orchestrator.run_pipeline(
+        save_merged=args.save_merged, export_xlsx=args.export_xlsx
+    )
+    merged_data = pipeline_result["merged_data"]
 
     if merged_data.empty:
-        print("ERROR: Merged data file is empty.")
+        print("ERROR: No data was found in the scraper files.")
         sys.exit(1)
 
-    print(
-        f"Successfully loaded {len(merged_data)} total properties from {merged_file_path}"
-    )
+    print(f"Successfully merged {len(merged_data)} total properties")
+
+    # TSV data is streamed instead of converted at once
+    if pipeline_result["discovered_files"]["tsv"]:
+        print("\n===== STREAMING MERGED DATA =====")
+        try:
+            stream_and_process_data(
+                [],
+                skip_geocoding=args.skip_geocoding,
+                batch_size=args.batch_size,
+                resume=args.resume,
+                restart=args.restart,
+                geocoding_service=args.geocoding_service,
+                geocoding_workers=args.geocoding_workers,
+                rate_limits=args.rate_limits,
+                records=iter_frame_records(merged_data),
+                metrics=metrics,
+                verbose=args.verbose,
+            )
+        except Exception as e:
+            print(f"Fatal error during data processing: {str(e)}")
+            sys.exit(1)
+        if not args.no_parquet:
+            save_final_parquet()
+        print("\n===== PROCESSING COMPLETE =====")
+        return None
 
     # Convert DataFrame to list of dictionaries for processing
-    all_data = merged_data.to_dict("records")
+    all_data = frame_records(merged_data)
 
     # Process data
     try:
         processed_data = load_and_process_data(
             [],  # Empty list since we already have the data loaded
-            skip_geocoding=skip_geocoding,
-            batch_size=batch_size,
-            resume=resume,
-            restart=restart,
-            geocoding_service=geocoding_service,
+            skip_geocoding=args.skip_geocoding,
+            batch_size=args.batch_size,
+            resume=args.resume,
+            restart=args.restart,
+            geocoding_service=args.geocoding_service,
             preloaded_data=all_data,  # Pass the preloaded data
+            geocoding_workers=args.geocoding_workers,
+            rate_limits=args.rate_limits,
+            cleaning_workers=args.cleaning_workers,
+            metrics=metrics,
+            verbose=args.verbose,
         )
     except Exception as e:
         print(f"Fatal error during data processing: {str(e)}")
         sys.exit(1)
 
-    # Print sample of processed data
-    if processed_data:
-        print(f"\nProcessed {len(processed_data)} properties successfully")
-        if verbose:  # Using local variable instead of args
-            print("\nSample property:")
-            if processed_data:
-                sample = processed_data[0]
-                for key, value in sample.items():
-                    print(f"{key}: {value}")
+    if not args.no_parquet:
+        save_final_parquet()
 
     # Summarize the already saved transformed data
     save_transformed_data(processed_data)
+    return processed_data
+
+
+def run_stage_pipeline(args, metrics=None):
+    """Run the cached stage DAG, or only the stage selected with --stage."""
+    dag = build_pipeline_dag(
+        skip_geocoding=args.skip_geocoding,
+        geocoding_service=args.geocoding_service,
+        geocoding_workers=args.geocoding_workers,
+        rate_limits=args.rate_limits,
+        use_stage_cache=not args.no_stage_cache,
+        use_merge_cache=not args.no_merge_cache,
+        delta=args.delta,
+        cleaning_workers=args.cleaning_workers,
+        merge_workers=args.merge_workers,
+        write_parquet=not args.no_parquet,
+        metrics=metrics,
+        verbose=args.verbose,
+    )
+    targets = [args.stage] if args.stage else None
+    force = set(args.force)
+    if args.stage:
+        force.add(args.stage)
+
+    try:
+        outputs = dag.run(targets, force)
+    except Exception as e:
+        print(f"Fatal error during data processing: {str(e)}")
+        sys.exit(1)
+
+    return outputs.get("geocode")
+
+
+def run_plan(args):
+    """
+    Estimate a run without doing its expensive work: discover, merge, normalize,
+    clean and filter the scraped data, compare it with the resume ledger (or the
+    listing store in delta mode) and check its addresses against the gazetteer and
+    the geocode cache, then print the provider calls, spend and time to expect.
+    Nothing is written and no geocoding request is sent.
+    """
+    pipeline_dir = os.path.join(os.getcwd(), "pipeline")
+    rows = {}
+
+    discovered = discover_stage()
+    rows["files"] = sum(len(files) for files in discovered.values())
+    merged = merge_stage(discovered, workers=args.merge_workers)
+    records = normalize_stage(merged, args.cleaning_workers)
+    rows["merged"] = len(records)
+    records = clean_stage(records, workers=args.cleaning_workers)
+    rows["deduplicated"] = len(records)
+
+    listing_store_path = os.path.join(pipeline_dir, "listings.sqlite")
+    ledger_path = os.path.join(pipeline_dir, "processed_items.sqlite")
+    if args.delta and os.path.exists(listing_store_path):
+        store = open_listing_store(listing_store_path)
+        try:
+            delta = store.compare(records)
+        finally:
+            store.close()
+        records = delta["added"] + delta["changed"]
+        rows["new or changed"] = len(records)
+    elif args.stream and args.resume and os.path.exists(ledger_path):
+        ledger = ProcessedLedger(ledger_path)
+        try:
+            records = [
+                item for item in records if item[FINGERPRINT_FIELD] not in ledger
+            ]
+        finally:
+            ledger.close()
+        rows["not yet processed"] = len(records)
+
+    # Delta and streaming runs only apply the per-listing rules
+    prefilter_options = (
+        {"censorship_pct": None, "outlier_columns": None}
+        if args.delta or args.stream
+        else None
+    )
+    records = filter_stage(records, prefilter_options)
+    rows["after filter"] = len(records)
+
+    estimate = None
+    if not args.skip_geocoding:
+        cache = GeocodeCache() if os.path.exists(DEFAULT_CACHE_PATH) else None
+        try:
+            estimate = estimate_geocoding(
+                records,
+                [
+                    service.strip()
+                    for service in args.geocoding_service.lower().split(",")
+                    if service.strip()
+                ],
+                cache=cache,
+                offline_geocoder=OfflineGeocoder(),
+                rate_limits=args.rate_limits,
+                history=provider_history(
+                    os.path.join(args.report_dir, "run_report.json")
+                ),
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+    print_plan(rows, estimate)
+
+
+def main():
+    args = parse_arguments()
+    if args.profile is not None:
+        print(f"Profiling enabled, writing to {enable_profiling(args.profile or None)}")
+
+    print("\n======= PROPERTY DATA PROCESSING PIPELINE =======\n")
+    print(f"Skip Geocoding: {'YES' if args.skip_geocoding else 'NO'}")
+    print(f"Verbose Mode: {'YES' if args.verbose else 'NO'}")
+    print(f"Mode: {'PLAN' if args.plan else 'STREAMING' if args.stream else 'STAGES'}")
+    if args.stream:
+        print(f"Batch Size: {args.batch_size}")
+        print(f"Resume Processing: {'YES' if args.resume else 'NO'}")
+    else:
+        print(f"Stage: {args.stage or 'ALL'}")
+        print(f"Delta Mode: {'YES' if args.delta else 'NO'}")
+        print(f"Stage Cache: {'DISABLED' if args.no_stage_cache else 'ENABLED'}")
+    print(f"Geocoding Service: {args.geocoding_service.upper()}")
+    print(f"Geocoding Workers: {args.geocoding_workers}")
+    if args.rate_limits:
+        print(
+            "Rate Limits: "
+            + ", ".join(f"{name}={rate:g}/s" for name, rate in args.rate_limits.items())
+        )
+    print(f"Cleaning Workers: {args.cleaning_workers}")
+    print(f"Merge Workers: {args.merge_workers}")
+
+    if args.plan:
+        run_plan(args)
+        return
+
+    metrics = RunMetrics()
+    try:
+        if args.stream:
+            processed_data = run_streaming_pipeline(args, metrics)
+        else:
+            processed_data = run_stage_pipeline(args, metrics)
+    finally:
+        # Failed runs are reported too, their partial timings are what needs looking at
+        metrics.report()
+        metrics.write_json(os.path.join(args.report_dir, "run_report.json"))
+        metrics.write_prometheus(os.path.join(args.report_dir, "run_metrics.prom"))
+
+    # Print sample of processed data
+    if processed_data:
+        print(f"\nProcessed {len(processed_data)} properties successfully")
+        print("\nSample property:")
+        sample = processed_data[0]
+        for key, value in sample.items():
+            print(f"{key}: {value}")
 
 
 def save_transformed_data(data):
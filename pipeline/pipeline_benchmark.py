@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional
+
+import pandas as pd
+from utils.data_handler import DataHandler
+
+from pipeline.data_scraping import ScraperOrchestrator
+from pipeline.data_transform import DataTransformer
+from pipeline.geocoding_providers import GeocodeResult, GeocodingProvider
+from pipeline.pipeline import clean_stage, normalize_stage
+from pipeline.run_metrics import RunMetrics, measure
+from pipeline.synthetic_data import write_synthetic_tree
+
+# Stub results stay around the Plano Piloto, well inside the DF boundary
+STUB_CENTER = (-15.80, -47.90)
+STUB_SPREAD = 0.05
+
+
+class StubGeocoder(GeocodingProvider):
+    """
+    Answers every address with coordinates derived from its hash, after an optional
+    simulated request latency, so the benchmark measures the pipeline and not a
+    remote service.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _geocode(self, address: str, data_source: Optional[str]) -> GeocodeResult:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.md5(address.encode("utf-8")).digest()
+        latitude = STUB_CENTER[0] + (digest[0] / 255 - 0.5) * STUB_SPREAD
+        longitude = STUB_CENTER[1] + (digest[1] / 255 - 0.5) * STUB_SPREAD
+        return GeocodeResult((latitude, longitude))
+
+
+def run_pipeline_benchmark(
+    rows: int,
+    work_dir: str,
+    workers: int = 8,
+    latency: float = 0.0,
+    seed: int = 0,
+    cleaning_workers: int = 1,
+) -> RunMetrics:
+    """
+    Run the pipeline over synthetic listings: generate the scrapers' files, then
+    merge (ScraperOrchestrator), normalize, clean (DataCleaner), geocode
+    (DataTransformer with StubGeocoder) and write (DataHandler), timing each step.
+
+    Args:
+        rows: Synthetic listings to generate
+        work_dir: Folder receiving the synthetic scraper files and the output
+        workers: Concurrent geocoding lookups
+        latency: Simulated seconds per geocoding request
+        seed: Seed of the synthetic data
+        cleaning_workers: Processes of the normalize and clean steps, see
+            pipeline.partitioning
+
+    Returns:
+        RunMetrics with the timing, row counts and peak RSS of every step
+    """
+    metrics = RunMetrics()
+    scripts_dir = os.path.join(work_dir, "scripts")
+
+    with measure(metrics, "generate") as stage:
+        write_synthetic_tree(scripts_dir, rows, seed=seed)
+        stage.rows_out = rows
+
+    orchestrator = ScraperOrchestrator(scripts_dir, metrics=metrics)
+    orchestrator.discover_data_files()
+    merged = orchestrator.merge_discovered_data()
+
+    with measure(metrics, "normalize", len(merged)) as stage:
+        records = normalize_stage(merged, workers=cleaning_workers)
+        stage.rows_out = len(records)
+
+    with measure(metrics, "clean", len(records)) as stage:
+        records = clean_stage(records, workers=cleaning_workers)
+        stage.rows_out = len(records)
+
+    with measure(metrics, "geocode", len(records)) as stage:
+        stub = StubGeocoder(latency)
+        transformer = DataTransformer(
+            records, providers=[stub], workers=workers, centroid_fallback=False
+        )
+        records = transformer.add_coordinates_to_data("description")
+        stage.rows_out = len(records)
+    metrics.gauge(
+        "geocode_dedup_ratio",
+        transformer.dedup_stats.get("reduction_ratio"),
+        "Share of lookups saved by address deduplication",
+    )
+    metrics.gauge(
+        "provider_requests", stub.requests, "Requests sent", provider=stub.name
+    )
+
+    with measure(metrics, "write", len(records)) as stage:
+        # Same layout as the pipeline output: one file per contract type
+        output = pd.DataFrame(records)
+        handler = DataHandler([])
+        output_dir = os.path.join(work_dir, "output")
+        for contract_type, frame in output.groupby("contract_type"):
+            handler.save_to_csv(
+                frame, f"imoveis_{contract_type}_final.csv", output_dir=output_dir
+            )
+        stage.rows_out = len(output)
+
+    return metrics
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Measure pipeline throughput on synthetic listings"
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Simulated seconds per geocoding request",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--cleaning-workers",
+        type=int,
+        default=1,
+        help="Processes of the normalize and clean steps (default: 1)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Folder for the synthetic files and the output (temporary by default)",
+    )
+    parser.add_argument(
+        "--report", default=None, help="Write the measurements as JSON to this path"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.work_dir:
+        metrics = run_pipeline_benchmark(
+            args.rows,
+            args.work_dir,
+            args.workers,
+            args.latency,
+            args.seed,
+            args.cleaning_workers,
+        )
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            metrics = run_pipeline_benchmark(
+                args.rows,
+                work_dir,
+                args.workers,
+                args.latency,
+                args.seed,
+                args.cleaning_workers,
+            )
+
+    metrics.report()
+    if args.report:
+        metrics.write_json(args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+import pandas as pd
+
+from pipeline.address_normalizer import address_key, strip_accents
+from pipeline.regions import match_region
+
+# Property types kept by get_data_cleaned.R; anything else becomes "Outros" there.
+# Opt-in: several scrapers only record their search category ("imoveis", "") as the
+# property type, which this rule would wipe out.
+R_PROPERTY_TYPES = ["APARTAMENTO", "CASA"]
+
+# Columns read when a listing has no value in the rule's column: df-imoveis and
+# net-imoveis record the area in size_m2
+COLUMN_FALLBACKS = {"size": ["size_m2"]}
+
+
+def parse_numeric(series: pd.Series) -> pd.Series:
+    """
+    Convert scraped prices and sizes to numbers, like get_data_cleaned.R does.
+    Text such as "R$ 1.250.000", "1.250" or "85 m²" is parsed with "." as thousands
+    separator and "," as decimal separator; values that are already numbers are kept.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    # Every text value goes through the separators, "1.250" is 1250 (not 1.25)
+    is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+    numeric = pd.to_numeric(series.where(~is_text), errors="coerce")
+    text = series.where(is_text).astype("string")
+    parsed = pd.to_numeric(
+        text.str.replace(r"[^\d,.-]", "", regex=True)
+        .str.replace(".", "", regex=False)
+        .str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+    return numeric.fillna(parsed).astype(float)
+
+
+def numeric_column(df: pd.DataFrame, column: str) -> Optional[pd.Series]:
+    """
+    Parsed values of a rule's column, filled from its COLUMN_FALLBACKS where they
+    are missing. None when the frame has none of these columns.
+    """
+    values = None
+    for name in [column] + COLUMN_FALLBACKS.get(column, []):
+        if name not in df:
+            continue
+        parsed = parse_numeric(df[name])
+        values = parsed if values is None else values.fillna(parsed)
+    return values
+
+
+class ListingPrefilter:
+    """
+    Drops listings that the R analysis (get_data_cleaned, get_censorship,
+    get_remove_outliers) would discard anyway, before they reach the geocoder.
+    Rules are evaluated column-wise on a DataFrame.
+    """
+
+    def __init__(
+        self,
+        min_price: float = 0,
+        min_size: float = 0,
+        property_types: Optional[Sequence[str]] = None,
+        require_region: bool = True,
+        censorship_pct: Optional[float] = 0.05,
+        outlier_columns: Optional[Sequence[str]] = ("price", "size"),
+        group_field: str = "contract_type",
+        address_field: str = "description",
+    ):
+        """
+        Args:
+            min_price: Prices must be greater than this
+            min_size: Sizes must be greater than this
+            property_types: Keywords a property type must contain, e.g. R_PROPERTY_TYPES
+                (None keeps every type)
+            require_region: Drop listings whose text names no DF region
+            censorship_pct: Fraction cut from each end of price and size, per group
+                (get_censorship); None disables it
+            outlier_columns: Columns checked with the 1.5 IQR rule, per group
+                (get_remove_outliers); None disables it
+            group_field: Field splitting the data like the R scripts (rental vs sales)
+            address_field: Field that is geocoded, used to count the avoided lookups
+        """
+        self.min_price = min_price
+        self.min_size = min_size
+        self.property_types = list(property_types or [])
+        self.require_region = require_region
+        self.censorship_pct = censorship_pct
+        self.outlier_columns = list(outlier_columns or [])
+        self.group_field = group_field
+        self.address_field = address_field
+
+        self.dropped: Dict[str, int] = {}
+        self.kept = 0
+        self._kept_keys: Set[str] = set()
+        self._dropped_keys: Set[str] = set()
+
+    def _count(self, rule: str, mask: pd.Series) -> None:
+        self.dropped[rule] = self.dropped.get(rule, 0) + int(mask.sum())
+
+    def row_mask(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Evaluate the per-listing rules (price, size, type, region).
+
+        Returns:
+            Boolean Series, True for the listings to keep
+        """
+        keep = pd.Series(True, index=df.index)
+
+        checks = []
+        if "price" in df:
+            price = parse_numeric(df["price"])
+            checks.append(("price", ~(price > self.min_price)))
+        size = numeric_column(df, "size")
+        if size is not None:
+            # Listings without an area are kept, only known small areas are dropped
+            checks.append(("size", size.notna() & ~(size > self.min_size)))
+        if self.property_types and "property_type" in df:
+            property_type = (
+                df["property_type"]
+                .fillna("")
+                .astype(str)
+                .map(strip_accents)
+                .str.upper()
+            )
+            pattern = "|".join(self.property_types)
+            checks.append(("property_type", ~property_type.str.contains(pattern)))
+        if self.require_region and self.address_field in df:
+            region = df[self.address_field].map(match_region)
+            checks.append(("region", region.isna()))
+
+        # Each listing is counted under the first rule it fails
+        for rule, failed in checks:
+            failed = failed & keep
+            self._count(rule, failed)
+            keep &= ~failed
+        return keep
+
+    def group_mask(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Evaluate the rules that depend on the whole group: censorship of both ends of
+        price and size, then the IQR outlier rule, in the order RunHousePrice.R applies them.
+        """
+        keep = pd.Series(True, index=df.index)
+        groups = (
+            df.groupby(df[self.group_field].fillna(""), sort=False).groups
+            if self.group_field in df
+            else {"": df.index}
+        )
+
+        columns = {
+            column: numeric_column(df, column)
+            for column in {"price", "size", *self.outlier_columns}
+        }
+
+        for index in groups.values():
+            group_keep = pd.Series(True, index=index)
+
+            # Missing values are neither censored nor outliers
+            if self.censorship_pct:
+                for column in ("price", "size"):
+                    if columns[column] is None:
+                        continue
+                    values = columns[column][index][group_keep].dropna()
+                    cut = int(len(values) * self.censorship_pct)
+                    if cut == 0:
+                        continue
+                    ordered = values.sort_values(kind="stable").index
+                    censored = pd.Series(False, index=index)
+                    censored[ordered[:cut].append(ordered[-cut:])] = True
+                    self._count("censorship", censored)
+                    group_keep &= ~censored
+
+            for column in self.outlier_columns:
+                if columns[column] is None:
+                    continue
+                values = columns[column][index]
+                q1, q3 = values[group_keep].quantile([0.25, 0.75])
+                iqr = q3 - q1
+                outlier = (
+                    ~values.between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                    & values.notna()
+                    & group_keep
+                )
+                self._count("outlier", outlier)
+                group_keep &= ~outlier
+
+            keep[index] = group_keep
+        return keep
+
+    def _track_keys(self, df: pd.DataFrame, keep: pd.Series) -> None:
+        if self.address_field not in df:
+            return
+        keys = df[self.address_field].map(address_key)
+        self._kept_keys.update(key for key in keys[keep] if key)
+        self._dropped_keys.update(key for key in keys[~keep] if key)
+
+    @property
+    def avoided_lookups(self) -> int:
+        """Distinct addresses that only dropped listings had, so were never geocoded."""
+        return len(self._dropped_keys - self._kept_keys)
+
+    def filter(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply every rule to an in-memory dataset."""
+        if not data:
+            return data
+        df = pd.DataFrame(data)
+        keep = self.row_mask(df)
+        kept_df = df[keep]
+        keep[kept_df.index] = self.group_mask(kept_df)
+
+        self._track_keys(df, keep)
+        self.kept += int(keep.sum())
+        return [item for item, kept in zip(data, keep) if kept]
+
+    def filter_rows(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply only the per-listing rules, e.g. to one partition of the data.
+        filter_groups must then run on the combined result, so that
+        filter_groups(filter_rows(data)) drops the same listings as filter(data).
+        """
+        if not data:
+            return data
+        df = pd.DataFrame(data)
+        keep = self.row_mask(df)
+        dropped = ~keep
+        # Kept addresses are only known once the group rules ran
+        self._track_keys(df[dropped], keep[dropped])
+        return [item for item, kept in zip(data, keep) if kept]
+
+    def filter_groups(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply the group rules to listings that went through filter_rows."""
+        if not data:
+            return data
+        df = pd.DataFrame(data)
+        keep = self.group_mask(df)
+        self._track_keys(df, keep)
+        self.kept += int(keep.sum())
+        return [item for item, kept in zip(data, keep) if kept]
+
+    def absorb(self, other: "ListingPrefilter") -> None:
+        """Add the counters of a copy that ran filter_rows on another partition."""
+        for rule, count in other.dropped.items():
+            self.dropped[rule] = self.dropped.get(rule, 0) + count
+        self.kept += other.kept
+        self._kept_keys |= other._kept_keys
+        self._dropped_keys |= other._dropped_keys
+
+    def filter_stream(
+        self, items: Iterable[Dict[str, Any]], chunk_size: int = 5000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Apply the per-listing rules to a stream, chunk_size listings at a time.
+        Censorship and outliers need the whole group, so they are not applied here.
+        """
+        chunk: List[Dict[str, Any]] = []
+
+        def flush():
+            df = pd.DataFrame(chunk)
+            keep = self.row_mask(df)
+            self._track_keys(df, keep)
+            self.kept += int(keep.sum())
+            return [item for item, kept in zip(chunk, keep) if kept]
+
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield from flush()
+                chunk = []
+        if chunk:
+            yield from flush()
+
+    def report(self) -> None:
+        total_dropped = sum(self.dropped.values())
+        details = ", ".join(f"{rule}={count}" for rule, count in self.dropped.items())
+        print(
+            f"Pre-geocoding filter: kept {self.kept}, dropped {total_dropped}"
+            + (f" ({details})" if details else "")
+        )
+        print(f"Geocode lookups avoided: {self.avoided_lookups}")
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+from pipeline.fingerprint import listing_fingerprint
+
+FINGERPRINT_FIELD = "listing_fingerprint"
+
+
+class ProcessedLedger:
+    """
+    Persistent record of the listings already written to the output files, keyed on
+    the listing fingerprint. Lets an interrupted run resume without re-reading the
+    output files, whatever their size.
+
+    A batch is marked pending before it is written and processed once it is on disk.
+    Only a crash in between leaves pending listings behind, and recover settles them
+    against the fingerprints actually found in the output files.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the ledger database.
+
+        Args:
+            db_path: Path to the SQLite file, usually next to the output files
+        """
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_items (
+                fingerprint TEXT PRIMARY KEY,
+                contract_type TEXT,
+                has_coords INTEGER NOT NULL,
+                processed_at REAL NOT NULL,
+                pending INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+        columns = [
+            row[1] for row in self._conn.execute("PRAGMA table_info(processed_items)")
+        ]
+        if "pending" not in columns:
+            # Ledger written before batches were marked pending
+            self._conn.execute(
+                "ALTER TABLE processed_items "
+                "ADD COLUMN pending INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.commit()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed_items WHERE fingerprint = ? AND pending = 0",
+                (fingerprint,),
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM processed_items WHERE pending = 0"
+            ).fetchone()[0]
+
+    def count_with_coordinates(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM processed_items "
+                "WHERE has_coords = 1 AND pending = 0"
+            ).fetchone()[0]
+
+    @staticmethod
+    def _rows(items: List[Dict[str, Any]], pending: bool) -> List[tuple]:
+        now = time.time()
+        return [
+            (
+                item.get(FINGERPRINT_FIELD) or listing_fingerprint(item),
+                item.get("contract_type"),
+                int(
+                    item.get("latitude") is not None
+                    and item.get("longitude") is not None
+                ),
+                now,
+                int(pending),
+            )
+            for item in items
+        ]
+
+    def mark_pending(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Record a batch about to be written (or rows about to be removed from the
+        output files). Listings already in the ledger keep their details.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO processed_items VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint) DO UPDATE SET pending = 1",
+                self._rows(items, pending=True),
+            )
+
+    def mark_processed(self, items: List[Dict[str, Any]]) -> None:
+        """Record a saved batch, in a single transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO processed_items VALUES (?, ?, ?, ?, ?)",
+                self._rows(items, pending=False),
+            )
+
+    def forget(self, fingerprints: Iterable[str]) -> None:
+        """Remove listings whose rows were dropped from the output files."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM processed_items WHERE fingerprint = ?",
+                [(fingerprint,) for fingerprint in fingerprints],
+            )
+
+    def pending(self) -> Set[str]:
+        """Fingerprints left pending by an interrupted write."""
+        with self._lock:
+            return {
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT fingerprint FROM processed_items WHERE pending = 1"
+                )
+            }
+
+    def recover(self, written: Set[str]) -> int:
+        """
+        Settle the pending listings after an interrupted write: those found in the
+        output files are processed, the others are forgotten and get processed again.
+
+        Args:
+            written: Fingerprints of the rows in the output files
+
+        Returns:
+            Number of pending listings that were found in the output files
+        """
+        pending = self.pending()
+        found = [(fingerprint,) for fingerprint in pending & written]
+        missing = [(fingerprint,) for fingerprint in pending - written]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE processed_items SET pending = 0 WHERE fingerprint = ?", found
+            )
+            self._conn.executemany(
+                "DELETE FROM processed_items WHERE fingerprint = ?", missing
+            )
+        return len(found)
+
+    def clear(self) -> None:
+        """Forget every processed listing, for a fresh run."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM processed_items")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
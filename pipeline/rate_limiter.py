@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    Tokens refill continuously at `rate` per second up to `capacity`; each request takes one.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Args:
+            rate: Sustained requests per second
+            capacity: Largest burst allowed after an idle period
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available and take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait_time = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_time)
+            waited += wait_time
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take `tokens` if they are available right now, without blocking."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
@@ -0,0 +1,94 @@
+import re
+from typing import Optional
+
+from pipeline.address_normalizer import canonicalize_address
+
+# Administrative regions (RAs) of the Distrito Federal, with the labels used by
+# scripts/df-imoveis/functions/get_data_cleaned.R and the spellings found in listings.
+ADMINISTRATIVE_REGIONS = {
+    "Brasilia": ["BRASILIA", "PLANO PILOTO", "ASA SUL", "ASA NORTE", "NOROESTE"],
+    "Gama": ["GAMA"],
+    "Taguatinga": ["TAGUATINGA"],
+    "Brazlandia": ["BRAZLANDIA"],
+    "Sobradinho": ["SOBRADINHO"],
+    "Sobradinho II": ["SOBRADINHO II", "SOBRADINHO 2"],
+    "Planaltina": ["PLANALTINA"],
+    "Paranoa": ["PARANOA"],
+    "Nucleo Bandeirante": ["NUCLEO BANDEIRANTE"],
+    "Ceilandia": ["CEILANDIA"],
+    "Guara": ["GUARA", "GUARA I", "GUARA II"],
+    "Cruzeiro": ["CRUZEIRO", "CRUZEIRO NOVO", "CRUZEIRO VELHO"],
+    "Samambaia": ["SAMAMBAIA"],
+    "Santa Maria": ["SANTA MARIA"],
+    "Sao Sebastiao": ["SAO SEBASTIAO"],
+    "Recanto das Emas": ["RECANTO DAS EMAS"],
+    "Lago Sul": ["LAGO SUL"],
+    "Riacho Fundo": ["RIACHO FUNDO", "RIACHO FUNDO I"],
+    "Riacho Fundo II": ["RIACHO FUNDO II", "RIACHO FUNDO 2"],
+    "Lago Norte": ["LAGO NORTE"],
+    "Candangolandia": ["CANDANGOLANDIA"],
+    "Aguas Claras": ["AGUAS CLARAS"],
+    "Sudoeste Octogonal": ["SUDOESTE", "OCTOGONAL", "SUDOESTE OCTOGONAL"],
+    "Varjão": ["VARJAO"],
+    "Park Way": ["PARK WAY"],
+    "SCIA": ["SCIA", "ESTRUTURAL"],
+    "Jardim Botanico": ["JARDIM BOTANICO"],
+    "Itapoã": ["ITAPOA"],
+    "SIA": ["SIA"],
+    "Vicente Pires": ["VICENTE PIRES"],
+    "Fercal": ["FERCAL"],
+    "Sol Nascente": ["SOL NASCENTE", "POR DO SOL", "SOL NASCENTE POR DO SOL"],
+    "Arniqueira": ["ARNIQUEIRA", "ARNIQUEIRAS"],
+    "Arapoanga": ["ARAPOANGA"],
+    "Água Quente": ["AGUA QUENTE"],
+}
+
+# "BRASILIA" is appended to most addresses as the city name, so it only decides
+# the region when nothing more specific is present
+GENERIC_ALIASES = {"BRASILIA"}
+
+
+def _build_alias_patterns():
+    patterns = []
+    for region, aliases in ADMINISTRATIVE_REGIONS.items():
+        for alias in aliases:
+            canonical_alias = canonicalize_address(alias)
+            patterns.append(
+                (
+                    canonical_alias in GENERIC_ALIASES,
+                    -len(canonical_alias),
+                    re.compile(rf"\b{re.escape(canonical_alias)}\b"),
+                    region,
+                )
+            )
+    # Specific before generic, longer before shorter ("SOBRADINHO II" before "SOBRADINHO")
+    patterns.sort(key=lambda p: (p[0], p[1]))
+    return patterns
+
+
+_ALIAS_PATTERNS = _build_alias_patterns()
+
+
+def match_region(address) -> Optional[str]:
+    """
+    Find the administrative region named in a free-text address.
+
+    Unlike the sequential grepl chain in get_data_cleaned.R, the most specific name wins,
+    so "SOBRADINHO II" is not reported as "Sobradinho".
+
+    Returns:
+        Region label, or None if no region name was found
+    """
+    text = canonicalize_address(address)
+    if not text:
+        return None
+
+    for _, _, pattern, region in _ALIAS_PATTERNS:
+        if pattern.search(text):
+            return region
+    return None
+
+
+def region_key(region: str) -> str:
+    """Canonical key of a region, as used by the gazetteer ("RA <NAME>")."""
+    return f"RA {canonicalize_address(region)}"
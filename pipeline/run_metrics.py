@@ -0,0 +1,263 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = "housing_pipeline"
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of the process so far, None where it can't be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageMetrics:
+    """Measurements of one pipeline stage."""
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.seconds = 0.0
+        self.peak_rss_bytes: Optional[int] = None
+        self.cached = False
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        if rows is None or not self.seconds:
+            return None
+        return rows / self.seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "seconds": round(self.seconds, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_second": self.rows_per_second,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "cached": self.cached,
+        }
+
+
+class RunMetrics:
+    """
+    Collects per-stage timings and row counts plus free-form gauges (provider calls,
+    cache hit rates...) during a run, and writes them as a JSON report and a
+    Prometheus textfile (for node_exporter's textfile collector).
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: List[StageMetrics] = []
+        self.gauges: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[StageMetrics]:
+        """
+        Time a stage. Set rows_out (and rows_in if unknown upfront) on the yielded
+        StageMetrics; the stage is recorded even if it raises.
+        """
+        try:
+            with _timed(StageMetrics(name, rows_in)) as stage:
+                yield stage
+        finally:
+            with self._lock:
+                self.stages.append(stage)
+
+    def cached_stage(self, name: str) -> None:
+        """Record a stage whose output came from the stage cache."""
+        stage = StageMetrics(name)
+        stage.cached = True
+        with self._lock:
+            self.stages.append(stage)
+
+    def gauge(
+        self, name: str, value: Optional[float], help_text: str = "", **labels: str
+    ) -> None:
+        """
+        Record a value, e.g. gauge("provider_calls", 120, provider="google").
+        None values (an undefined rate) are skipped.
+        """
+        if value is None:
+            return
+        with self._lock:
+            self.gauges.append(
+                {"name": name, "value": value, "help": help_text, "labels": labels}
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished_at = time.time()
+        return {
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "seconds": round(finished_at - self.started_at, 4),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": [stage.to_dict() for stage in self.stages],
+            "gauges": self.gauges,
+        }
+
+    def write_json(self, path: str) -> None:
+        _write_atomically(path, json.dumps(self.to_dict(), indent=2))
+        print(f"Run report written to {path}")
+
+    def write_prometheus(self, path: str) -> None:
+        report = self.to_dict()
+        metrics: Dict[str, Dict[str, Any]] = {}
+
+        def add(name: str, value: Any, help_text: str, labels: Dict[str, str]):
+            if value is None:
+                return
+            metric = metrics.setdefault(name, {"help": help_text, "samples": {}})
+            # A series can only appear once, the latest value wins
+            metric["samples"][tuple(labels.items())] = float(value)
+
+        add("run_seconds", report["seconds"], "Wall time of the run", {})
+        add("run_peak_rss_bytes", report["peak_rss_bytes"], "Peak RSS of the run", {})
+        for stage in report["stages"]:
+            labels = {"stage": stage["stage"]}
+            add("stage_seconds", stage["seconds"], "Wall time per stage", labels)
+            add("stage_rows_in", stage["rows_in"], "Rows entering each stage", labels)
+            add("stage_rows_out", stage["rows_out"], "Rows leaving each stage", labels)
+            add(
+                "stage_rows_per_second",
+                stage["rows_per_second"],
+                "Throughput per stage",
+                labels,
+            )
+            add(
+                "stage_peak_rss_bytes",
+                stage["peak_rss_bytes"],
+                "Peak RSS of the process when each stage finished",
+                labels,
+            )
+            add(
+                "stage_cached",
+                int(stage["cached"]),
+                "1 when the stage output came from the stage cache",
+                labels,
+            )
+        for gauge in report["gauges"]:
+            add(gauge["name"], gauge["value"], gauge["help"], gauge["labels"])
+
+        lines = []
+        for name, metric in metrics.items():
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if metric["help"]:
+                lines.append(f"# HELP {full_name} {metric['help']}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in metric["samples"].items():
+                label_text = ",".join(
+                    f'{key}="{_escape_label(str(val))}"' for key, val in labels
+                )
+                value_text = str(int(value)) if value.is_integer() else repr(value)
+                lines.append(
+                    f"{full_name}{{{label_text}}} {value_text}"
+                    if label_text
+                    else f"{full_name} {value_text}"
+                )
+        _write_atomically(path, "\n".join(lines) + "\n")
+        print(f"Prometheus metrics written to {path}")
+
+    def report(self) -> None:
+        """Print the per-stage summary."""
+        print("\n===== RUN METRICS =====")
+        for stage in self.stages:
+            if stage.cached:
+                print(f"  {stage.name:<12} cached")
+                continue
+            rows = f"{stage.rows_in if stage.rows_in is not None else '-'} -> "
+            rows += f"{stage.rows_out if stage.rows_out is not None else '-'} rows"
+            rate = stage.rows_per_second
+            print(
+                f"  {stage.name:<12} {stage.seconds:8.2f}s  {rows}"
+                + (f"  ({rate:.0f} rows/s)" if rate is not None else "")
+            )
+        peak = peak_rss_bytes()
+        if peak is not None:
+            print(f"  Peak RSS: {peak / 1024 / 1024:.1f} MB")
+
+
+@contextmanager
+def _timed(stage: StageMetrics) -> Iterator[StageMetrics]:
+    start_time = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage.seconds = time.perf_counter() - start_time
+        stage.peak_rss_bytes = peak_rss_bytes()
+
+
+def measure(
+    metrics: Optional[RunMetrics], name: str, rows_in: Optional[int] = None
+) -> ContextManager[StageMetrics]:
+    """metrics.stage(name, rows_in), or a timed but unrecorded stage when metrics is None."""
+    if metrics is None:
+        return _timed(StageMetrics(name, rows_in))
+    return metrics.stage(name, rows_in)
+
+
+class ProgressReporter:
+    """Prints progress at most every `interval` seconds instead of once per item."""
+
+    def __init__(self, label: str, total: Optional[int] = None, interval: float = 5.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self._start_time = time.monotonic()
+        self._last_print = self._start_time
+        self._lock = threading.Lock()
+
+    def update(self, count: int = 1) -> None:
+        with self._lock:
+            self.count += count
+            now = time.monotonic()
+            if now - self._last_print < self.interval:
+                return
+            self._last_print = now
+        self._print(now)
+
+    def finish(self) -> None:
+        self._print(time.monotonic())
+
+    def _print(self, now: float) -> None:
+        elapsed = now - self._start_time
+        rate = self.count / elapsed if elapsed else 0.0
+        if self.total:
+            remaining = (self.total - self.count) / rate if rate else 0.0
+            print(
+                f"{self.label}: {self.count}/{self.total} "
+                f"({self.count / self.total:.0%}, {rate:.1f}/s, ~{remaining:.0f}s left)"
+            )
+        else:
+            print(f"{self.label}: {self.count} ({rate:.1f}/s)")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(path: str, content: str) -> None:
+    # node_exporter must never read a half-written textfile
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, path)
@@ -0,0 +1,173 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from pipeline.address_normalizer import deduplicate_addresses
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.geocoding_providers import DEFAULT_RATE_LIMITS
+from pipeline.offline_geocoder import OfflineGeocoder
+
+# USD per 1000 requests at list price; the public Nominatim instance is free
+PROVIDER_COST_PER_1000 = {"google": 5.0, "nominatim": 0.0}
+
+# Assumed for a provider missing from the previous run report: the format cascade
+# sends a second query for about half of the addresses, and most resolve
+DEFAULT_REQUESTS_PER_CALL = 1.5
+DEFAULT_HIT_RATE = 0.7
+
+
+def provider_history(report_path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Requests per lookup and hit rate of each provider during the previous run,
+    read from its run_report.json (see pipeline.run_metrics).
+
+    Returns:
+        Provider name -> {"requests_per_call", "hit_rate"}, empty without a report
+    """
+    if not os.path.exists(report_path):
+        return {}
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            gauges = json.load(f).get("gauges", [])
+    except (OSError, ValueError) as e:
+        print(f"Could not read the previous run report {report_path}: {e}")
+        return {}
+
+    counters: Dict[str, Dict[str, float]] = {}
+    for gauge in gauges:
+        provider = gauge.get("labels", {}).get("provider")
+        if provider and gauge["name"].startswith("provider_"):
+            counters.setdefault(provider, {})[gauge["name"]] = gauge["value"]
+
+    history = {}
+    for provider, values in counters.items():
+        calls = values.get("provider_calls")
+        if calls:
+            history[provider] = {
+                "requests_per_call": values.get("provider_requests", 0) / calls,
+                "hit_rate": values.get("provider_hits", 0) / calls,
+            }
+    return history
+
+
+def estimate_geocoding(
+    records: List[Dict[str, Any]],
+    services: List[str],
+    cache: Optional[GeocodeCache] = None,
+    offline_geocoder: Optional[OfflineGeocoder] = None,
+    rate_limits: Optional[Dict[str, float]] = None,
+    quotas: Optional[Dict[str, int]] = None,
+    history: Optional[Dict[str, Dict[str, float]]] = None,
+    address_field: str = "description",
+) -> Dict[str, Any]:
+    """
+    Estimate the geocoding work for the records without sending any request:
+    addresses are deduplicated like DataTransformer does, then checked against the
+    gazetteer and the geocode cache, and what is left goes down the provider chain.
+
+    Args:
+        records: Listings that would be geocoded
+        services: Remote providers, in chain order
+        cache: Geocode cache of the previous runs
+        offline_geocoder: Gazetteer index
+        rate_limits: Requests per second per provider (DEFAULT_RATE_LIMITS otherwise)
+        quotas: Request quota per provider
+        history: Per-provider rates of the previous run, see provider_history
+        address_field: Field that is geocoded
+
+    Returns:
+        Dictionary with the address counts, one estimate per provider (requests,
+        cost, seconds) and the total cost and wall-clock seconds
+    """
+    rate_limits = rate_limits or {}
+    quotas = quotas or {}
+    history = history or {}
+
+    unique_addresses, _ = deduplicate_addresses(records, address_field)
+    gazetteer_hits = 0
+    cache_hits = 0
+    remote = 0
+    for address in unique_addresses.values():
+        if offline_geocoder is not None and offline_geocoder.resolve(address):
+            gazetteer_hits += 1
+        elif cache is not None and cache.get(address)[0]:
+            # Cached "not found" answers stop the chain as well
+            cache_hits += 1
+        else:
+            remote += 1
+
+    providers = []
+    lookups = float(remote)
+    for service in services:
+        rates = history.get(service, {})
+        requests = lookups * rates.get("requests_per_call", DEFAULT_REQUESTS_PER_CALL)
+        quota = quotas.get(service)
+        if quota is not None:
+            requests = min(requests, quota)
+        rate = rate_limits.get(service) or DEFAULT_RATE_LIMITS.get(service, 1.0)
+        providers.append(
+            {
+                "provider": service,
+                "lookups": round(lookups),
+                "requests": round(requests),
+                "cost": requests / 1000 * PROVIDER_COST_PER_1000.get(service, 0.0),
+                "seconds": requests / rate,
+                "from_history": bool(rates),
+            }
+        )
+        # Only the addresses this provider misses fall through to the next one
+        lookups *= 1 - rates.get("hit_rate", DEFAULT_HIT_RATE)
+
+    return {
+        "listings": len(records),
+        "unique_addresses": len(unique_addresses),
+        "gazetteer_hits": gazetteer_hits,
+        "cache_hits": cache_hits,
+        "remote_addresses": remote,
+        "providers": providers,
+        "cost": sum(provider["cost"] for provider in providers),
+        # Each provider has its own rate limiter, the slowest one sets the pace
+        "seconds": max((provider["seconds"] for provider in providers), default=0.0),
+    }
+
+
+def format_duration(seconds: float) -> str:
+    """3725 -> "1h 02m"."""
+    minutes = int(round(seconds / 60))
+    if minutes < 1:
+        return f"{seconds:.0f}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+
+def print_plan(rows: Dict[str, int], estimate: Optional[Dict[str, Any]]) -> None:
+    """
+    Print the plan of a run.
+
+    Args:
+        rows: Row counts after each step, in order ("merged", "deduplicated"...)
+        estimate: Result of estimate_geocoding, None when geocoding is skipped
+    """
+    print("\n===== RUN PLAN =====")
+    for step, count in rows.items():
+        print(f"  {step:<24} {count:>10}")
+
+    if estimate is None:
+        print("  Geocoding skipped, nothing is sent to the providers")
+        return
+
+    print(f"  {'unique addresses':<24} {estimate['unique_addresses']:>10}")
+    print(f"  {'resolved by gazetteer':<24} {estimate['gazetteer_hits']:>10}")
+    print(f"  {'resolved by cache':<24} {estimate['cache_hits']:>10}")
+    print(f"  {'left to geocode':<24} {estimate['remote_addresses']:>10}")
+    for provider in estimate["providers"]:
+        source = "previous run" if provider["from_history"] else "default rates"
+        print(
+            f"  {provider['provider']}: ~{provider['lookups']} lookups, "
+            f"~{provider['requests']} requests, ~${provider['cost']:.2f}, "
+            f"~{format_duration(provider['seconds'])} ({source})"
+        )
+    print(
+        f"  Estimated spend: ~${estimate['cost']:.2f}, "
+        f"wall-clock time: ~{format_duration(estimate['seconds'])}"
+    )
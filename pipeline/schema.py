@@ -0,0 +1,121 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Kind of every known column of the merged scraper data:
+#   category: few distinct values, stored once with small integer codes
+#   count: whole numbers, stored as nullable Int32
+#   number: stored as int64 or float64 (float32 would change prices and sizes once
+#       they are turned back into Python floats, and with them the fingerprints)
+#   text: long text, each distinct value stored once when it repeats enough
+# Count and number columns holding scraped text ("R$ 2.300", "2 quartos") are kept
+# as text, parsing it is left to the rules that need numbers (parse_numeric).
+CANONICAL_SCHEMA: Dict[str, str] = {
+    "data_source": "category",
+    "contract_type": "category",
+    "property_type": "category",
+    "type": "category",
+    "price": "number",
+    "size": "number",
+    "size_m2": "number",
+    "bedroom": "count",
+    "bedrooms": "count",
+    "bathrooms": "count",
+    "parking_spaces": "count",
+    "car_spaces": "count",
+    "address": "text",
+    "description": "text",
+    "page_link": "text",
+}
+
+# Text columns with more distinct values than this share of their rows gain nothing
+# from being stored as categories
+MAX_TEXT_UNIQUE_RATIO = 0.5
+INT32_LIMIT = 2**31
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(
+        value, bool
+    )
+
+
+def _numeric(series: pd.Series) -> bool:
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return True
+    values = series.dropna()
+    return series.dtype == object and all(_is_number(value) for value in values)
+
+
+def _as_category(series: pd.Series, max_unique_ratio: float = 1.0) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    if series.nunique(dropna=True) > max_unique_ratio * max(len(series), 1):
+        return series
+    return series.astype("category")
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Categories of concatenated frames differ, their union is rebuilt
+        series = series.astype(object)
+    return _as_category(series, MAX_TEXT_UNIQUE_RATIO)
+
+
+def apply_schema(
+    df: pd.DataFrame, schema: Dict[str, str] = CANONICAL_SCHEMA
+) -> pd.DataFrame:
+    """
+    Store the columns of a merged frame in their canonical dtypes (see
+    CANONICAL_SCHEMA). Only lossless conversions are made: a value converted back
+    with frame_records is equal to the one read from the scraper file. Columns
+    missing from the schema are left as they are.
+
+    Args:
+        df: Merged scraper data
+        schema: Column name -> kind
+
+    Returns:
+        The same frame, converted in place
+    """
+    for column, kind in schema.items():
+        if column not in df:
+            continue
+        series = df[column]
+        if kind == "category":
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(object)
+            df[column] = series.astype("category")
+        elif kind in ("count", "number") and _numeric(series):
+            values = pd.to_numeric(series.astype(object), errors="coerce")
+            present = values.dropna()
+            if (
+                kind == "count"
+                and (present == present.round()).all()
+                and present.abs().max(skipna=True) < INT32_LIMIT
+            ):
+                df[column] = values.astype("Int32")
+            else:
+                # Integer prices stay integers, 315471 isn't written as 315471.0
+                df[column] = values
+        else:
+            df[column] = _as_text(series)
+    return df
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Rows of a frame as dictionaries of plain Python values. Missing values of the
+    nullable columns (pd.NA, which raises when tested for truth) become NaN, like
+    in a frame read without the schema.
+    """
+    nullable = {
+        column: df[column].astype(object).where(df[column].notna(), np.nan)
+        for column in df.columns
+        if pd.api.types.is_extension_array_dtype(df[column].dtype)
+        and df[column].dtype.na_value is pd.NA
+    }
+    if nullable:
+        df = df.assign(**nullable)
+    return df.to_dict("records")
@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pipeline.regions import match_region
+
+try:
+    import shapely
+    from shapely.geometry import shape
+except ImportError:  # The NumPy ray-casting fallback below is used instead
+    shapely = None
+
+# RA boundaries as GeoJSON (Polygon/MultiPolygon features, one per region), e.g. the
+# "Regiões Administrativas" layer exported from the GeoPortal DF. Not bundled.
+DEFAULT_BOUNDARIES_PATH = os.path.join(
+    Path(__file__).parent, "data", "df_regions.geojson"
+)
+
+# Feature properties that may hold the region name, in order of preference
+REGION_NAME_PROPERTIES = ["ra", "RA", "nome", "NOME", "name", "NM_RA", "ra_nome"]
+
+# Outline of the Distrito Federal as a closed (longitude, latitude) ring, simplified
+# to a few kilometres: the parallels 15°30'S and 16°03'S to the north and south, the
+# Rio Descoberto to the west and the Rio Preto to the east. The rivers leave the
+# neighbouring towns of Goiás (Águas Lindas, Santo Antônio do Descoberto, Formosa)
+# outside, which the bounding rectangle of the DF did not.
+DF_BOUNDARY = np.array(
+    [
+        [-48.27, -15.50],
+        [-47.42, -15.50],
+        [-47.42, -15.62],
+        [-47.36, -15.75],
+        [-47.31, -15.90],
+        [-47.31, -16.05],
+        [-48.23, -16.05],
+        [-48.22, -15.96],
+        [-48.22, -15.78],
+        [-48.23, -15.64],
+        [-48.27, -15.50],
+    ]
+)
+
+
+def points_in_polygon(
+    longitudes: np.ndarray, latitudes: np.ndarray, rings: List[np.ndarray]
+) -> np.ndarray:
+    """
+    Vectorized even-odd ray casting of many points against one (multi)polygon.
+
+    Counting crossings over every ring at once handles holes and multipolygon parts
+    without special cases. Points outside the polygon's bounding box are skipped.
+
+    Args:
+        longitudes: Point x coordinates (NaN for missing)
+        latitudes: Point y coordinates (NaN for missing)
+        rings: Closed rings as (n, 2) arrays of (longitude, latitude)
+
+    Returns:
+        Boolean array, True where the point lies inside the polygon
+    """
+    inside = np.zeros(len(longitudes), dtype=bool)
+    if not rings:
+        return inside
+
+    all_points = np.concatenate(rings)
+    min_x, min_y = all_points.min(axis=0)
+    max_x, max_y = all_points.max(axis=0)
+    with np.errstate(invalid="ignore"):
+        candidates = np.flatnonzero(
+            (longitudes >= min_x)
+            & (longitudes <= max_x)
+            & (latitudes >= min_y)
+            & (latitudes <= max_y)
+        )
+    if candidates.size == 0:
+        return inside
+
+    x = longitudes[candidates]
+    y = latitudes[candidates]
+    crossings = np.zeros(candidates.size, dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        for edge in range(len(x1)):
+            if y1[edge] == y2[edge]:
+                continue
+            straddles = (y1[edge] > y) != (y2[edge] > y)
+            x_cross = (x2[edge] - x1[edge]) * (y - y1[edge]) / (
+                y2[edge] - y1[edge]
+            ) + x1[edge]
+            crossings ^= straddles & (x < x_cross)
+
+    inside[candidates] = crossings
+    return inside
+
+
+def within_boundary(
+    longitudes, latitudes, boundary: np.ndarray = DF_BOUNDARY
+) -> np.ndarray:
+    """
+    Test many coordinates against the DF bounding geometry at once.
+
+    Returns:
+        Boolean array, False for points outside the boundary or missing
+    """
+    return points_in_polygon(
+        np.asarray(longitudes, dtype=float),
+        np.asarray(latitudes, dtype=float),
+        [boundary],
+    )
+
+
+def is_within_df(coordinates: Optional[Tuple[float, float]]) -> bool:
+    """Whether a single (latitude, longitude) result falls inside the DF."""
+    if not coordinates:
+        return False
+    return bool(within_boundary([coordinates[1]], [coordinates[0]])[0])
+
+
+def validate_batch(
+    data: List[Dict[str, Any]],
+    boundary: np.ndarray = DF_BOUNDARY,
+    verbose: bool = False,
+) -> int:
+    """
+    Check the coordinates of a whole batch against the DF boundary in one pass.
+
+    Sets "geo_valid" on every item (None when it has no coordinates). Coordinates
+    outside the boundary are cleared so they never reach the output files or maps.
+
+    Args:
+        verbose: Print every rejected coordinate, callers report the count otherwise
+
+    Returns:
+        Number of items whose coordinates were rejected
+    """
+    longitudes = [_as_float(item.get("longitude")) for item in data]
+    latitudes = [_as_float(item.get("latitude")) for item in data]
+    inside = within_boundary(longitudes, latitudes, boundary)
+    missing = np.isnan(longitudes) | np.isnan(latitudes)
+
+    rejected = 0
+    for item, is_inside, is_missing in zip(data, inside, missing):
+        if is_missing:
+            item["geo_valid"] = None
+        elif is_inside:
+            item["geo_valid"] = True
+        else:
+            if verbose:
+                print(
+                    f"Rejected coordinates outside the DF: "
+                    f"{item.get('latitude')}, {item.get('longitude')}"
+                )
+            item["geo_valid"] = False
+            item["latitude"] = None
+            item["longitude"] = None
+            if "geo_precision" in item:
+                item["geo_precision"] = None
+            rejected += 1
+    return rejected
+
+
+def _geometry_rings(geometry: Dict[str, Any]) -> List[np.ndarray]:
+    """Every ring of a GeoJSON Polygon or MultiPolygon, as closed (n, 2) arrays."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            ring_array = np.asarray(ring, dtype=float)[:, :2]
+            if not np.array_equal(ring_array[0], ring_array[-1]):
+                ring_array = np.vstack([ring_array, ring_array[:1]])
+            rings.append(ring_array)
+    return rings
+
+
+class RegionAssigner:
+    """
+    Assigns listings to their administrative region (RA) by point-in-polygon against
+    locally stored RA boundaries, indexed with a shapely STRtree when shapely is
+    installed. Listings without coordinates, or outside every polygon, fall back to
+    matching the region name in their text (pipeline.regions).
+    """
+
+    def __init__(self, boundaries_path: str = None):
+        """
+        Args:
+            boundaries_path: GeoJSON with one feature per RA, defaults to
+                pipeline/data/df_regions.geojson
+        """
+        self.boundaries_path = boundaries_path or DEFAULT_BOUNDARIES_PATH
+        self.regions: List[str] = []
+        self.rings: List[List[np.ndarray]] = []
+        self._tree = None
+        self._geometries = None
+        self.stats = {"polygon": 0, "text": 0, "unassigned": 0}
+        self.load()
+
+    def load(self) -> None:
+        """Read the boundaries file and build the spatial index."""
+        self.regions, self.rings = [], []
+        self._tree = self._geometries = None
+
+        if not os.path.exists(self.boundaries_path):
+            print(
+                f"RA boundaries not found at {self.boundaries_path}, "
+                "regions will be matched from the listing text only"
+            )
+            return
+
+        with open(self.boundaries_path, "r", encoding="utf-8") as f:
+            features = json.load(f).get("features", [])
+
+        geometries = []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            name = next(
+                (
+                    properties[key]
+                    for key in REGION_NAME_PROPERTIES
+                    if properties.get(key)
+                ),
+                None,
+            )
+            # Map the file's spelling onto the labels used by the rest of the pipeline
+            region = match_region(name) if name else None
+            rings = _geometry_rings(feature.get("geometry") or {"type": None})
+            if region is None or not rings:
+                print(f"Skipping boundary feature with unknown region: {name}")
+                continue
+
+            self.regions.append(region)
+            self.rings.append(rings)
+            if shapely is not None:
+                geometries.append(shape(feature["geometry"]))
+
+        if shapely is not None and geometries:
+            self._geometries = geometries
+            self._tree = shapely.STRtree(geometries)
+
+        print(f"Loaded {len(self.regions)} RA boundaries from {self.boundaries_path}")
+
+    def locate(self, longitudes, latitudes) -> List[Optional[str]]:
+        """
+        Region containing each point, in one vectorized pass.
+
+        Returns:
+            Region label per point, None when the point is missing or outside every RA
+        """
+        longitudes = np.asarray(longitudes, dtype=float)
+        latitudes = np.asarray(latitudes, dtype=float)
+        located: List[Optional[str]] = [None] * len(longitudes)
+        if not self.regions or len(longitudes) == 0:
+            return located
+
+        valid = np.flatnonzero(~(np.isnan(longitudes) | np.isnan(latitudes)))
+
+        if self._tree is not None:
+            points = shapely.points(longitudes[valid], latitudes[valid])
+            point_idx, region_idx = self._tree.query(points, predicate="within")
+            # A point on a shared border matches both regions; keep the first one
+            for point, region in zip(point_idx[::-1], region_idx[::-1]):
+                located[valid[point]] = self.regions[region]
+            return located
+
+        remaining = valid
+        for region, rings in zip(self.regions, self.rings):
+            if remaining.size == 0:
+                break
+            inside = points_in_polygon(
+                longitudes[remaining], latitudes[remaining], rings
+            )
+            for idx in remaining[inside]:
+                located[idx] = region
+            remaining = remaining[~inside]
+        return located
+
+    def assign(
+        self,
+        data: List[Dict[str, Any]],
+        text_field: str = "description",
+        region_field: str = "location",
+    ) -> List[Dict[str, Any]]:
+        """
+        Set region_field on every item: the RA polygon containing its coordinates, or
+        the region named in text_field when it has no usable coordinates.
+
+        Also sets "location_method" to "polygon", "text" or None.
+        """
+        longitudes = [_as_float(item.get("longitude")) for item in data]
+        latitudes = [_as_float(item.get("latitude")) for item in data]
+        located = self.locate(longitudes, latitudes)
+
+        for item, region in zip(data, located):
+            method = "polygon"
+            if region is None:
+                region = match_region(item.get(text_field))
+                method = "text" if region else None
+
+            item[region_field] = region
+            item["location_method"] = method
+            self.stats[method or "unassigned"] += 1
+
+        return data
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Locate a point in the DF administrative region boundaries"
+    )
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("--boundaries", default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    assigner = RegionAssigner(args.boundaries)
+    print(assigner.locate([args.longitude], [args.latitude])[0])
+
+
+if __name__ == "__main__":
+    main()
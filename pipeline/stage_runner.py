@@ -0,0 +1,230 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from pipeline.run_metrics import RunMetrics, measure
+from scripts.utils.profiling import profile_stage
+
+DEFAULT_STAGE_CACHE_DIR = os.path.join(Path(__file__).parent, "cache", "stages")
+
+
+def _digest(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _module_sources_digest(modules: Iterable[Any]) -> str:
+    """Hash of the source code a stage depends on, so editing it invalidates the cache."""
+    sources = []
+    for module in modules:
+        source_file = inspect.getsourcefile(module)
+        with open(source_file, "rb") as f:
+            sources.append(hashlib.sha256(f.read()).hexdigest())
+    return _digest(sources)
+
+
+def _row_count(values: List[Any]) -> Optional[int]:
+    """Rows in the first sized value (a list or DataFrame), or a stage's int result."""
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, int):
+            return value
+        if hasattr(value, "__len__") and not isinstance(value, (dict, str)):
+            return len(value)
+    return None
+
+
+class Stage:
+    """A node of the pipeline DAG."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        deps: Sequence[str] = (),
+        params: Optional[Dict[str, Any]] = None,
+        modules: Sequence[Any] = (),
+        cache: bool = True,
+        always_run: bool = False,
+        runtime: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            name: Stage name, used on the command line
+            func: Called as func(*dependency_outputs, **params)
+            deps: Names of the stages whose outputs are passed to func, in order
+            params: Keyword arguments of func, part of the cache key
+            modules: Modules holding the stage's logic, their source is part of the key
+            cache: Store the output in the stage cache (off for side-effect stages)
+            always_run: Run on every invocation and key the downstream stages on the
+                output itself (for stages that look at the outside world, like discovery)
+            runtime: Keyword arguments of func that don't change its output (e.g. a
+                metrics collector), left out of the cache key
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = params or {}
+        self.modules = list(modules)
+        self.cache = cache
+        self.always_run = always_run
+        self.runtime = runtime or {}
+
+
+class StageCache:
+    """Pickled stage outputs on disk, addressed by the hash of their inputs."""
+
+    def __init__(self, cache_dir: str = None, keep: int = 3):
+        """
+        Args:
+            cache_dir: Directory of the cached outputs, defaults to pipeline/cache/stages
+            keep: Outputs kept per stage, older ones are deleted
+        """
+        self.cache_dir = cache_dir or DEFAULT_STAGE_CACHE_DIR
+        self.keep = keep
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key[:16]}.pkl")
+
+    def has(self, stage: str, key: str) -> bool:
+        return os.path.exists(self.path(stage, key))
+
+    def load(self, stage: str, key: str) -> Any:
+        with open(self.path(stage, key), "rb") as f:
+            return pickle.load(f)
+
+    def store(self, stage: str, key: str, output: Any) -> None:
+        path = self.path(stage, key)
+        # Write then rename, so an interrupted run never leaves a truncated entry
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self.prune(stage)
+
+    def prune(self, stage: str) -> None:
+        entries = sorted(
+            Path(self.cache_dir).glob(f"{stage}-*.pkl"),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in entries[self.keep :]:
+            entry.unlink()
+
+
+class PipelineDAG:
+    """
+    Runs stages in dependency order and skips those whose inputs, parameters and code
+    are unchanged since a previous run, loading their output from the stage cache.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        cache: Optional[StageCache] = None,
+        metrics: Optional[RunMetrics] = None,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = cache
+        self.metrics = metrics
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown {dep}")
+
+    def stage_order(self, targets: Optional[Iterable[str]] = None) -> List[str]:
+        """Stages needed for targets (all stages by default), dependencies first."""
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in targets or self.stages:
+            visit(name)
+        return order
+
+    def run(
+        self,
+        targets: Optional[Iterable[str]] = None,
+        force: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Run the DAG up to targets.
+
+        Args:
+            targets: Stages to produce, with everything they depend on (None for all)
+            force: Stages to run even if a cached output exists
+
+        Returns:
+            Outputs of the stages that were run or loaded, by stage name
+        """
+        force = set(force)
+        keys: Dict[str, str] = {}
+        outputs: Dict[str, Any] = {}
+
+        def output_of(name: str) -> Any:
+            # Cached outputs are only loaded when a stage that needs them runs
+            if name not in outputs:
+                outputs[name] = self.cache.load(name, keys[name])
+            return outputs[name]
+
+        for name in self.stage_order(targets):
+            stage = self.stages[name]
+            key = _digest(
+                name,
+                stage.params,
+                _module_sources_digest(stage.modules),
+                [keys[dep] for dep in stage.deps],
+            )
+
+            cached = (
+                self.cache is not None
+                and stage.cache
+                and not stage.always_run
+                and name not in force
+                and self.cache.has(name, key)
+            )
+            if cached:
+                print(f"[{name}] unchanged, using cached output {key[:12]}")
+                keys[name] = key
+                if self.metrics is not None:
+                    self.metrics.cached_stage(name)
+                continue
+
+            print(f"[{name}] running...")
+            start_time = time.time()
+            inputs = [output_of(dep) for dep in stage.deps]
+            with measure(
+                self.metrics, name, _row_count(inputs)
+            ) as stage_metrics, profile_stage(name):
+                output = stage.func(*inputs, **stage.params, **stage.runtime)
+                stage_metrics.rows_out = _row_count([output])
+            print(f"[{name}] done in {time.time() - start_time:.2f} seconds")
+
+            if stage.always_run:
+                # Downstream stages are keyed on what this stage actually found
+                key = _digest(key, output)
+            keys[name] = key
+            outputs[name] = output
+            if self.cache is not None and stage.cache and not stage.always_run:
+                self.cache.store(name, key, output)
+
+        return outputs
@@ -0,0 +1,161 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import pandas as pd
+
+from pipeline.schema import frame_records
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class _StageError:
+    """Exception raised inside a stage thread, re-raised on the consumer side."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the consumer went away."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def threaded_stage(source: Iterable, maxsize: int = 1000) -> Iterator:
+    """
+    Run an iterable on a background thread and hand its items over through a bounded
+    queue. The producer blocks when the consumer falls maxsize items behind, so a
+    slow downstream stage throttles the upstream one instead of buffering everything.
+
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    q: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def run():
+        try:
+            for item in source:
+                if not _put(q, item, stop):
+                    return
+        except BaseException as e:
+            _put(q, _StageError(e), stop)
+        finally:
+            _put(q, _DONE, stop)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def read_tsv_records(
+    paths: List[str], chunksize: int = 5000
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of TSV files as dictionaries, reading chunksize rows at a time."""
+    for path in paths:
+        print(f"Streaming file: {path}...")
+        try:
+            for chunk in pd.read_csv(path, sep="\t", chunksize=chunksize):
+                yield from chunk.to_dict("records")
+        except Exception as e:
+            print(f"ERROR loading {path}: {str(e)}")
+
+
+def iter_frame_records(
+    df: pd.DataFrame, chunksize: int = 5000
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a DataFrame as dictionaries, converting chunksize rows at a time."""
+    for start in range(0, len(df), chunksize):
+        yield from frame_records(df.iloc[start : start + chunksize])
+
+
+def batched(
+    items: Iterable[Dict[str, Any]], batch_size: int
+) -> Iterator[Tuple[List[Dict[str, Any]], bool]]:
+    """
+    Group items into batches of batch_size.
+
+    Returns:
+        Iterator of (batch, is_final_batch) tuples; one batch is held back so the last
+        one can be flagged
+    """
+    previous = None
+    current: List[Dict[str, Any]] = []
+    for item in items:
+        current.append(item)
+        if len(current) >= batch_size:
+            if previous is not None:
+                yield previous, False
+            previous, current = current, []
+
+    if current:
+        if previous is not None:
+            yield previous, False
+        yield current, True
+    elif previous is not None:
+        yield previous, True
+
+
+class BatchWriter:
+    """
+    Writes batches on a dedicated thread, so slow disk appends never stall the stage
+    producing them. put() blocks once maxsize batches are waiting (backpressure).
+    """
+
+    def __init__(
+        self, write_batch: Callable[[List[Dict[str, Any]], bool], Any], maxsize: int = 4
+    ):
+        """
+        Args:
+            write_batch: Callback with the save_batch_callback signature
+            maxsize: Batches allowed to wait for the writer
+        """
+        self.write_batch = write_batch
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._error = None
+        self.batches_written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _DONE:
+                return
+            if self._error is not None:
+                # Keep draining so producers never block on a dead writer
+                continue
+            batch, is_final_batch = entry
+            try:
+                self.write_batch(batch, is_final_batch)
+                self.batches_written += 1
+            except BaseException as e:
+                self._error = e
+
+    def put(self, batch: List[Dict[str, Any]], is_final_batch: bool) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put((batch, is_final_batch))
+
+    def close(self) -> None:
+        """Wait for the queued batches to be written, re-raising a writer error."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
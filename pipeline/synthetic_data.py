@@ -0,0 +1,283 @@
+import argparse
+import os
+import random
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Neighbourhood labels as listings write them, with the address shapes used there
+NEIGHBOURHOODS = [
+    ("Asa Sul", "SQS {n3} Bloco {letter}"),
+    ("Asa Norte", "SQN {n3} Bloco {letter}"),
+    ("Asa Norte", "CLN {n3} Bloco {letter}"),
+    ("Sudoeste", "SQSW {n3} Bloco {letter}"),
+    ("Noroeste", "SQNW {n3} Bloco {letter}"),
+    ("Lago Sul", "SHIS QI {n2} Conjunto {n1}"),
+    ("Lago Norte", "SHIN QL {n2} Conjunto {n1}"),
+    ("Ceilândia", "QNM {n2} Conjunto {letter}"),
+    ("Ceilândia Norte", "QNN {n2} Conjunto {letter}"),
+    ("Taguatinga Sul", "CSA {n2}"),
+    ("Taguatinga Norte", "QND {n2}"),
+    ("Samambaia Sul", "QR {n3} Conjunto {n1}"),
+    ("Águas Claras", "Rua {n2} Sul"),
+    ("Águas Claras", "Avenida Araucárias, Lote {n2}"),
+    ("Guará II", "QE {n2} Conjunto {letter}"),
+    ("Gama", "Quadra {n2} Setor Leste"),
+    ("Sobradinho", "Quadra {n2} Conjunto {letter}"),
+    ("Recanto das Emas", "Quadra {n3} Conjunto {n1}"),
+    ("Santa Maria", "QR {n3} Conjunto {letter}"),
+    ("Vicente Pires", "Rua {n1}, Chácara {n2}"),
+    ("Cruzeiro Novo", "Quadra {n3} Bloco {letter}"),
+    ("Sobradinho II", "AR {n2} Conjunto {n1}"),
+    ("Riacho Fundo II", "QN {n2} Conjunto {n1}"),
+    ("Jardim Botânico", "Condomínio Solar de Brasília, Quadra {n1}"),
+]
+
+# Listings outside the DF (Entorno), which the pipeline has to discard
+OUTSIDE_DF = [
+    ("Valparaíso de Goiás", "Rua {n2}, Quadra {n2}"),
+    ("Águas Lindas de Goiás", "Quadra {n2} Lote {n2}"),
+]
+
+PROPERTY_TYPES = ["Apartamento", "Casa", "Kitnet", "Sala", "Lote", "Loja"]
+PROPERTY_TYPE_WEIGHTS = [0.55, 0.25, 0.06, 0.07, 0.04, 0.03]
+CONTRACT_TYPES = ["aluguel", "venda"]
+
+
+def format_brazilian(value: float, decimals: int = 0) -> str:
+    """1250000 -> "1.250.000", 27.31 -> "27,31" (with decimals=2)."""
+    text = f"{value:,.{decimals}f}"
+    return text.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class ListingFactory:
+    """
+    Draws listings with realistic distributions: a limited pool of addresses
+    shared by many listings (several units per building), sizes driving prices,
+    and the rental/sales split of the scraped data.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        address_pool_size: int = 5000,
+        outside_df_rate: float = 0.01,
+    ):
+        self.rng = random.Random(seed)
+        self.addresses = [
+            self._draw_address(outside_df_rate) for _ in range(address_pool_size)
+        ]
+
+    def _draw_address(self, outside_df_rate: float) -> str:
+        rng = self.rng
+        choices = OUTSIDE_DF if rng.random() < outside_df_rate else NEIGHBOURHOODS
+        neighbourhood, pattern = rng.choice(choices)
+        street = pattern.format(
+            n1=rng.randint(1, 9),
+            n2=rng.randint(1, 40),
+            n3=rng.randint(100, 416),
+            letter=chr(ord("A") + rng.randint(0, 10)),
+        )
+        return f"{street}, {neighbourhood}"
+
+    def listing(self) -> Dict[str, Any]:
+        """A listing in a scraper-neutral form, formatted by the SOURCE_FORMATS."""
+        rng = self.rng
+        contract_type = "aluguel" if rng.random() < 0.45 else "venda"
+        property_type = rng.choices(PROPERTY_TYPES, PROPERTY_TYPE_WEIGHTS)[0]
+        size = max(15.0, rng.lognormvariate(4.3, 0.5))
+        price_per_m2 = (
+            rng.uniform(25, 70)
+            if contract_type == "aluguel"
+            else rng.uniform(4e3, 14e3)
+        )
+        return {
+            "address": rng.choice(self.addresses),
+            "contract_type": contract_type,
+            "property_type": property_type,
+            "size": size,
+            "price": size * price_per_m2,
+            "bedrooms": max(0, min(5, int(size // 30))),
+            "bathrooms": max(1, min(4, int(size // 45))),
+            "parking_spaces": rng.choice([0, 1, 1, 2, 2, 3]),
+        }
+
+
+def dfimoveis_row(listing: Dict[str, Any], rng: random.Random, number: int):
+    """dfimoveis: numeric price ("" for "Sob Consulta"), size_m2, bedroom."""
+    sob_consulta = rng.random() < 0.03
+    return {
+        "page_link": f"https://www.dfimoveis.com.br/imovel/{number}",
+        "address": listing["address"],
+        "property_type": "imoveis",
+        "price": "" if sob_consulta else round(listing["price"]),
+        "size_m2": round(listing["size"], 2),
+        "bedroom": listing["bedrooms"] or None,
+        "parking_spaces": listing["parking_spaces"] or None,
+        "contract_type": listing["contract_type"],
+        "description": (
+            f"{listing['property_type']} com {listing['bedrooms']} quartos e "
+            f"{format_brazilian(listing['size'])} m² em {listing['address']}."
+        ),
+    }
+
+
+def netimoveis_row(listing: Dict[str, Any], rng: random.Random, number: int):
+    """netimoveis: the address as description, text numbers and "-" for missing."""
+    sob_consulta = rng.random() < 0.02
+    return {
+        "description": listing["address"],
+        "type": listing["property_type"],
+        "price": "Consulta" if sob_consulta else str(round(listing["price"])),
+        "size_m2": format_brazilian(listing["size"], rng.choice([0, 2])),
+        "bedrooms": str(listing["bedrooms"]) if listing["bedrooms"] else "-",
+        "bathrooms": str(listing["bathrooms"]),
+        "parking_spaces": (
+            str(listing["parking_spaces"]) if listing["parking_spaces"] else "-"
+        ),
+        "contract_type": listing["contract_type"],
+    }
+
+
+def quintoandar_row(listing: Dict[str, Any], rng: random.Random, number: int):
+    """quinto-andar: "2.140" prices, "55 m²" sizes, "2 quartos" and "1 vaga"."""
+    bedrooms = listing["bedrooms"] or 1
+    parking = listing["parking_spaces"]
+    return {
+        "description": f"{listing['address']} · Brasília",
+        "type": listing["property_type"].lower(),
+        "price": format_brazilian(listing["price"]),
+        "size": f"{round(listing['size'])} m²",
+        "bedrooms": f"{bedrooms} quarto{'s' if bedrooms > 1 else ''}",
+        "car_spaces": f"{parking} vaga{'s' if parking > 1 else ''}",
+        "contract_type": listing["contract_type"],
+    }
+
+
+# Scraper directory -> row formatter reproducing that scraper's output
+SOURCE_FORMATS: Dict[str, Callable[[Dict[str, Any], random.Random, int], Dict]] = {
+    "df-imoveis": dfimoveis_row,
+    "net-imoveis": netimoveis_row,
+    "quinto-andar": quintoandar_row,
+}
+
+
+def generate_rows(
+    source: str,
+    rows: int,
+    seed: int = 0,
+    duplicate_rate: float = 0.03,
+    factory: Optional[ListingFactory] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield rows shaped like the output of one scraper.
+
+    Args:
+        source: Key of SOURCE_FORMATS
+        rows: Rows to produce
+        seed: Seed of the random draws, the same seed gives the same rows
+        duplicate_rate: Fraction of rows repeating an earlier one, as when a page
+            is scraped twice
+        factory: Shared ListingFactory, so several sources draw the same addresses
+    """
+    format_row = SOURCE_FORMATS[source]
+    factory = factory or ListingFactory(seed)
+    rng = random.Random(f"{seed}-{source}")
+    recent: List[Dict[str, Any]] = []
+
+    for number in range(rows):
+        if recent and rng.random() < duplicate_rate:
+            yield dict(rng.choice(recent))
+            continue
+        row = format_row(factory.listing(), rng, number)
+        # A bounded window keeps duplicates close, like re-scraped pages
+        recent.append(row)
+        if len(recent) > 1000:
+            recent.pop(0)
+        yield row
+
+
+def write_synthetic_tree(
+    output_dir: str,
+    rows: int,
+    sources: Optional[List[str]] = None,
+    seed: int = 0,
+    chunk_size: int = 100_000,
+    address_pool_size: Optional[int] = None,
+) -> Dict[str, List[str]]:
+    """
+    Write synthetic scraper outputs laid out like scripts/, i.e.
+    <output_dir>/<scraper>/dataset/detailed_properties/imoveis_<contract>.tsv,
+    so ScraperOrchestrator(output_dir) discovers them like the real ones.
+
+    Rows are split evenly between the sources and written chunk_size at a time,
+    so memory stays flat up to tens of millions of rows.
+
+    Returns:
+        Paths written, by source
+    """
+    sources = sources or list(SOURCE_FORMATS)
+    # About three listings per address, as in the scraped data
+    factory = ListingFactory(seed, address_pool_size or max(100, rows // 3))
+    written: Dict[str, List[str]] = {}
+
+    for index, source in enumerate(sources):
+        source_rows = rows // len(sources) + (1 if index < rows % len(sources) else 0)
+        source_dir = os.path.join(output_dir, source, "dataset", "detailed_properties")
+        os.makedirs(source_dir, exist_ok=True)
+        paths = {
+            contract_type: os.path.join(source_dir, f"imoveis_{contract_type}.tsv")
+            for contract_type in CONTRACT_TYPES
+        }
+        for path in paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+        chunks: Dict[str, List[Dict[str, Any]]] = {c: [] for c in CONTRACT_TYPES}
+
+        def flush(contract_type):
+            path = paths[contract_type]
+            pd.DataFrame(chunks[contract_type]).to_csv(
+                path,
+                sep="\t",
+                index=False,
+                mode="a",
+                header=not os.path.exists(path),
+            )
+            chunks[contract_type] = []
+
+        for row in generate_rows(source, source_rows, seed, factory=factory):
+            chunk = chunks[row["contract_type"]]
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(row["contract_type"])
+        for contract_type in CONTRACT_TYPES:
+            if chunks[contract_type]:
+                flush(contract_type)
+
+        written[source] = [path for path in paths.values() if os.path.exists(path)]
+        print(f"Wrote {source_rows} synthetic {source} rows to {source_dir}")
+
+    return written
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic listings shaped like the scrapers' output"
+    )
+    parser.add_argument("output_dir", help="Folder laid out like scripts/")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument(
+        "--sources", nargs="+", choices=list(SOURCE_FORMATS), default=None
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    write_synthetic_tree(args.output_dir, args.rows, args.sources, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from bs4 import BeautifulSoup
 from property_data_extractor import PropertyDataExtractor
 
 from scripts.utils.data_handler import DataHandler
+from scripts.utils.profiling import profiled
 
 
 class PropertyScraper:
@@ -101,6 +102,7 @@ class PropertyScraper:
         print(f"Número máximo de tentativas atingido para a página {page_number}")
         return [], 503
 
+    @profiled("df-imoveis.scrape_all_pages")
     def scrape_all_pages(
         self,
         max_pages=None,
@@ -12,6 +12,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
+try:
+    from scripts.utils.profiling import profiled
+except ImportError:  # Run as a standalone script, outside the repository root
+
+    def profiled(name=None):
+        return lambda func: func
+
 
 class ScrapingNetImoveis:
     def __init__(self, tipo):
@@ -116,6 +123,7 @@ class ScrapingNetImoveis:
             print(f"Erro ao processar imóvel: {e}")
             return None
 
+    @profiled("net-imoveis.scrape_all_pages")
     def scrape_all_pages(self):
         """Executa o scraping completo de todas as páginas disponíveis."""
         num_page = 1
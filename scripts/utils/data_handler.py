@@ -49,7 +49,10 @@ class DataHandler:
         separator=",",
         encoding="utf-8",
     ):
-        """Saves the DataFrame to a delimited text file (CSV by default, TSV if separator='\t')."""
+        """
+        Saves the DataFrame to a delimited text file (CSV by default, TSV if separator='\t').
+        Returns True if the file was written, errors are printed.
+        """
 
         # Create full path
         filepath = os.path.join(output_dir, filename) if output_dir else filename
@@ -97,8 +100,10 @@ class DataHandler:
                 quoting=csv.QUOTE_MINIMAL,  # Escapa só se necessário
             )
             print(f"Data saved to {filepath}")
+            return True
         except Exception as e:
             print(f"Error saving file {filepath}: {e}")
+            return False
 
     def save_to_tsv(
         self, df, filename, output_dir=None, append=False, encoding="utf-8"
@@ -112,6 +117,6 @@ class DataHandler:
                 filename = filename + ".tsv"
 
         # Call save_to_csv with tab separator
-        self.save_to_csv(
+        return self.save_to_csv(
             df, filename, output_dir, append, separator="\t", encoding=encoding
         )
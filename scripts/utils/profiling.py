@@ -0,0 +1,126 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Set to a directory (or to "1" for profiles/<timestamp>) to profile every stage.
+# Being an environment variable, it also reaches scrapers started as subprocesses.
+PROFILE_ENV_VAR = "HOUSING_PROFILE"
+DEFAULT_PROFILE_ROOT = "profiles"
+TOP_ALLOCATIONS = 25
+
+# cProfile allows a single active profiler per process
+_profiler_lock = threading.Lock()
+_files_lock = threading.Lock()
+
+
+def enable_profiling(run_dir=None):
+    """Turn profiling on for this process and its children, returns the run directory."""
+    os.environ[PROFILE_ENV_VAR] = run_dir or _new_run_dir()
+    return profile_dir()
+
+
+def profile_dir():
+    """Directory receiving the profiles, or None when profiling is off."""
+    value = os.environ.get(PROFILE_ENV_VAR, "").strip()
+    if not value or value.lower() in ("0", "false", "no"):
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        # Pin the directory so every later stage and subprocess shares it
+        value = os.environ[PROFILE_ENV_VAR] = _new_run_dir()
+    return value
+
+
+def _new_run_dir():
+    return os.path.join(DEFAULT_PROFILE_ROOT, time.strftime("%Y%m%d_%H%M%S"))
+
+
+@contextmanager
+def profile_stage(name):
+    """
+    Profile a block with cProfile and tracemalloc when profiling is on, writing
+    <run dir>/<name>.prof and <name>.memory.txt (top allocations made by the block).
+
+    When profiling is off this costs one environment lookup. A stage that starts
+    while another one is profiled (nested, or on another thread) only shows up in
+    that profile. Only the calling thread is profiled: time spent waiting for
+    worker threads shows up as waits.
+    """
+    run_dir = profile_dir()
+    if run_dir is None or not _profiler_lock.acquire(blocking=False):
+        yield
+        return
+
+    try:
+        os.makedirs(run_dir, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.take_snapshot()
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            prof_path = _unique_path(run_dir, name, ".prof")
+            profiler.dump_stats(prof_path)
+            memory_path = prof_path[: -len(".prof")] + ".memory.txt"
+            _write_memory_summary(
+                memory_path, name, snapshot.compare_to(baseline, "lineno"), peak
+            )
+            print(f"Profile of {name} written to {prof_path}")
+    finally:
+        _profiler_lock.release()
+
+
+def profiled(name=None):
+    """Decorator version of profile_stage, named after the function by default."""
+
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _unique_path(run_dir, name, extension):
+    # A stage run twice (one scrape per contract type...) keeps both profiles
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    with _files_lock:
+        path = os.path.join(run_dir, f"{safe_name}{extension}")
+        counter = 2
+        while os.path.exists(path):
+            path = os.path.join(run_dir, f"{safe_name}-{counter}{extension}")
+            counter += 1
+        # Reserve the name before releasing the lock
+        open(path, "wb").close()
+    return path
+
+
+def _write_memory_summary(path, name, differences, peak):
+    lines = [
+        f"Stage: {name}",
+        f"Peak traced memory: {peak / 1024 / 1024:.1f} MB",
+        f"Top {TOP_ALLOCATIONS} allocation sites by growth during the stage:",
+    ]
+    for stat in differences[:TOP_ALLOCATIONS]:
+        lines.append(str(stat))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
@@ -0,0 +1,38 @@
+from pipeline.address_normalizer import canonicalize_address, deduplicate_addresses
+
+
+def test_variants_share_a_canonical_key():
+    """Case, accents, punctuation and abbreviations don't change the key."""
+    variants = [
+        "SQS 308 Bloco C, ASA SUL",
+        "Super Quadra Sul 308, Bloco C - Asa Sul",
+        "sqs308 bl. c asa sul - DF",
+    ]
+    keys = {canonicalize_address(address) for address in variants}
+    assert keys == {"SQS 308 BL C ASA SUL"}
+
+
+def test_sector_names_and_leading_zeros():
+    """Brasília sector names collapse to their abbreviation."""
+    assert (
+        canonicalize_address("SHI Sul QI 05 Conjunto 03")
+        == canonicalize_address("SHIS QI 5 CJ 3")
+        == "SHIS QI 5 CJ 3"
+    )
+
+
+def test_deduplicate_addresses():
+    """Only distinct keys are returned; items without an address get None."""
+    items = [
+        {"description": "SQS 308 Bloco C, ASA SUL"},
+        {"description": "sqs 308 bloco c asa sul"},
+        {"description": None},
+        {"description": float("nan")},
+        {"description": "SQN 210 Bloco A, ASA NORTE"},
+    ]
+    unique_addresses, item_keys = deduplicate_addresses(items, "description")
+
+    assert len(unique_addresses) == 2
+    assert item_keys[0] == item_keys[1]
+    assert item_keys[2] is None and item_keys[3] is None
+    assert unique_addresses[item_keys[0]] == "SQS 308 Bloco C, ASA SUL"
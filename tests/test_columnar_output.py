@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from pipeline.columnar_output import read_dataset, to_columnar, write_dataset
+
+
+def _listings():
+    return pd.DataFrame(
+        {
+            "description": ["SQS 308, Asa Sul", "QNM 4, Ceilândia", None, "Rua 7"],
+            "price": ["1.250.000", "R$ 2.300", 850000, None],
+            "size": ["85 m²", "40", None, 120.5],
+            "geo_valid": ["True", None, "False", True],
+            "data_source": ["quinto-andar", "df-imoveis", "df-imoveis", None],
+            "contract_type": ["venda", "aluguel", "venda", "venda"],
+        }
+    )
+
+
+def test_to_columnar_parses_numbers_and_flags():
+    """Text numbers become floats and partition columns are never missing."""
+    df = to_columnar(_listings())
+
+    assert df["price"].tolist()[:3] == [1250000.0, 2300.0, 850000.0]
+    assert df["size"].dtype == float and df["size"].iloc[0] == 85.0
+    assert df["geo_valid"].dtype == "boolean"
+    assert df["geo_valid"].isna().tolist() == [False, True, False, False]
+    assert df["description"].dtype == "string"
+    assert df["data_source"].tolist()[-1] == "unknown"
+
+
+def test_dataset_reads_one_partition_and_a_few_columns(tmp_path):
+    """Partitions, column subsets and predicates are pushed down to Parquet."""
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "imoveis_final")
+    listings = _listings()
+    assert write_dataset([listings.iloc[:2], listings.iloc[2:]], path)
+
+    sales = read_dataset(
+        path,
+        columns=["description", "price"],
+        data_source="df-imoveis",
+        contract_type="venda",
+    )
+    assert sales["price"].tolist() == [850000.0]
+    cheap = read_dataset(path, filters=[("price", "<", 10000)])
+    assert cheap["description"].tolist() == ["QNM 4, Ceilândia"]
+    assert isinstance(cheap["contract_type"].dtype, pd.CategoricalDtype)
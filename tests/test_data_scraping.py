@@ -0,0 +1,89 @@
+import pandas as pd
+
+from pipeline import data_scraping
+from pipeline.data_scraping import ScraperOrchestrator
+from pipeline.synthetic_data import write_synthetic_tree
+
+
+def test_run_pipeline_reads_each_file_once(tmp_path, monkeypatch):
+    """The merged frame is returned directly, without a second read or a save."""
+    write_synthetic_tree(str(tmp_path / "scripts"), 120, seed=2)
+    reads = []
+
+    def read_csv(path, *args, **kwargs):
+        reads.append(path)
+        return pd.read_csv(path, *args, **kwargs)
+
+    monkeypatch.setattr(data_scraping, "pd", _PandasWith(read_csv))
+
+    result = ScraperOrchestrator(str(tmp_path / "scripts")).run_pipeline(
+        save_merged=False
+    )
+
+    assert len(reads) == len(set(reads)) == len(result["discovered_files"]["tsv"])
+    assert len(result["merged_data"]) == result["merged_row_count"] == 120
+    assert result["output_files"] == {}
+
+
+class _PandasWith:
+    """pandas, with read_csv replaced."""
+
+    def __init__(self, read_csv):
+        self.read_csv = read_csv
+
+    def __getattr__(self, name):
+        return getattr(pd, name)
+
+
+def test_parallel_loading_matches_serial_and_reports_bad_files(tmp_path, capsys):
+    """Same merged frame with a process pool; an unreadable file is only reported."""
+    write_synthetic_tree(str(tmp_path / "scripts"), 300, seed=4)
+    serial = ScraperOrchestrator(str(tmp_path / "scripts"))
+    serial.discover_data_files()
+    parallel = ScraperOrchestrator(str(tmp_path / "scripts"), workers=2)
+    parallel.discover_data_files()
+    bad_file = tmp_path / "scripts" / "broken" / "dataset" / "imoveis_venda.xlsx"
+    bad_file.parent.mkdir(parents=True)
+    bad_file.write_text("not a workbook")
+    parallel.xlsx_files.append(str(bad_file))
+
+    expected = serial.merge_discovered_data()
+    result = parallel.merge_discovered_data()
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert f"Error loading {bad_file}" in capsys.readouterr().out
+
+
+def test_streaming_xlsx_reader_matches_read_excel(tmp_path):
+    """The read-only reader gives pd.read_excel's frame, blanks and all."""
+    frame = pd.DataFrame(
+        {
+            "description": ["SQS 308", None, "QNM 4", "Rua 7"],
+            "price": [850000, None, 1200.5, 300],
+            "area": [None, None, "72 m²", "40 m²"],
+        }
+    )
+    path = tmp_path / "imoveis_aluguel.xlsx"
+    frame.to_excel(path, index=False)
+
+    expected = pd.read_excel(path)
+    result = data_scraping.read_xlsx_streaming(str(path), chunk_rows=2)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_data_source_is_the_scraper_folder(tmp_path):
+    """Rows are labeled with their scraper, not with the dataset folder."""
+    scripts_dir = tmp_path / "scripts"
+    write_synthetic_tree(str(scripts_dir), 60, sources=["df-imoveis"], seed=1)
+    flat_dir = scripts_dir / "net-imoveis" / "dataset"
+    flat_dir.mkdir(parents=True)
+    pd.DataFrame({"description": ["QNM 4, Ceilândia"], "price": [1200]}).to_csv(
+        flat_dir / "imoveis_aluguel.tsv", sep="\t", index=False
+    )
+
+    orchestrator = ScraperOrchestrator(str(scripts_dir))
+    merged = orchestrator.get_merged_data()
+
+    assert set(merged["data_source"]) == {"df-imoveis", "net-imoveis"}
+    assert (merged["data_source"] == "net-imoveis").sum() == 1
@@ -0,0 +1,98 @@
+from geopy.exc import GeocoderServiceError
+
+from pipeline.format_stats import FormatStats
+from pipeline.geocoding_providers import NominatimProvider
+
+CASCADE = [("full", "SQS 308 Bloco C, Asa Sul"), ("sector", "SQS 308")]
+
+
+def _record(stats, format_name, attempts, successes):
+    for i in range(attempts):
+        stats.record("nominatim", "df-imoveis", "SQS", format_name, i < successes)
+
+
+def test_format_with_a_higher_success_rate_moves_up():
+    """Formats are tried best first once they have a track record."""
+    stats = FormatStats()
+    assert stats.order(CASCADE, "nominatim", "df-imoveis", "SQS") == CASCADE
+
+    _record(stats, "full", 10, 2)
+    _record(stats, "sector", 10, 8)
+
+    assert stats.order(CASCADE, "nominatim", "df-imoveis", "SQS") == [
+        CASCADE[1],
+        CASCADE[0],
+    ]
+    # Other data sources keep their own statistics
+    assert stats.order(CASCADE, "nominatim", "quinto-andar", "SQS") == CASCADE
+
+
+def test_format_without_hits_is_pruned_after_min_attempts():
+    """A format that never succeeds is dropped, but only once it had its chances."""
+    stats = FormatStats(min_attempts=20)
+    _record(stats, "full", 19, 0)
+    assert stats.order(CASCADE, "nominatim", "df-imoveis", "SQS") == [
+        CASCADE[1],
+        CASCADE[0],
+    ]
+
+    _record(stats, "full", 1, 0)
+    assert stats.order(CASCADE, "nominatim", "df-imoveis", "SQS") == [CASCADE[1]]
+
+
+def test_cascade_is_never_pruned_empty(tmp_path):
+    """The best format is kept even when all of them keep failing."""
+    path = str(tmp_path / "format_stats.json")
+    stats = FormatStats(path, min_attempts=5)
+    _record(stats, "full", 5, 0)
+    _record(stats, "sector", 5, 0)
+    stats.save()
+
+    reloaded = FormatStats(path, min_attempts=5)
+    assert reloaded.order(CASCADE, "nominatim", "df-imoveis", "SQS") == [CASCADE[0]]
+
+
+def test_pruned_format_is_explored_again_and_can_recover():
+    """Every explore_every-th cascade retries pruned formats, last."""
+    stats = FormatStats(min_attempts=20, explore_every=5)
+    _record(stats, "full", 20, 0)
+
+    orders = [stats.order(CASCADE, "nominatim", "df-imoveis", "SQS") for _ in range(5)]
+    assert orders[:4] == [[CASCADE[1]]] * 4
+    assert orders[4] == [CASCADE[1], CASCADE[0]]
+
+    # The retried format answers again, e.g. it only failed during an outage
+    _record(stats, "full", 1, 1)
+    assert CASCADE[0] in stats.order(CASCADE, "nominatim", "df-imoveis", "SQS")
+
+
+def test_old_counts_weigh_less():
+    """Counts are halved at max_attempts, recent results move the rate faster."""
+    stats = FormatStats(max_attempts=100)
+    _record(stats, "full", 99, 0)
+    _record(stats, "full", 1, 0)
+    assert stats.counts["nominatim|df-imoveis|SQS"]["full"] == [50, 0]
+
+
+class _FlakyGeolocator:
+    """Fails with a service error for the full address, finds nothing otherwise."""
+
+    def geocode(self, query):
+        if query.endswith("DF, Brazil"):
+            raise GeocoderServiceError("HTTP 429")
+        return None
+
+
+def test_errored_attempts_are_not_counted_as_failures():
+    """Only formats that got an answer are counted."""
+    stats = FormatStats()
+    provider = NominatimProvider(format_stats=stats, rate_limit=1000.0)
+    provider.retry_delay = 0
+    provider._client = _FlakyGeolocator()
+
+    result = provider.geocode("SQS 308 Bloco C", "df-imoveis")
+
+    assert result.coordinates is None and result.errored
+    counts = stats.counts["nominatim|df-imoveis|SQS"]
+    assert "full_context" not in counts
+    assert counts["city_country"] == [1, 0] and counts["raw"] == [1, 0]
@@ -0,0 +1,41 @@
+from pipeline.geocode_cache import GeocodeCache
+
+
+def test_hits_and_misses_are_cached(tmp_path):
+    """Found and not-found answers are both served from the cache."""
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.set("SQS 308 Bloco C,  ASA SUL", (-15.81, -47.90))
+    cache.set("Endereço inexistente", None)
+
+    assert cache.get("sqs 308 bloco c, asa sul") == (True, (-15.81, -47.90))
+    assert cache.get("endereço inexistente") == (True, None)
+    assert cache.get("SHIS QI 05") == (False, None)
+    cache.close()
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    """Each kind of entry uses its own TTL."""
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"), hit_ttl=3600, miss_ttl=-1)
+    cache.set("SQN 210", (-15.77, -47.88))
+    cache.set("Endereço inexistente", None)
+
+    assert cache.get("SQN 210") == (True, (-15.77, -47.88))
+    assert cache.get("Endereço inexistente") == (False, None)
+    assert cache.purge_expired() == 1
+    cache.close()
+
+
+def test_export_and_import(tmp_path):
+    """Entries survive a round trip through the export file."""
+    source = GeocodeCache(str(tmp_path / "source.sqlite"))
+    source.set("SQS 308", (-15.81, -47.90))
+    export_path = str(tmp_path / "cache.jsonl")
+    assert source.export_to_file(export_path) == 1
+
+    target = GeocodeCache(str(tmp_path / "target.sqlite"))
+    assert target.import_from_file(export_path) == 1
+    assert target.get("sqs 308") == (True, (-15.81, -47.90))
+    # Importing the same entries again does not overwrite anything
+    assert target.import_from_file(export_path) == 0
+    source.close()
+    target.close()
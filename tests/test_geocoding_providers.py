@@ -0,0 +1,121 @@
+import os
+import sys
+
+import pytest
+
+from pipeline.data_transform import DataTransformer
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.geocoding_providers import (
+    CacheProvider,
+    GoogleProvider,
+    NominatimProvider,
+    OfflineProvider,
+    build_provider_chain,
+)
+from pipeline.nominatim_stub import start_stub_server
+from pipeline.offline_geocoder import OfflineGeocoder
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _stub(not_found_rate):
+    server = start_stub_server(latency=0.0, not_found_rate=not_found_rate)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def answering_stub():
+    yield from _stub(0.0)
+
+
+@pytest.fixture
+def silent_stub():
+    yield from _stub(1.0)
+
+
+def _chain(tmp_path, monkeypatch, server):
+    """Offline, cache, Nominatim (the stub) then Google, logging every lookup."""
+    monkeypatch.delenv("GOOGLE_MAPS_API_KEY", raising=False)
+    gazetteer_path = tmp_path / "gazetteer.csv"
+    gazetteer_path.write_text(
+        "key,latitude,longitude,precision,name\nSQS 308,-15.8155,-47.9050,quadra,\n",
+        encoding="utf-8",
+    )
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    providers = [
+        OfflineProvider(OfflineGeocoder(str(gazetteer_path), os.devnull)),
+        CacheProvider(cache),
+        NominatimProvider(
+            domain=server.domain, scheme="http", rate_limit=1000.0, max_retries=1
+        ),
+        GoogleProvider(),
+    ]
+
+    calls = []
+    for provider in providers:
+        lookup = provider.geocode
+
+        def logged(address, data_source=None, name=provider.name, lookup=lookup):
+            calls.append(name)
+            return lookup(address, data_source)
+
+        monkeypatch.setattr(provider, "geocode", logged)
+
+    transformer = DataTransformer([], cache=cache, providers=providers)
+    return transformer, cache, calls
+
+
+def test_chain_falls_back_in_order(tmp_path, monkeypatch, silent_stub):
+    """Each provider that cannot answer hands the address to the next one."""
+    transformer, cache, calls = _chain(tmp_path, monkeypatch, silent_stub)
+
+    assert transformer.geocode_address("Rua das Palmeiras, 12") is None
+    assert calls == ["offline", "cache", "nominatim", "google"]
+    # Nominatim tried its whole cascade before giving up
+    formats = NominatimProvider().address_formats("Rua das Palmeiras, 12")
+    assert silent_stub.requests_served == len(formats)
+    cache.close()
+
+
+def test_first_hit_stops_the_chain(tmp_path, monkeypatch, answering_stub):
+    """Later providers are never asked once one of them resolves the address."""
+    transformer, cache, calls = _chain(tmp_path, monkeypatch, answering_stub)
+
+    assert transformer.geocode_address("SQS 308 Bloco C") == (-15.8155, -47.9050)
+    assert calls == ["offline"]
+
+    calls.clear()
+    coordinates = transformer.geocode_address("Rua das Palmeiras, 12")
+    assert coordinates is not None
+    assert calls == ["offline", "cache", "nominatim"]
+    assert answering_stub.requests_served == 1
+
+    # The remote answer was cached, the next lookup stops there
+    calls.clear()
+    assert transformer.geocode_address("Rua das Palmeiras, 12") == coordinates
+    assert calls == ["offline", "cache"]
+    assert answering_stub.requests_served == 1
+    cache.close()
+
+
+def test_rate_limit_option_reaches_the_provider_buckets(monkeypatch):
+    """--rate-limit service=rps sets that service's token bucket."""
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "scripts"))
+    from pipeline.pipeline import parse_arguments
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["pipeline", "--rate-limit", "nominatim=0.5", "--rate-limit", "Google=25"],
+    )
+    args = parse_arguments()
+    assert args.rate_limits == {"nominatim": 0.5, "google": 25.0}
+
+    chain = build_provider_chain(["nominatim", "google"], rate_limits=args.rate_limits)
+    assert [provider.rate_limiter.rate for provider in chain] == [0.5, 25.0]
+
+    monkeypatch.setattr(sys, "argv", ["pipeline", "--rate-limit", "bing=1"])
+    with pytest.raises(SystemExit):
+        parse_arguments()
@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+
+from pipeline.fingerprint import listing_content_hash, listing_fingerprint
+from pipeline.listing_store import ListingStore
+from pipeline.processed_ledger import FINGERPRINT_FIELD, ProcessedLedger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def listing(number, price):
+    return {"page_link": f"https://example.com/{number}", "price": price}
+
+
+def test_compare_reports_added_changed_and_removed(tmp_path):
+    """Listings are diffed by fingerprint, and changes detected by content hash."""
+    store = ListingStore(str(tmp_path / "listings.sqlite"))
+    store.record([listing(1, 100), listing(2, 200), listing(3, 300)])
+
+    delta = store.compare([listing(1, 100), listing(2, 250), listing(4, 400)])
+    assert delta["added"] == [listing(4, 400)]
+    assert delta["changed"] == [listing(2, 250)]
+    assert delta["unchanged"] == 1
+    assert delta["removed"] == [listing_fingerprint(listing(3, 300))]
+    store.close()
+
+
+def test_delisted_listings_come_back_as_changed(tmp_path):
+    """A delisted listing that is scraped again is processed again."""
+    store = ListingStore(str(tmp_path / "listings.sqlite"))
+    store.record([listing(1, 100)])
+    store.mark_delisted([listing_fingerprint(listing(1, 100))])
+    assert len(store) == 0
+    assert [row["fingerprint"] for row in store.delisted()] == [
+        listing_fingerprint(listing(1, 100))
+    ]
+
+    delta = store.compare([listing(1, 100)])
+    assert delta["changed"] == [listing(1, 100)]
+    assert delta["removed"] == []
+
+    store.record(delta["changed"])
+    assert len(store) == 1 and store.delisted() == []
+    assert listing_content_hash(listing(1, 100)) != listing_content_hash(
+        listing(1, 150)
+    )
+    store.close()
+
+
+def scraped(prices):
+    """Listings without a URL, fingerprinted like normalize_stage does."""
+    items = [
+        {
+            "description": f"QNM {number}, Ceilândia",
+            "contract_type": "venda",
+            "price": price,
+        }
+        for number, price in prices.items()
+    ]
+    for item in items:
+        item[FINGERPRINT_FIELD] = listing_fingerprint(item)
+    return items
+
+
+def test_new_price_of_a_listing_without_link_is_a_change(tmp_path):
+    """The attributes fingerprint leaves the price out, the content hash doesn't."""
+    store = ListingStore(str(tmp_path / "listings.sqlite"))
+    store.record(scraped({1: 100, 2: 200}))
+
+    delta = store.compare(scraped({1: 100, 2: 250}))
+    assert delta["added"] == [] and delta["removed"] == []
+    assert delta["changed"] == scraped({2: 250})
+    store.close()
+
+
+def test_delta_export_replaces_edits_and_drops_delisted_rows(tmp_path, monkeypatch):
+    """Output files hold one row per current listing after a delta run."""
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "scripts"))
+    from pipeline.pipeline import delta_stage, export_delta_stage, output_file_paths
+
+    monkeypatch.chdir(tmp_path)
+    store_path = str(tmp_path / "listings.sqlite")
+    first = scraped({1: 100, 2: 200, 3: 300})
+    delta = delta_stage(first, store_path)
+    export_delta_stage(delta["listings"], delta, store_path, write_parquet=False)
+
+    delta = delta_stage(scraped({1: 100, 2: 250}), store_path)
+    assert len(delta["changed"]) == 1 and len(delta["removed"]) == 1
+    export_delta_stage(delta["listings"], delta, store_path, write_parquet=False)
+
+    _, sales_path = output_file_paths()
+    assert sorted(pd.read_csv(sales_path)["price"]) == [100, 250]
+    # The resume ledger follows the output files
+    ledger = ProcessedLedger(os.path.join("pipeline", "processed_items.sqlite"))
+    assert len(ledger) == 2 and ledger.pending() == set()
+    assert first[2][FINGERPRINT_FIELD] not in ledger
+    ledger.close()
+
+
+def test_full_export_rebuilds_the_resume_ledger(tmp_path, monkeypatch):
+    """Listings of a previous run that are no longer exported leave the ledger."""
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "scripts"))
+    from pipeline.pipeline import export_stage
+
+    monkeypatch.chdir(tmp_path)
+    ledger_path = os.path.join("pipeline", "processed_items.sqlite")
+    ledger = ProcessedLedger(ledger_path)
+    stale = scraped({9: 900})
+    ledger.mark_processed(stale)
+    ledger.close()
+
+    records = scraped({1: 100, 2: 200})
+    export_stage(records, records, str(tmp_path / "listings.sqlite"), False)
+
+    ledger = ProcessedLedger(ledger_path)
+    assert len(ledger) == 2
+    assert all(item[FINGERPRINT_FIELD] in ledger for item in records)
+    assert stale[0][FINGERPRINT_FIELD] not in ledger
+    ledger.close()
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+
+from pipeline.merge_cache import MergeCache
+
+
+def test_only_new_and_changed_files_are_parsed(tmp_path):
+    """Unchanged and merely touched files come from their snapshots."""
+    files = []
+    for index in range(3):
+        path = tmp_path / f"imoveis_{index}.tsv"
+        pd.DataFrame({"price": [index, None], "description": ["a", None]}).to_csv(
+            path, sep="\t", index=False
+        )
+        files.append(str(path))
+
+    parsed = []
+
+    def read_file(path):
+        parsed.append(os.path.basename(path))
+        return pd.read_csv(path, sep="\t")
+
+    cache_dir = str(tmp_path / "cache")
+    first = MergeCache(cache_dir)
+    expected = [first.load(path, read_file) for path in files]
+    first.save()
+    assert len(parsed) == 3
+
+    # Same mtime, then a touch that leaves the content as it was
+    os.utime(files[0], ns=(1, 1))
+    parsed.clear()
+    second = MergeCache(cache_dir)
+    reused = [second.load(path, read_file) for path in files]
+    assert parsed == [] and second.hits == 3
+    for frame, cached in zip(expected, reused):
+        pd.testing.assert_frame_equal(frame, cached)
+
+    # An edited file is parsed again, a deleted one leaves the manifest
+    pd.DataFrame({"price": [9], "description": ["b"]}).to_csv(
+        files[1], sep="\t", index=False
+    )
+    os.remove(files[2])
+    second.save()
+    third = MergeCache(cache_dir)
+    assert len(third.load(files[1], read_file)) == 1
+    third.save()
+    assert parsed == ["imoveis_1.tsv"]
+    assert sorted(third.manifest) == sorted(os.path.abspath(p) for p in files[:2])
+    assert len(os.listdir(cache_dir)) == 3
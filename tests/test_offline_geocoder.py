@@ -0,0 +1,80 @@
+import os
+import shutil
+
+from pipeline.data_transform import DataTransformer
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.offline_geocoder import (
+    DEFAULT_GAZETTEER_PATH,
+    OfflineGeocoder,
+    parse_address,
+)
+
+
+def test_parse_plano_piloto_grammar():
+    """Superquadras, Lago sectors and regional quadras are recognized."""
+    parsed = parse_address("SQS 308 Bloco C, ASA SUL, BRASILIA")
+    assert (parsed.sector, parsed.quadra, parsed.block) == ("SQS", "308", "BL C")
+
+    parsed = parse_address("SHI Sul QI 05 Conjunto 3, Lago Sul")
+    assert (parsed.sector, parsed.quadra, parsed.block) == ("SHIS QI", "5", "CJ 3")
+    assert parsed.region == "Lago Sul"
+
+    parsed = parse_address("QNM 14 Conjunto B, Ceilândia")
+    assert (parsed.sector, parsed.region) == ("QNM", "Ceilandia")
+
+    assert parse_address("Avenida T-63, Goiânia") is None
+
+
+def test_resolve_leaves_sectors_to_the_online_providers():
+    """Only quadra matches resolve offline; sector and RA centroids need opting in."""
+    geocoder = OfflineGeocoder(harvested_path=os.devnull)
+
+    assert geocoder.resolve("SQS 308 Bloco C, Asa Sul") is None
+    assert geocoder.lookup("SQS 308 Bloco C, Asa Sul")[2] == "sector"
+    assert geocoder.lookup("Rua 12, Taguatinga Norte")[2] == "ra"
+
+    coarse = OfflineGeocoder(harvested_path=os.devnull, min_precision="sector")
+    latitude, longitude, precision = coarse.resolve("SQS 308 Bloco C, Asa Sul")
+    assert precision == "sector"
+    assert (latitude, longitude) == coarse.index["SQS"][:2]
+    assert coarse.resolve("Rua 12, Taguatinga Norte") is None
+
+
+def test_harvest_writes_its_own_file(tmp_path):
+    """Harvested quadras are saved apart from the gazetteer and override it."""
+    gazetteer_path = str(tmp_path / "gazetteer.csv")
+    harvested_path = str(tmp_path / "harvested.csv")
+    shutil.copy(DEFAULT_GAZETTEER_PATH, gazetteer_path)
+    with open(gazetteer_path, "rb") as f:
+        gazetteer = f.read()
+    geocoder = OfflineGeocoder(gazetteer_path, harvested_path)
+
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.set("SQS 308 Bloco C, Asa Sul", (-15.81, -47.90))
+    assert geocoder.harvest_from_cache(cache) == 2
+    geocoder.save()
+    cache.close()
+
+    with open(gazetteer_path, "rb") as f:
+        assert f.read() == gazetteer
+    reloaded = OfflineGeocoder(gazetteer_path, harvested_path)
+    assert reloaded.geocode("Super Quadra Sul 308 bl. C") == (-15.81, -47.90)
+    assert reloaded.resolve("SQS 308, Brasília")[2] == "quadra"
+    assert reloaded.resolve("SQS 110") is None
+
+
+def test_centroid_fallback_sets_geo_precision():
+    """Unresolved addresses get the closest gazetteer centroid and its precision."""
+    data = [
+        {"description": "SQS 308 Bloco C, Asa Sul"},
+        {"description": "Rua 12, Taguatinga Norte"},
+        {"description": "Avenida T-63, Goiânia"},
+    ]
+    # No providers at all, so every coordinate comes from the fallback
+    transformer = DataTransformer(data, providers=[])
+    transformed = transformer.add_coordinates_to_data("description")
+
+    assert [item["geo_precision"] for item in transformed] == ["sector", "ra", None]
+    assert transformed[0]["latitude"] is not None
+    assert transformed[2]["latitude"] is None
+    assert transformer.centroid_lookups == 2
@@ -0,0 +1,38 @@
+import copy
+
+import pandas as pd
+
+from pipeline.data_cleaning import DataCleaner
+from pipeline.fingerprint import listing_fingerprint
+from pipeline.partitioning import process_partitions
+from pipeline.prefilter import ListingPrefilter
+from pipeline.processed_ledger import FINGERPRINT_FIELD
+from pipeline.synthetic_data import generate_rows
+
+
+def test_partitioned_processing_matches_a_single_process():
+    """Same listings, order, fingerprints and prefilter counters as serially."""
+    frames = []
+    for source in ("df-imoveis", "quinto-andar"):
+        frame = pd.DataFrame(generate_rows(source, 400, seed=5, duplicate_rate=0.1))
+        frame["data_source"] = source
+        frames.append(frame)
+    records = pd.concat(frames, ignore_index=True).fillna("-").to_dict("records")
+    keys = ["description", "price"]
+
+    serial_filter = ListingPrefilter()
+    expected = serial_filter.filter(
+        DataCleaner(copy.deepcopy(records)).clean_data(keys)
+    )
+    for item in expected:
+        item[FINGERPRINT_FIELD] = listing_fingerprint(item)
+
+    parallel_filter = ListingPrefilter()
+    result, _ = process_partitions(records, keys, parallel_filter, workers=3)
+    result = parallel_filter.filter_groups(result)
+
+    assert 100 < len(result) < len(records)
+    assert result == expected
+    assert parallel_filter.dropped == serial_filter.dropped
+    assert parallel_filter.kept == serial_filter.kept
+    assert parallel_filter.avoided_lookups == serial_filter.avoided_lookups
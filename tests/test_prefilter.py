@@ -0,0 +1,85 @@
+import pandas as pd
+
+from pipeline.prefilter import R_PROPERTY_TYPES, ListingPrefilter, parse_numeric
+from pipeline.synthetic_data import generate_rows
+
+
+def test_parse_numeric_handles_scraped_text():
+    """Brazilian thousands/decimal separators and units are parsed like the R code."""
+    values = pd.Series(["R$ 1.250.000", "85 m²", 70, "72,5", "Sob Consulta"])
+    parsed = parse_numeric(values).tolist()
+    assert parsed[:4] == [1250000.0, 85.0, 70.0, 72.5]
+    assert pd.isna(parsed[4])
+
+    # Read as 1.25 if pandas parses the text before the separators are removed
+    assert parse_numeric(pd.Series(["1.250", "2.500"])).tolist() == [1250.0, 2500.0]
+    assert parse_numeric(pd.Series(["1.250", 85.5, None])).tolist()[:2] == [
+        1250.0,
+        85.5,
+    ]
+
+
+def test_row_rules_and_avoided_lookups():
+    """Listings failing the R rules are dropped and their lookups counted."""
+    data = [
+        {"description": "QNM 14, Ceilândia", "property_type": "Casa", "price": 1},
+        {
+            "description": "Rua 2, Taguatinga",
+            "property_type": "Apartamento",
+            "price": 0,
+        },
+        {"description": "Rua 3, Taguatinga", "property_type": "Sala", "price": 5},
+        {"description": "Rua 4, Goiânia", "property_type": "Casa", "price": 5},
+        # Same address as a kept listing, so no lookup is saved for it
+        {"description": "QNM 14, Ceilândia", "property_type": "Lote", "price": 5},
+    ]
+    prefilter = ListingPrefilter(
+        property_types=R_PROPERTY_TYPES, censorship_pct=None, outlier_columns=None
+    )
+    kept = prefilter.filter(data)
+
+    assert kept == data[:1]
+    assert prefilter.dropped == {"price": 1, "property_type": 2, "region": 1}
+    assert prefilter.avoided_lookups == 3
+
+
+def test_censorship_is_applied_per_contract_type():
+    """Both ends of price are cut separately for rental and sales listings."""
+    data = [
+        {
+            "description": "Taguatinga",
+            "property_type": "Casa",
+            "price": price,
+            "contract_type": contract_type,
+        }
+        for contract_type in ("aluguel", "venda")
+        for price in range(1, 21)
+    ]
+    prefilter = ListingPrefilter(censorship_pct=0.05, outlier_columns=None)
+    kept = prefilter.filter(data)
+
+    assert len(kept) == 36
+    assert {item["price"] for item in kept} == set(range(2, 20))
+
+
+def test_size_rules_use_size_m2_and_keep_missing_areas():
+    """Sources recording the area in size_m2 (or not at all) aren't wiped out."""
+    frames = []
+    for source in ("df-imoveis", "net-imoveis", "quinto-andar"):
+        frame = pd.DataFrame(generate_rows(source, 300, seed=8, duplicate_rate=0))
+        frame["data_source"] = source
+        frames.append(frame)
+    merged = pd.concat(frames, ignore_index=True)
+    merged.loc[0, "size_m2"] = 0
+    merged.loc[1, "size_m2"] = None
+    data = merged.to_dict("records")
+
+    prefilter = ListingPrefilter(require_region=False)
+    kept = prefilter.filter(data)
+
+    assert prefilter.dropped["size"] == 1
+    assert data[1] in kept
+    sources = pd.Series([item["data_source"] for item in kept]).value_counts()
+    assert set(sources.index) == {"df-imoveis", "net-imoveis", "quinto-andar"}
+    # Censorship trims both ends of price and size, the rest goes through
+    assert sources.min() > 0.6 * 300
@@ -0,0 +1,118 @@
+import os
+
+from pipeline.fingerprint import listing_fingerprint
+from pipeline.processed_ledger import ProcessedLedger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fingerprint_is_stable_and_prefers_the_link():
+    """Formatting noise doesn't matter; the URL identifies a listing on its own."""
+    item = {
+        "description": "SQS 308 Bloco C",
+        "price": 350000.0,
+        "contract_type": "venda",
+    }
+    same = {
+        "description": " sqs 308  bloco c ",
+        "price": 350000,
+        "contract_type": "venda",
+    }
+    assert listing_fingerprint(item) == listing_fingerprint(same)
+    # A new price is the same listing, edited
+    assert listing_fingerprint(item) == listing_fingerprint({**item, "price": 360000})
+    assert listing_fingerprint(item) != listing_fingerprint(
+        {**item, "description": "SQS 309 Bloco C"}
+    )
+
+    linked = {**item, "page_link": "https://www.dfimoveis.com.br/imovel/1"}
+    assert listing_fingerprint(linked) == listing_fingerprint(
+        {"page_link": "https://www.dfimoveis.com.br/imovel/1", "price": 1}
+    )
+
+
+def test_ledger_survives_reopening(tmp_path):
+    """Saved batches are remembered by the next run."""
+    db_path = str(tmp_path / "processed_items.sqlite")
+    ledger = ProcessedLedger(db_path)
+    batch = [
+        {"description": "SQS 308", "latitude": -15.81, "longitude": -47.90},
+        {"description": "Rua 12", "latitude": None, "longitude": None},
+    ]
+    ledger.mark_processed(batch)
+    ledger.close()
+
+    ledger = ProcessedLedger(db_path)
+    assert len(ledger) == 2
+    assert ledger.count_with_coordinates() == 1
+    assert listing_fingerprint(batch[1]) in ledger
+    assert listing_fingerprint({"description": "SQN 210"}) not in ledger
+
+    ledger.clear()
+    assert len(ledger) == 0
+    ledger.close()
+
+
+def test_batch_that_fails_to_save_is_not_recorded(tmp_path, monkeypatch):
+    """A write error leaves the batch out of the ledger, so a resume redoes it."""
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "scripts"))
+    from pipeline.pipeline import make_batch_callback
+
+    monkeypatch.chdir(tmp_path)
+    output_path = tmp_path / "pipeline" / "imoveis_venda_final.csv"
+    # A folder in place of the output file makes the append fail
+    output_path.mkdir(parents=True)
+    ledger = ProcessedLedger(str(tmp_path / "processed_items.sqlite"))
+    batch_callback = make_batch_callback(ledger)
+    batch = [{"description": "SQS 308", "contract_type": "venda", "price": 1}]
+
+    assert batch_callback(batch, True) is False
+    assert len(ledger) == 0
+
+    output_path.rmdir()
+    assert batch_callback(batch, True) is True
+    assert listing_fingerprint(batch[0]) in ledger
+    ledger.close()
+
+
+def test_crash_between_save_and_record_is_recovered(tmp_path, monkeypatch):
+    """Rows written just before a crash are recognized instead of appended twice."""
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "scripts"))
+    from pipeline.pipeline import make_batch_callback, prepare_outputs
+    from pipeline.processed_ledger import FINGERPRINT_FIELD
+
+    monkeypatch.chdir(tmp_path)
+    ledger_path = str(tmp_path / "processed_items.sqlite")
+    batches = [
+        [{"description": f"SQS {n}", "contract_type": "venda", "price": n}]
+        for n in (308, 309, 310)
+    ]
+    for batch in batches:
+        batch[0][FINGERPRINT_FIELD] = listing_fingerprint(batch[0])
+    saved, crashed, unwritten = batches
+
+    ledger, _ = prepare_outputs(ledger_path=ledger_path)
+    batch_callback = make_batch_callback(ledger)
+    assert batch_callback(saved, False)
+
+    def crash(items):
+        raise KeyboardInterrupt
+
+    # Killed once the batch is on disk, before the ledger records it
+    monkeypatch.setattr(ledger, "mark_processed", crash)
+    try:
+        batch_callback(crashed, False)
+    except KeyboardInterrupt:
+        pass
+    # Killed before the batch reached the disk
+    ledger.mark_pending(unwritten)
+    assert crashed[0][FINGERPRINT_FIELD] not in ledger
+    ledger.close()
+
+    ledger, resuming = prepare_outputs(resume=True, ledger_path=ledger_path)
+    assert resuming
+    assert saved[0][FINGERPRINT_FIELD] in ledger
+    assert crashed[0][FINGERPRINT_FIELD] in ledger
+    assert unwritten[0][FINGERPRINT_FIELD] not in ledger
+    assert ledger.pending() == set()
+    ledger.close()
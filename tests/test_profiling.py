@@ -0,0 +1,26 @@
+import os
+
+from scripts.utils.profiling import PROFILE_ENV_VAR, profile_stage, profiled
+
+
+def test_profiles_written_only_when_enabled(tmp_path, monkeypatch):
+    """Nothing is written when off; nested stages fold into the outer profile."""
+    monkeypatch.delenv(PROFILE_ENV_VAR, raising=False)
+    with profile_stage("clean"):
+        sum(range(1000))
+
+    @profiled("geocode")
+    def geocode():
+        return [str(i) for i in range(1000)]
+
+    monkeypatch.setenv(PROFILE_ENV_VAR, str(tmp_path))
+    with profile_stage("clean"):
+        geocode()
+    geocode()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "clean.memory.txt",
+        "clean.prof",
+        "geocode.memory.txt",
+        "geocode.prof",
+    ]
@@ -0,0 +1,58 @@
+import pytest
+
+from pipeline import rate_limiter
+from pipeline.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module, sleeping only advances the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def test_bucket_allows_a_burst_up_to_its_capacity(clock):
+    """A full bucket serves `capacity` requests at once, then runs dry."""
+    bucket = TokenBucket(rate=1.0, capacity=3)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_refills_at_its_rate_up_to_its_capacity(clock):
+    """Tokens come back at `rate` per second but never beyond `capacity`."""
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+
+    clock.now += 0.25
+    assert not bucket.try_acquire()
+    clock.now += 0.25
+    assert bucket.try_acquire()
+
+    clock.now += 60
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_acquire_blocks_until_a_token_is_available(clock):
+    """An empty bucket sleeps just long enough for the next token."""
+    bucket = TokenBucket(rate=4.0)
+
+    assert bucket.acquire() == 0.0
+    assert clock.sleeps == []
+    assert bucket.acquire() == pytest.approx(0.25)
+    assert clock.now == pytest.approx(0.25)
+    assert not bucket.try_acquire()
@@ -0,0 +1,36 @@
+import json
+
+from pipeline.run_metrics import ProgressReporter, RunMetrics
+
+
+def test_reports_stages_and_gauges(tmp_path):
+    """Stages and gauges end up in both the JSON report and the textfile."""
+    metrics = RunMetrics()
+    with metrics.stage("clean", rows_in=10) as stage:
+        stage.rows_out = 8
+    metrics.cached_stage("filter")
+    metrics.gauge("cache_hit_ratio", 0.5, "Hit rate", cache="geocode")
+    metrics.gauge("cache_hit_ratio", None, "Undefined rates are skipped", cache="x")
+
+    metrics.write_json(str(tmp_path / "run_report.json"))
+    metrics.write_prometheus(str(tmp_path / "run_metrics.prom"))
+
+    report = json.loads((tmp_path / "run_report.json").read_text())
+    assert [(s["stage"], s["rows_out"], s["cached"]) for s in report["stages"]] == [
+        ("clean", 8, False),
+        ("filter", None, True),
+    ]
+    prom = (tmp_path / "run_metrics.prom").read_text().splitlines()
+    assert 'housing_pipeline_stage_rows_out{stage="clean"} 8' in prom
+    assert 'housing_pipeline_cache_hit_ratio{cache="geocode"} 0.5' in prom
+    assert not any('cache="x"' in line for line in prom)
+
+
+def test_progress_is_rate_limited(capsys):
+    """Updates within the interval print nothing; finish always prints."""
+    progress = ProgressReporter("Geocoded", total=100, interval=60)
+    for _ in range(100):
+        progress.update()
+    assert capsys.readouterr().out == ""
+    progress.finish()
+    assert capsys.readouterr().out.startswith("Geocoded: 100/100")
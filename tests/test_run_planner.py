@@ -0,0 +1,61 @@
+import json
+
+from pipeline.geocode_cache import GeocodeCache
+from pipeline.run_planner import estimate_geocoding, provider_history
+
+
+def test_estimate_skips_cached_addresses_and_uses_history(tmp_path):
+    """Cached addresses cost nothing; the previous run's rates drive the chain."""
+    report_path = tmp_path / "run_report.json"
+    report_path.write_text(
+        json.dumps(
+            {
+                "gauges": [
+                    {
+                        "name": "provider_calls",
+                        "value": 10,
+                        "labels": {"provider": "nominatim"},
+                    },
+                    {
+                        "name": "provider_requests",
+                        "value": 20,
+                        "labels": {"provider": "nominatim"},
+                    },
+                    {
+                        "name": "provider_hits",
+                        "value": 5,
+                        "labels": {"provider": "nominatim"},
+                    },
+                ]
+            }
+        )
+    )
+    history = provider_history(str(report_path))
+    assert history == {"nominatim": {"requests_per_call": 2.0, "hit_rate": 0.5}}
+
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.set("SQS 308, Asa Sul", (-15.81, -47.90))
+    cache.set("Rua Perdida 1, Lugar Nenhum", None)
+    records = [
+        {"description": "SQS 308, Asa Sul"},
+        {"description": "sqs 308,  asa sul"},
+        {"description": "Rua Perdida 1, Lugar Nenhum"},
+    ] + [{"description": f"QNM {n}, Ceilândia"} for n in range(10)]
+
+    estimate = estimate_geocoding(
+        records,
+        ["nominatim", "google"],
+        cache=cache,
+        rate_limits={"nominatim": 1.0, "google": 10.0},
+        history=history,
+    )
+    cache.close()
+
+    assert estimate["unique_addresses"] == 12
+    assert estimate["cache_hits"] == 2
+    assert estimate["remote_addresses"] == 10
+    nominatim, google = estimate["providers"]
+    assert (nominatim["lookups"], nominatim["requests"]) == (10, 20)
+    assert nominatim["seconds"] == 20 and nominatim["cost"] == 0
+    assert google["lookups"] == 5 and google["cost"] > 0
+    assert estimate["seconds"] == 20
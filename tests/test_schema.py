@@ -0,0 +1,38 @@
+import math
+
+import pandas as pd
+
+from pipeline.schema import apply_schema, frame_records
+from pipeline.synthetic_data import generate_rows
+
+
+def _same(left, right):
+    if isinstance(left, float) and math.isnan(left):
+        return isinstance(right, float) and math.isnan(right)
+    return left == right
+
+
+def test_schema_shrinks_the_merged_frame_without_changing_its_records():
+    """Categories and nullable integers, but the same values once back as records."""
+    frames = []
+    for source in ("df-imoveis", "net-imoveis", "quinto-andar"):
+        frame = pd.DataFrame(generate_rows(source, 2000, seed=3))
+        frame["data_source"] = source
+        frames.append(frame)
+    merged = pd.concat(frames, ignore_index=True)
+    merged["bathrooms"] = [2.0 if i % 3 else None for i in range(len(merged))]
+    expected = merged.to_dict("records")
+    memory = merged.memory_usage(deep=True).sum()
+
+    typed = apply_schema(merged.copy())
+    records = frame_records(typed)
+
+    # Less so when pandas already stores text in pyarrow arrays
+    assert typed.memory_usage(deep=True).sum() < memory * 0.75
+    assert isinstance(typed["contract_type"].dtype, pd.CategoricalDtype)
+    assert typed["bathrooms"].dtype == "Int32"
+    assert len(records) == len(expected)
+    for record, original in zip(records, expected):
+        assert all(_same(original[key], record[key]) for key in original)
+    # pd.NA would raise in DataCleaner's all(d.values())
+    assert all(record["bathrooms"] is not pd.NA for record in records)
@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+
+from pipeline.spatial import (
+    RegionAssigner,
+    is_within_df,
+    points_in_polygon,
+    validate_batch,
+)
+
+
+def _square(min_lon, min_lat, size):
+    return [
+        [min_lon, min_lat],
+        [min_lon + size, min_lat],
+        [min_lon + size, min_lat + size],
+        [min_lon, min_lat + size],
+        [min_lon, min_lat],
+    ]
+
+
+def _write_boundaries(path):
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"ra": "Sobradinho"},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [_square(-47.8, -15.7, 0.1)],
+            },
+        },
+        {
+            "type": "Feature",
+            "properties": {"nome": "SOBRADINHO II"},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [_square(-47.7, -15.7, 0.1)],
+            },
+        },
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+def test_points_in_polygon_handles_holes():
+    """Points in a hole are outside; missing coordinates are never inside."""
+    rings = [np.array(_square(0, 0, 10), dtype=float), np.array(_square(4, 4, 2))]
+    longitudes = np.array([1.0, 5.0, 11.0, np.nan])
+    latitudes = np.array([1.0, 5.0, 1.0, 1.0])
+    assert points_in_polygon(longitudes, latitudes, rings).tolist() == [
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_assign_prefers_polygon_and_falls_back_to_text(tmp_path):
+    """Coordinates decide the region; text is only used for rows without them."""
+    boundaries_path = str(tmp_path / "regions.geojson")
+    _write_boundaries(boundaries_path)
+    assigner = RegionAssigner(boundaries_path)
+
+    data = [
+        # Text says Sobradinho, but the point lies in Sobradinho II
+        {"description": "Casa em Sobradinho", "latitude": -15.65, "longitude": -47.65},
+        {"description": "Casa em Sobradinho II", "latitude": None, "longitude": None},
+        {"description": "Sem endereço", "latitude": float("nan"), "longitude": 1.0},
+    ]
+    assigner.assign(data)
+
+    assert [item["location"] for item in data] == [
+        "Sobradinho II",
+        "Sobradinho II",
+        None,
+    ]
+    assert [item["location_method"] for item in data] == ["polygon", "text", None]
+    assert assigner.stats == {"polygon": 1, "text": 1, "unassigned": 1}
+
+
+def test_validate_batch_clears_points_outside_df(capsys):
+    """Results that landed in another state are marked and cleared, quietly."""
+    batch = [
+        {"latitude": -15.79, "longitude": -47.88},  # Esplanada
+        {"latitude": -16.68, "longitude": -49.25},  # Goiânia
+        {"latitude": None, "longitude": None},
+    ]
+    assert validate_batch(batch) == 1
+    assert [item["geo_valid"] for item in batch] == [True, False, None]
+    assert batch[1]["latitude"] is None and batch[1]["longitude"] is None
+    # The caller reports the count, single rejections only with verbose
+    assert capsys.readouterr().out == ""
+
+    batch[1].update(latitude=-16.68, longitude=-49.25)
+    assert validate_batch(batch, verbose=True) == 1
+    assert "-16.68, -49.25" in capsys.readouterr().out
+
+
+def test_df_boundary_rejects_the_towns_across_the_border():
+    """Goiás towns inside the DF's bounding box fall outside its outline."""
+    assert is_within_df((-15.67, -48.20))  # Brazlândia
+    assert is_within_df((-15.62, -47.65))  # Planaltina
+    assert is_within_df((-16.02, -48.06))  # Gama
+    assert not is_within_df((-15.76, -48.28))  # Águas Lindas de Goiás
+    assert not is_within_df((-15.54, -47.33))  # Formosa
+    assert not is_within_df((-15.94, -48.26))  # Santo Antônio do Descoberto
@@ -0,0 +1,44 @@
+from pipeline.stage_runner import PipelineDAG, Stage, StageCache
+
+
+def make_dag(tmp_path, calls, factor=2):
+    def load():
+        calls.append("load")
+        return [1, 2, 3]
+
+    def scale(values, factor):
+        calls.append("scale")
+        return [value * factor for value in values]
+
+    def export(values):
+        calls.append("export")
+        return sum(values)
+
+    stages = [
+        Stage("load", load),
+        Stage("scale", scale, deps=["load"], params={"factor": factor}),
+        Stage("export", export, deps=["scale"], cache=False),
+    ]
+    return PipelineDAG(stages, StageCache(str(tmp_path)))
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    """A second run only executes the uncached export stage."""
+    calls = []
+    assert make_dag(tmp_path, calls).run()["export"] == 12
+    calls.clear()
+    assert make_dag(tmp_path, calls).run()["export"] == 12
+    assert calls == ["export"]
+
+
+def test_param_change_and_force_rerun_stages(tmp_path):
+    """Changing a parameter re-runs that stage only; forcing re-runs the target."""
+    calls = []
+    make_dag(tmp_path, calls).run()
+    calls.clear()
+    assert make_dag(tmp_path, calls, factor=3).run()["export"] == 18
+    assert calls == ["scale", "export"]
+
+    calls.clear()
+    make_dag(tmp_path, calls).run(["scale"], force={"scale"})
+    assert calls == ["scale"]
@@ -0,0 +1,30 @@
+from pipeline.data_scraping import ScraperOrchestrator
+from pipeline.synthetic_data import generate_rows, write_synthetic_tree
+
+
+def test_rows_are_reproducible_and_keep_scraper_quirks():
+    """The same seed gives the same rows, with each scraper's formats."""
+    first = list(generate_rows("quinto-andar", 200, seed=3))
+    assert first == list(generate_rows("quinto-andar", 200, seed=3))
+    assert all(row["size"].endswith(" m²") for row in first)
+    assert all("quarto" in row["bedrooms"] for row in first)
+
+    netimoveis = list(generate_rows("net-imoveis", 2000, seed=3))
+    assert any(
+        row["bedrooms"] == "-" or row["parking_spaces"] == "-" for row in netimoveis
+    )
+    assert any("," in row["size_m2"] for row in netimoveis)
+    dfimoveis = list(generate_rows("df-imoveis", 2000, seed=3))
+    assert any(row["price"] == "" for row in dfimoveis)
+
+
+def test_orchestrator_merges_the_synthetic_tree(tmp_path):
+    """The generated files are discovered and merged like real scraper output."""
+    written = write_synthetic_tree(str(tmp_path), 301, seed=1, chunk_size=40)
+    assert set(written) == {"df-imoveis", "net-imoveis", "quinto-andar"}
+
+    orchestrator = ScraperOrchestrator(str(tmp_path))
+    orchestrator.discover_data_files()
+    merged = orchestrator.merge_discovered_data()
+    assert len(merged) == 301
+    assert set(merged["contract_type"]) == {"aluguel", "venda"}